@@ -0,0 +1,202 @@
+"""
+Cache of AI analysis results.
+
+Users resubmit near-identical descriptions ("Chicken breast 150 g",
+"chicken breast 150g"), so results are keyed on the normalized description.
+Two tiers:
+
+- An in-process LRU (food.barcode.LRUCache) answers repeats without queries.
+  Entries expire with the row they came from, and after MEMORY_TTL at most,
+  so clear() reaches the memory of other processes within MEMORY_TTL.
+- AnalysisResult rows persist results across restarts and processes. Rows
+  expire after TTL and the least recently used ones are evicted beyond
+  MAX_ENTRIES.
+
+Concurrent misses for the same description are coalesced (single flight):
+one caller runs the analysis, the others wait for its result.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+from typing import Callable, Dict, Tuple
+from django.db.models import F
+from django.utils import timezone
+from food.barcode import LRUCache
+from .models import AnalysisResult
+
+TTL = timedelta(days=7)
+MAX_ENTRIES = 10000
+MEMORY_SIZE = 1024
+MEMORY_TTL = timedelta(minutes=5)
+
+_SPACE_RE = re.compile(r'\s+')
+# "150 g" and "150g" are the same amount
+_NUMBER_UNIT_RE = re.compile(r'(\d)\s+([a-z])')
+_PUNCTUATION_RE = re.compile(r'[^\w\s.%/-]')
+
+memory_cache = LRUCache(MEMORY_SIZE, MEMORY_TTL.total_seconds())
+
+
+def normalize_description(description: str) -> str:
+    text = unicodedata.normalize('NFKC', description or '').lower()
+    text = _PUNCTUATION_RE.sub(' ', text)
+    text = _SPACE_RE.sub(' ', text).strip(' .')
+    return _NUMBER_UNIT_RE.sub(r'\1\2', text)
+
+
+def cache_key(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters of this process."""
+
+    FIELDS = ['memory_hits', 'db_hits', 'misses', 'coalesced', 'evictions']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field: str, amount: int = 1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['memory_hits'] + counts['db_hits'] + counts['misses'] + counts['coalesced']
+        hits = lookups - counts['misses']
+        counts['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return counts
+
+
+stats = CacheStats()
+
+
+class SingleFlight:
+    """Run a function once per key at a time; concurrent callers share its result or exception."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[object, 'SingleFlight._Call'] = {}
+
+    def do(self, key, fn: Callable[[], object]) -> Tuple[object, bool]:
+        """
+        Returns:
+            Tuple of (result, whether it came from another caller's run)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_flights = SingleFlight()
+
+
+def _remember(kind: str, key: str, result: dict, created_at):
+    """Keep a result in memory until its row expires, MEMORY_TTL at most."""
+    ttl = min(created_at + TTL - timezone.now(), MEMORY_TTL).total_seconds()
+    if ttl > 0:
+        memory_cache.set((kind, key), result, ttl)
+
+
+def _stored_row(kind: str, key: str):
+    now = timezone.now()
+    row = AnalysisResult.objects.filter(
+        kind=kind, key=key, created_at__gte=now - TTL
+    ).only('result', 'created_at').first()
+    if row is None:
+        return None
+    AnalysisResult.objects.filter(pk=row.pk).update(last_used_at=now, hits=F('hits') + 1)
+    return row
+
+
+def _store_result(kind: str, key: str, normalized: str, result: dict):
+    now = timezone.now()
+    AnalysisResult.objects.update_or_create(
+        kind=kind, key=key,
+        defaults={'description': normalized, 'result': result, 'created_at': now, 'last_used_at': now, 'hits': 0}
+    )
+    evict()
+
+
+def evict():
+    """Delete expired rows and the least recently used rows beyond MAX_ENTRIES."""
+    expired, _ = AnalysisResult.objects.filter(created_at__lt=timezone.now() - TTL).delete()
+    excess = AnalysisResult.objects.count() - MAX_ENTRIES
+    evicted = 0
+    if excess > 0:
+        oldest = AnalysisResult.objects.order_by('last_used_at', 'id').values_list('id', flat=True)[:excess]
+        evicted, _ = AnalysisResult.objects.filter(id__in=list(oldest)).delete()
+    if expired or evicted:
+        stats.incr('evictions', expired + evicted)
+
+
+def cached_analysis(kind: str, description: str, analyze: Callable[[str], dict]) -> Tuple[dict, bool]:
+    """
+    The cached result of analyze(description), running it on a miss.
+
+    Returns:
+        Tuple of (result, whether it was served without running analyze)
+    """
+    normalized = normalize_description(description)
+    key = cache_key(normalized)
+    result = memory_cache.get((kind, key))
+    if result is not None:
+        stats.incr('memory_hits')
+        return result, True
+
+    def load():
+        row = _stored_row(kind, key)
+        if row is not None:
+            stats.incr('db_hits')
+            _remember(kind, key, row.result, row.created_at)
+            return row.result, True
+        stats.incr('misses')
+        fresh = analyze(description)
+        # Heuristic fallbacks stand in for an unavailable provider; the next call retries it
+        if not fresh.get('fallback'):
+            _store_result(kind, key, normalized, fresh)
+            _remember(kind, key, fresh, timezone.now())
+        return fresh, False
+
+    (result, cached), coalesced = _flights.do((kind, key), load)
+    if coalesced:
+        stats.incr('coalesced')
+        return result, True
+    return result, cached
+
+
+def clear():
+    """Drop every persisted result and the memory of this process (others follow within MEMORY_TTL)."""
+    memory_cache.clear()
+    AnalysisResult.objects.all().delete()
@@ -0,0 +1,91 @@
+"""
+Local fake model server for exercising HTTPProvider offline.
+
+Answers POST /analyze like a model would, with the placeholder analyzers,
+after a configurable latency; can be switched to fail or to answer a fixed
+payload (malformed replies). Counts requests and
+TCP connections so tests can check connection reuse.
+
+    with FakeModelServer(latency=0.05) as server:
+        provider = HTTPProvider(server.url)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .analysis import ANALYZERS
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.fake.count('connections')
+
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count('requests')
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.fail or self.path != '/analyze' or body.get('kind') not in ANALYZERS:
+            self.reply(500, {'error': 'analysis failed'})
+        elif fake.payload is not None:
+            self.reply(200, fake.payload)
+        else:
+            self.reply(200, ANALYZERS[body['kind']](body.get('description', '')))
+
+    def reply(self, status, data):
+        payload = json.dumps(data).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except ConnectionError:
+            # The client gave up (timeout) before the answer
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeModelServer:
+    def __init__(self, latency: float = 0, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        # Answered instead of the analysis when set
+        self.payload = None
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
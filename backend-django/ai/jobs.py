@@ -0,0 +1,155 @@
+"""
+Asynchronous AI analysis jobs.
+
+POST /api/ai/jobs/ stores an AnalysisJob and hands it to the JobQueue of the
+accepting process once the row is committed; GET /api/ai/jobs/{id}/ polls the
+row, so any process can answer. The queue runs jobs on a bounded thread pool
+(settings.AI_JOB_WORKERS) and refuses new jobs once AI_JOB_MAX_PENDING are
+waiting, so a slow model never pins request workers and a burst cannot grow
+the backlog without bound. A queue slot is only taken when the job is
+submitted after commit, so a rolled back request holds none.
+
+Jobs still pending or running AI_JOB_TIMEOUT seconds after creation (their
+process restarted, say) are marked failed when polled.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from food.matching import match_food_items
+from .cache import cached_analysis
+from .models import AnalysisJob
+from .providers import get_gateway
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are deleted after this long
+JOB_RETENTION = timedelta(days=1)
+
+
+def fail_job(job_id, error: str, statuses=('pending', 'running')):
+    """Mark a job failed unless it already finished."""
+    return AnalysisJob.objects.filter(id=job_id, status__in=statuses).update(
+        status='failed', error=error, finished_at=timezone.now()
+    )
+
+
+def run_job(job_id):
+    """Run a pending job and store its result or error."""
+    claimed = AnalysisJob.objects.filter(id=job_id, status='pending').update(status='running')
+    if not claimed:
+        return
+    job = AnalysisJob.objects.get(id=job_id)
+    gateway = get_gateway()
+    try:
+        result, _ = cached_analysis(job.kind, job.description, lambda d: gateway.analyze(job.kind, d))
+        if job.kind == 'meal':
+            result = {**result, 'food_items': match_food_items(result.get('food_items') or [], job.user)}
+    except Exception as e:
+        logger.exception("AI analysis job %s failed", job_id)
+        fail_job(job_id, str(e), statuses=['running'])
+    else:
+        # A job that timed out meanwhile stays failed; its client may have stopped polling
+        AnalysisJob.objects.filter(id=job_id, status='running').update(
+            status='done', result=result, finished_at=timezone.now()
+        )
+
+
+def expire_stale_job(job: AnalysisJob) -> AnalysisJob:
+    """Fail a job left pending or running past AI_JOB_TIMEOUT, e.g. by a restarted process."""
+    timeout = timedelta(seconds=settings.AI_JOB_TIMEOUT)
+    if job.status in ('pending', 'running') and job.created_at < timezone.now() - timeout:
+        fail_job(job.id, 'Analysis timed out')
+        job.refresh_from_db()
+    return job
+
+
+class JobQueue:
+    """Bounded pool of worker threads; capacity counts running and waiting jobs."""
+
+    def __init__(self, workers: int, max_pending: int, executor=None):
+        self.workers = workers
+        self.capacity = workers + max_pending
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ai-job')
+            return self._executor
+
+    def has_room(self) -> bool:
+        return self._queued < self.capacity
+
+    def submit(self, job_id) -> bool:
+        """Run a job if the queue has room; False when it is full."""
+        with self._lock:
+            if self._queued >= self.capacity:
+                return False
+            self._queued += 1
+        try:
+            self.executor.submit(self._run, job_id)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+        return True
+
+    def _run(self, job_id):
+        try:
+            run_job(job_id)
+        finally:
+            with self._lock:
+                self._queued -= 1
+            close_old_connections()
+
+    def shutdown(self):
+        """Wait for the submitted jobs to finish and stop the workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @property
+    def depth(self) -> int:
+        """Jobs submitted to this process and not finished yet."""
+        return self._queued
+
+
+job_queue = JobQueue(settings.AI_JOB_WORKERS, settings.AI_JOB_MAX_PENDING)
+
+
+def start_job(job_id):
+    """Hand a committed job to the queue, failing it if the queue cannot take it."""
+    try:
+        queued = job_queue.submit(job_id)
+    except Exception:
+        logger.exception("Could not queue AI analysis job %s", job_id)
+        fail_job(job_id, 'Could not queue the analysis', statuses=['pending'])
+        return
+    if not queued:
+        fail_job(job_id, 'Too many queued analyses', statuses=['pending'])
+
+
+def enqueue_job(kind: str, description: str, user=None):
+    """
+    Store a job and queue it once the transaction commits.
+
+    Returns:
+        The AnalysisJob, or None if the queue is full
+    """
+    if not job_queue.has_room():
+        return None
+    AnalysisJob.objects.filter(finished_at__lt=timezone.now() - JOB_RETENTION).delete()
+    job = AnalysisJob.objects.create(
+        kind=kind, description=description,
+        user=user if user is not None and user.is_authenticated else None
+    )
+    transaction.on_commit(lambda: start_job(job.id))
+    return job
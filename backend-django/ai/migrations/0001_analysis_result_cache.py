@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-17 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisResult',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=64)),
+                ('description', models.TextField()),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+                ('hits', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='analysis_last_used_idx')],
+                'unique_together': {('kind', 'key')},
+            },
+        ),
+    ]
@@ -1,3 +1,46 @@
+import uuid
 from django.db import models
 
-# Create your models here.
+
+class AnalysisResult(models.Model):
+    """Cached result of an AI analysis, keyed on the normalized description (see ai.cache)."""
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=20)  # food, meal or exercise
+    key = models.CharField(max_length=64)  # sha256 of the normalized description
+    description = models.TextField()  # Normalized description
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    hits = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['kind', 'key']
+        indexes = [
+            # LRU eviction drops the least recently used rows first
+            models.Index(fields=['last_used_at'], name='analysis_last_used_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.key}"
+
+
+class AnalysisJob(models.Model):
+    """An analysis queued through the jobs API and run by the worker pool (see ai.jobs)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='analysis_jobs', null=True, blank=True)
+    kind = models.CharField(max_length=20)  # food, meal or exercise
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
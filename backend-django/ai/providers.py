@@ -0,0 +1,377 @@
+"""
+Pluggable AI providers behind a shared gateway.
+
+A Provider analyzes one description of a kind (food, meal item, exercise).
+StubProvider runs the placeholder analyzers of ai.analysis in-process after
+an artificial latency. HTTPProvider POSTs to a model server over a pool of
+keep-alive connections.
+
+The ProviderGateway wraps the configured provider with:
+- a global semaphore limiting concurrent calls (AI_MAX_CONCURRENCY); callers
+  wait at most AI_QUEUE_TIMEOUT for a slot,
+- a per-call timeout (AI_CALL_TIMEOUT),
+- a circuit breaker: after AI_BREAKER_THRESHOLD consecutive failures, calls
+  skip the provider for AI_BREAKER_COOLDOWN seconds,
+- fallback to the heuristic analyzers whenever the provider is skipped,
+  saturated or failing. Fallback results carry "fallback": true and are not
+  cached (see ai.cache),
+- parallel fan-out of meal descriptions into one food analysis per item,
+- latency, queue depth and breaker stats.
+"""
+import http.client
+import json
+import math
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlsplit
+from django.conf import settings
+from .analysis import ANALYZERS
+
+# Latencies kept per provider for the percentiles in the stats
+LATENCY_WINDOW = 1000
+
+# Keys of a food analysis copied into a meal's food items
+MEAL_ITEM_KEYS = ['name', 'serving_size', 'serving_unit', 'calories_per_serving', 'protein_g', 'carbs_g', 'fat_g']
+MEAL_TOTAL_KEYS = {
+    'total_calories': 'calories_per_serving',
+    'total_protein_g': 'protein_g',
+    'total_carbs_g': 'carbs_g',
+    'total_fat_g': 'fat_g',
+}
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+# Numbers a provider answer must hold as JSON numbers (or null), per kind
+NUMERIC_KEYS = {
+    'food': [
+        'serving_size', 'calories_per_serving', 'protein_g', 'carbs_g', 'fat_g',
+        'fiber_g', 'sugar_g', 'sodium_mg', 'confidence',
+    ],
+    'meal': ['total_calories', 'total_protein_g', 'total_carbs_g', 'total_fat_g', 'confidence'],
+    'exercise': ['confidence'],
+}
+
+_MEAL_SPLIT_RE = re.compile(r',|;|\+|&|\band\b|\bwith\b', re.IGNORECASE)
+
+
+class ProviderError(Exception):
+    pass
+
+
+class Provider:
+    """Analyzes one description; raises on failure or when the call exceeds timeout."""
+    name = 'provider'
+
+    def analyze(self, kind: str, description: str, timeout: float) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class StubProvider(Provider):
+    """The placeholder analyzers with an artificial latency, for offline load tests."""
+    name = 'stub'
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+
+    def analyze(self, kind, description, timeout):
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stub analysis exceeded {timeout}s")
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return ANALYZERS[kind](description)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one host, reused across calls."""
+
+    def __init__(self, url: str, size: int):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def get(self, timeout: float):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self.connection_class(self.host, self.port, timeout=timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def put(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HTTPProvider(Provider):
+    """
+    A model server answering POST {url}/analyze with {"kind", "description"}
+    by the analysis as JSON.
+    """
+    name = 'http'
+
+    def __init__(self, url: str, pool_size: int = 4):
+        self.url = url.rstrip('/')
+        self.path = urlsplit(self.url).path + '/analyze'
+        self.pool = ConnectionPool(self.url, pool_size)
+
+    def analyze(self, kind, description, timeout):
+        body = json.dumps({'kind': kind, 'description': description})
+        connection = self.pool.get(timeout)
+        try:
+            connection.request('POST', self.path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            payload = response.read()
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.put(connection)
+        if response.status != 200:
+            raise ProviderError(f"{self.name} answered {response.status}")
+        return json.loads(payload)
+
+    def close(self):
+        self.pool.close()
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; once `cooldown` seconds have
+    passed, lets one trial call through (half open) and closes if it succeeds.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return 'half_open'
+            return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def cancel_trial(self):
+        """Give back a trial call allowed while half open that never reached the provider."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class ProviderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = dict.fromkeys(['calls', 'failures', 'timeouts', 'fallbacks', 'rejected'], 0)
+        self.waiting = 0
+        self.in_flight = 0
+
+    def incr(self, field: str):
+        with self._lock:
+            self.counts[field] += 1
+
+    def add(self, field: str, amount: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            data = {**self.counts, 'queue_depth': self.waiting, 'in_flight': self.in_flight}
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+        data['latency_ms'] = {
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        }
+        return data
+
+
+def check_result(provider: Provider, kind: str, result) -> dict:
+    """A provider answer, or ProviderError if it is not an object or holds a non-numeric amount."""
+    if not isinstance(result, dict):
+        raise ProviderError(f"{provider.name} answered {type(result).__name__}, not an object")
+    for key in NUMERIC_KEYS.get(kind, []):
+        value = result.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ProviderError(f"{provider.name} answered a non-numeric {key}: {value!r}")
+    return result
+
+
+def split_meal(description: str) -> List[str]:
+    parts = [part.strip() for part in _MEAL_SPLIT_RE.split(description or '')]
+    return [part for part in parts if part] or [description or '']
+
+
+class ProviderGateway:
+    def __init__(self, provider: Provider, max_concurrency: int, call_timeout: float, queue_timeout: float,
+                 breaker: CircuitBreaker):
+        self.provider = provider
+        self.call_timeout = call_timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+        self.stats = ProviderStats()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._fanout = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ai-fanout')
+
+    def fallback(self, kind: str, description: str) -> dict:
+        self.stats.incr('fallbacks')
+        return {**ANALYZERS[kind](description), 'fallback': True}
+
+    def call(self, kind: str, description: str) -> dict:
+        """One provider call under the concurrency limit, timeout and breaker."""
+        if not self.breaker.allow():
+            return self.fallback(kind, description)
+
+        self.stats.add('waiting', 1)
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        self.stats.add('waiting', -1)
+        if not acquired:
+            # Saturation is not the provider's fault; leave the breaker alone
+            self.stats.incr('rejected')
+            self.breaker.cancel_trial()
+            return self.fallback(kind, description)
+
+        self.stats.add('in_flight', 1)
+        self.stats.incr('calls')
+        started = time.monotonic()
+        try:
+            result = check_result(self.provider, kind, self.provider.analyze(kind, description, self.call_timeout))
+        except Exception as e:
+            self.stats.incr('timeouts' if isinstance(e, TimeoutError) else 'failures')
+            self.breaker.record_failure()
+            return self.fallback(kind, description)
+        finally:
+            self.stats.add('in_flight', -1)
+            self._slots.release()
+        self.stats.record_latency(time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+
+    def analyze(self, kind: str, description: str) -> dict:
+        if kind == 'meal':
+            return self.analyze_meal(description)
+        return self.call(kind, description)
+
+    def analyze_meal(self, description: str) -> dict:
+        """Analyze every item of a meal description in parallel and add them up."""
+        parts = split_meal(description)
+        foods = list(self._fanout.map(lambda part: self.call('food', part), parts))
+        items = [{key: food.get(key) for key in MEAL_ITEM_KEYS} for food in foods]
+        words = set(re.findall(r'\w+', (description or '').lower()))
+        result = {
+            'name': description.title() if description else 'Unknown Meal',
+            'meal_type': next((t for t in MEAL_TYPES if t in words), 'lunch'),
+            'food_items': items,
+            **{
+                total: round(sum(float(food.get(key) or 0) for food in foods), 2)
+                for total, key in MEAL_TOTAL_KEYS.items()
+            },
+            'confidence': min(float(food.get('confidence') or 0) for food in foods),
+        }
+        if any(food.get('fallback') for food in foods):
+            result['fallback'] = True
+        return result
+
+    def snapshot(self) -> Dict[str, object]:
+        return {'provider': self.provider.name, 'breaker': self.breaker.state, **self.stats.snapshot()}
+
+    def close(self):
+        self._fanout.shutdown(wait=False)
+        self.provider.close()
+
+
+def build_provider() -> Provider:
+    if settings.AI_PROVIDER == 'http':
+        return HTTPProvider(settings.AI_PROVIDER_URL, settings.AI_HTTP_POOL_SIZE)
+    return StubProvider(settings.AI_STUB_LATENCY)
+
+
+def build_gateway(provider: Provider = None) -> ProviderGateway:
+    return ProviderGateway(
+        provider or build_provider(),
+        max_concurrency=settings.AI_MAX_CONCURRENCY,
+        call_timeout=settings.AI_CALL_TIMEOUT,
+        queue_timeout=settings.AI_QUEUE_TIMEOUT,
+        breaker=CircuitBreaker(settings.AI_BREAKER_THRESHOLD, settings.AI_BREAKER_COOLDOWN),
+    )
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> ProviderGateway:
+    """The process-wide gateway, built from settings on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = build_gateway()
+        return _gateway
+
+
+def set_gateway(gateway: ProviderGateway = None):
+    """Replace the process-wide gateway (None rebuilds it from settings on next use)."""
+    global _gateway
+    with _gateway_lock:
+        old, _gateway = _gateway, gateway
+    if old is not None and old is not gateway:
+        old.close()
@@ -1,3 +1,402 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ai import cache, providers
+from ai.fake_server import FakeModelServer
+from ai.models import AnalysisResult
+from users.models import User
 
-# Create your tests here.
+
+class TestAnalysisCache(TestCase):
+    """Test caching and coalescing of AI analyses."""
+
+    def setUp(self):
+        cache.clear()
+        cache.stats.reset()
+        self.client = APIClient()
+
+    def analyze(self, description, name="analyze-food"):
+        response = self.client.post(reverse(name), {"description": description}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_normalized_descriptions_share_a_result(self):
+        self.assertEqual(cache.normalize_description("  Chicken   Breast, 150 G! "), "chicken breast 150g")
+        self.assertEqual(self.analyze("chicken breast 150g")["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.analyze("Chicken  breast 150 g.")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["name"], "Chicken Breast 150G")
+
+        # Kinds are cached separately
+        self.assertEqual(self.analyze("chicken breast 150g", "analyze-meal")["X-Cache"], "MISS")
+        self.assertEqual(cache.stats.snapshot()["misses"], 2)
+        self.assertEqual(cache.stats.snapshot()["memory_hits"], 1)
+
+    def test_results_persist_across_restarts(self):
+        self.analyze("oatmeal")
+        cache.memory_cache.clear()
+        with mock.patch.dict(cache_analyzers(), {"food": mock.Mock(side_effect=AssertionError)}):
+            self.assertEqual(self.analyze("Oatmeal")["X-Cache"], "HIT")
+        row = AnalysisResult.objects.get()
+        self.assertEqual((row.description, row.hits), ("oatmeal", 1))
+        self.assertEqual(cache.stats.snapshot()["db_hits"], 1)
+
+    def test_ttl_and_lru_eviction(self):
+        self.analyze("apple")
+        AnalysisResult.objects.update(created_at=timezone.now() - cache.TTL - timedelta(minutes=1))
+        cache.memory_cache.clear()
+        self.assertEqual(self.analyze("apple")["X-Cache"], "MISS")
+
+        with mock.patch.object(cache, "MAX_ENTRIES", 2):
+            self.analyze("banana")
+            AnalysisResult.objects.filter(description="apple").update(last_used_at=timezone.now() + timedelta(minutes=1))
+            self.analyze("cherry")
+        self.assertEqual(set(AnalysisResult.objects.values_list("description", flat=True)), {"apple", "cherry"})
+        self.assertEqual(cache.stats.snapshot()["evictions"], 1)
+
+    def test_memory_entries_expire_with_their_row(self):
+        self.analyze("pear")
+        # Served from the row one minute before it expires
+        AnalysisResult.objects.update(created_at=timezone.now() - cache.TTL + timedelta(minutes=1))
+        cache.memory_cache.clear()
+        self.assertEqual(self.analyze("pear")["X-Cache"], "HIT")
+
+        key = ("food", cache.cache_key("pear"))
+        with mock.patch("food.barcode.time.monotonic", return_value=time.monotonic() + 59):
+            self.assertIsNotNone(cache.memory_cache.get(key))
+        with mock.patch("food.barcode.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.memory_cache.get(key))
+
+        # Fresh results stay in memory for MEMORY_TTL at most
+        self.analyze("plum")
+        later = time.monotonic() + cache.MEMORY_TTL.total_seconds() + 1
+        with mock.patch("food.barcode.time.monotonic", return_value=later):
+            self.assertIsNone(cache.memory_cache.get(("food", cache.cache_key("plum"))))
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.analyze("rice")
+        url = reverse("ai-cache-stats")
+        user = User.objects.create_user(username="aiuser", email="ai@test.com", password="pass")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        admin = User.objects.create_superuser(username="aiadmin", email="aiadmin@test.com", password="pass")
+        self.client.force_authenticate(user=admin)
+        data = self.client.get(url).data
+        self.assertEqual((data["misses"], data["entries"]), (1, 1))
+
+    def test_meal_items_are_matched_to_foods_visible_to_the_user(self):
+        from food import matching
+        from food.models import FoodItem
+        matching.invalidate_index()
+        self.addCleanup(matching.invalidate_index)
+        user = User.objects.create_user(username="mealmatch", email="mealmatch@test.com", password="pass")
+        values = {"serving_size": 100, "serving_unit": "g", "calories": 100}
+        eggs = FoodItem.objects.create(name="Eggs", source="canonical", **values)
+        rice = FoodItem.objects.create(name="Brown Rice", user=user, source="user", **values)
+
+        def matches():
+            response = self.analyze("2 eggs and brown rice", "analyze-meal")
+            return [(item["food_id"], item["match_confidence"]) for item in response.data["food_items"]]
+
+        self.assertEqual(matches(), [(eggs.pk, 1.0), (None, None)])
+        # The cached analysis is shared; matches follow the requesting user
+        self.client.force_authenticate(user=user)
+        self.assertEqual(matches(), [(eggs.pk, 1.0), (rice.pk, 1.0)])
+        self.assertNotIn("food_id", AnalysisResult.objects.get().result["food_items"][0])
+
+
+def cache_analyzers():
+    from ai import analysis
+    return analysis.ANALYZERS
+
+
+class TestSingleFlight(TestCase):
+    def test_concurrent_calls_share_one_run(self):
+        flights = cache.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flights.do("key", slow))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        # Followers are blocked on the leader's run
+        self.assertEqual(len(results), 0)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("result", False)] + [("result", True)] * 3)
+        # The next call runs again
+        self.assertEqual(flights.do("key", lambda: "again"), ("again", False))
+
+    def test_errors_propagate_and_release_the_key(self):
+        flights = cache.SingleFlight()
+        with self.assertRaises(ValueError):
+            flights.do("key", mock.Mock(side_effect=ValueError))
+        self.assertEqual(flights.do("key", lambda: 1), (1, False))
+
+
+class TestAnalysisJobs(TransactionTestCase):
+    """Test queueing analyses and polling their results."""
+
+    def setUp(self):
+        from ai import jobs
+        cache.clear()
+        self.queue = jobs.JobQueue(workers=1, max_pending=1)
+        patcher = mock.patch.object(jobs, "job_queue", self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Jobs still running would write while the test database is flushed
+        self.addCleanup(self.queue.shutdown)
+        self.client = APIClient()
+
+    def create(self, description, kind="food", status=202):
+        response = self.client.post(reverse("ai-jobs"), {"kind": kind, "description": description}, format="json")
+        self.assertEqual(response.status_code, status)
+        return response.data
+
+    def drain(self):
+        # Polling while a worker writes can hit "table is locked" on the shared in-memory database
+        deadline = time.monotonic() + 5
+        while self.queue.depth:
+            if time.monotonic() > deadline:
+                self.fail("queued jobs did not finish")
+            time.sleep(0.01)
+
+    def wait(self, job_id):
+        self.drain()
+        data = self.client.get(reverse("ai-job-detail", kwargs={"job_id": job_id})).data
+        if data["status"] not in ("done", "failed"):
+            self.fail(f"job {job_id} did not finish")
+        return data
+
+    def test_jobs_run_on_a_bounded_pool(self):
+        from ai import jobs
+        gate = threading.Event()
+        run_job = jobs.run_job
+
+        def held(job_id):
+            gate.wait(5)
+            run_job(job_id)
+
+        with mock.patch.object(jobs, "run_job", held):
+            first = self.create("grilled salmon")
+            self.assertEqual(first["status"], "pending")
+            second = self.create("rice and beans", kind="meal")
+            # One job runs and one waits; the queue is full
+            self.assertEqual(self.create("toast", status=503)["error"], "Too many queued analyses, try again later")
+            gate.set()
+
+        done = self.wait(first["id"])
+        self.assertEqual(done["result"]["name"], "Grilled Salmon")
+        self.assertIsNotNone(done["finished_at"])
+        self.assertEqual(self.wait(second["id"])["result"]["meal_type"], "lunch")
+        self.assertEqual(self.queue.depth, 0)
+        self.create("toast")
+
+    def test_rolled_back_and_unsubmitted_jobs_hold_no_slot(self):
+        from django.db import transaction
+        from ai import jobs
+        for _ in range(self.queue.capacity + 1):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.assertIsNotNone(jobs.enqueue_job("food", "toast"))
+                raise RuntimeError("rollback")
+        self.assertEqual(self.queue.depth, 0)
+
+        broken = jobs.JobQueue(workers=1, max_pending=0, executor=mock.Mock(**{"submit.side_effect": RuntimeError}))
+        with mock.patch.object(jobs, "job_queue", broken):
+            job = self.create("toast")
+        self.assertEqual(broken.depth, 0)
+        self.assertEqual(self.wait(job["id"])["error"], "Could not queue the analysis")
+        self.assertEqual(self.wait(self.create("toast")["id"])["status"], "done")
+
+    def test_stale_jobs_fail_when_polled(self):
+        from ai.models import AnalysisJob
+        job = AnalysisJob.objects.create(kind="food", description="toast", status="running")
+        url = reverse("ai-job-detail", kwargs={"job_id": job.id})
+        self.assertEqual(self.client.get(url).data["status"], "running")
+
+        AnalysisJob.objects.filter(id=job.id).update(created_at=timezone.now() - timedelta(hours=1))
+        data = self.client.get(url).data
+        self.assertEqual((data["status"], data["error"]), ("failed", "Analysis timed out"))
+        self.assertIsNotNone(data["finished_at"])
+
+    def test_failed_jobs_and_visibility(self):
+        with mock.patch("ai.providers.ProviderGateway.analyze", side_effect=RuntimeError("model down")):
+            job = self.create("pizza")
+            self.assertEqual(self.wait(job["id"])["error"], "model down")
+
+        self.create("pizza", kind="drink", status=400)
+        user = User.objects.create_user(username="jobuser", email="job@test.com", password="pass")
+        self.client.force_authenticate(user=user)
+        private = self.create("bagel")
+        self.drain()
+        self.client.force_authenticate(user=None)
+        url = reverse("ai-job-detail", kwargs={"job_id": private["id"]})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+def make_gateway(provider, max_concurrency=4, call_timeout=1, queue_timeout=1, threshold=2, cooldown=60):
+    gateway = providers.ProviderGateway(
+        provider, max_concurrency=max_concurrency, call_timeout=call_timeout, queue_timeout=queue_timeout,
+        breaker=providers.CircuitBreaker(threshold, cooldown)
+    )
+    return gateway
+
+
+class TestProviderGateway(SimpleTestCase):
+    """Test the provider gateway against the fake model server."""
+
+    def setUp(self):
+        self.server = FakeModelServer().start()
+        self.addCleanup(self.server.stop)
+        self.provider = providers.HTTPProvider(self.server.url, pool_size=2)
+        self.addCleanup(self.provider.close)
+
+    def test_http_calls_reuse_pooled_connections(self):
+        gateway = make_gateway(self.provider)
+        for _ in range(5):
+            self.assertEqual(gateway.analyze("food", "apple")["name"], "Apple")
+        self.assertEqual((self.server.requests, self.server.connections), (5, 1))
+        stats = gateway.snapshot()
+        self.assertEqual((stats["provider"], stats["calls"], stats["fallbacks"]), ("http", 5, 0))
+        self.assertIsNotNone(stats["latency_ms"]["p95"])
+
+    def test_timeouts_fall_back_to_the_heuristic(self):
+        self.server.latency = 0.5
+        gateway = make_gateway(self.provider, call_timeout=0.05)
+        result = gateway.analyze("exercise", "bench press")
+        self.assertTrue(result["fallback"])
+        self.assertEqual(result["name"], "Bench Press")
+        self.assertEqual(gateway.snapshot()["timeouts"], 1)
+
+    def test_malformed_replies_fall_back_to_the_heuristic(self):
+        gateway = make_gateway(self.provider, threshold=5)
+        for payload in (["not", "an", "object"], "apple", 42):
+            self.server.payload = payload
+            result = gateway.analyze("food", "apple")
+            self.assertTrue(result["fallback"])
+            self.assertEqual(result["name"], "Apple")
+        self.assertEqual(gateway.snapshot()["failures"], 3)
+
+        # Missing numbers count as zero in meal totals
+        self.server.payload = {"name": "Apple", "calories_per_serving": None, "protein_g": 1, "confidence": None}
+        meal = gateway.analyze("meal", "apple and pear")
+        self.assertNotIn("fallback", meal)
+        self.assertEqual((meal["total_calories"], meal["total_protein_g"], meal["confidence"]), (0, 2, 0))
+
+    def test_non_numeric_fields_count_as_failures(self):
+        class BadFieldProvider(providers.StubProvider):
+            def analyze(self, kind, description, timeout):
+                return {**super().analyze(kind, description, timeout), "calories_per_serving": "n/a"}
+
+        gateway = make_gateway(BadFieldProvider(), threshold=2)
+        meal = gateway.analyze("meal", "eggs and toast")
+        self.assertTrue(meal["fallback"])
+        self.assertEqual(meal["total_calories"], 300)
+        stats = gateway.snapshot()
+        self.assertEqual((stats["failures"], stats["fallbacks"], stats["breaker"]), (2, 2, "open"))
+
+    def test_circuit_breaker_skips_a_failing_provider(self):
+        self.server.fail = True
+        gateway = make_gateway(self.provider, threshold=2, cooldown=0.2)
+        for _ in range(4):
+            self.assertTrue(gateway.analyze("food", "apple")["fallback"])
+        # Two failures opened the breaker; the other calls never reached the server
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(gateway.snapshot()["breaker"], "open")
+
+        time.sleep(0.25)
+        self.server.fail = False
+        self.assertNotIn("fallback", gateway.analyze("food", "apple"))
+        self.assertEqual(gateway.snapshot()["breaker"], "closed")
+
+    def test_concurrency_limit(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        class CountingProvider(providers.StubProvider):
+            def analyze(self, kind, description, timeout):
+                with lock:
+                    running.append(1)
+                    peak.append(len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.pop()
+                return super().analyze(kind, description, timeout)
+
+        gateway = make_gateway(CountingProvider(), max_concurrency=2)
+        threads = [threading.Thread(target=gateway.analyze, args=("food", f"food {i}")) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(gateway.snapshot()["calls"], 6)
+
+        # Callers that cannot get a slot in time fall back instead of queueing forever
+        gateway = make_gateway(CountingProvider(latency=0.3), max_concurrency=1, queue_timeout=0.01)
+        slow = threading.Thread(target=gateway.analyze, args=("food", "slow"))
+        slow.start()
+        time.sleep(0.05)
+        self.assertTrue(gateway.analyze("food", "fast")["fallback"])
+        slow.join(5)
+        self.assertEqual(gateway.snapshot()["rejected"], 1)
+
+    def test_meal_items_are_analyzed_in_parallel(self):
+        self.server.latency = 0.1
+        gateway = make_gateway(self.provider)
+        started = time.monotonic()
+        meal = gateway.analyze("meal", "Eggs, toast and orange juice for breakfast")
+        self.assertLess(time.monotonic() - started, 0.25)
+        self.assertEqual([item["name"] for item in meal["food_items"]], ["Eggs", "Toast", "Orange Juice For Breakfast"])
+        self.assertEqual(meal["meal_type"], "breakfast")
+        self.assertEqual(meal["total_calories"], 450)
+        self.assertEqual(self.server.requests, 3)
+
+
+class TestProviderEndpoints(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.addCleanup(providers.set_gateway, None)
+
+    def test_fallback_results_are_not_cached(self):
+        with FakeModelServer(fail=True) as server:
+            providers.set_gateway(make_gateway(providers.HTTPProvider(server.url), threshold=5))
+            for _ in range(2):
+                response = self.client.post(reverse("analyze-food"), {"description": "kale"}, format="json")
+                self.assertEqual(response["X-Cache"], "MISS")
+                self.assertTrue(response.data["fallback"])
+            server.fail = False
+            response = self.client.post(reverse("analyze-food"), {"description": "kale"}, format="json")
+            self.assertNotIn("fallback", response.data)
+            response = self.client.post(reverse("analyze-food"), {"description": "kale"}, format="json")
+            self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_stats_endpoint(self):
+        providers.set_gateway(make_gateway(providers.StubProvider()))
+        self.client.post(reverse("analyze-exercise"), {"description": "squat"}, format="json")
+        admin = User.objects.create_superuser(username="statsadmin", email="statsadmin@test.com", password="pass")
+        self.client.force_authenticate(user=admin)
+        data = self.client.get(reverse("ai-provider-stats")).data
+        self.assertEqual((data["provider"], data["calls"], data["queue_depth"], data["job_queue_depth"]), ("stub", 1, 0, 0))
@@ -1,8 +1,12 @@
 from django.urls import path
-from .views import analyze_food, analyze_meal, analyze_exercise
+from .views import analyze_food, analyze_meal, analyze_exercise, cache_stats, create_job, job_detail, provider_stats
 
 urlpatterns = [
     path('analyze-food/', analyze_food, name='analyze-food'),
     path('analyze-meal/', analyze_meal, name='analyze-meal'),
     path('analyze-exercise/', analyze_exercise, name='analyze-exercise'),
+    path('cache/stats/', cache_stats, name='ai-cache-stats'),
+    path('providers/stats/', provider_stats, name='ai-provider-stats'),
+    path('jobs/', create_job, name='ai-jobs'),
+    path('jobs/<uuid:job_id>/', job_detail, name='ai-job-detail'),
 ]
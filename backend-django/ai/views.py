@@ -1,7 +1,27 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from drf_spectacular.utils import extend_schema
+from food.matching import match_food_items
+from . import cache, jobs
+from .analysis import ANALYZERS
+from .jobs import enqueue_job
+from .models import AnalysisJob, AnalysisResult
+from .providers import get_gateway
+
+
+def analysis_response(kind, description, user=None):
+    """Cached analysis of a description; X-Cache tells whether the analysis ran."""
+    if not isinstance(description, str):
+        return Response({'error': 'description must be a string'}, status=400)
+    gateway = get_gateway()
+    result, cached = cache.cached_analysis(kind, description, lambda d: gateway.analyze(kind, d))
+    if kind == 'meal':
+        # Cached results are shared by everyone; matches depend on the user's own foods
+        result = {**result, 'food_items': match_food_items(result.get('food_items') or [], user)}
+    response = Response(result)
+    response['X-Cache'] = 'HIT' if cached else 'MISS'
+    return response
 
 
 @extend_schema(
@@ -41,29 +61,17 @@ from drf_spectacular.utils import extend_schema
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def analyze_food(request):
-    description = request.data.get('description', '')
-    result = {
-        'name': description.title() if description else 'Unknown Food',
-        'serving_size': 100,
-        'serving_unit': 'g',
-        'calories_per_serving': 150,
-        'protein_g': 10,
-        'carbs_g': 20,
-        'fat_g': 5,
-        'fiber_g': 2,
-        'sugar_g': 5,
-        'sodium_mg': 300,
-        'category': 'balanced',
-        'confidence': 0.8
-    }
-    return Response(result)
+    return analysis_response('food', request.data.get('description', ''))
 
 
 @extend_schema(
     operation_id='ai_analyze_meal',
     tags=['AI'],
     summary='Analyze meal from description',
-    description='AI-powered meal analysis that breaks down into food items',
+    description=(
+        'AI-powered meal analysis that breaks down into food items. Each item carries the id of the best '
+        'matching food visible to the user (food_id) and the match confidence, both null without a match'
+    ),
     request={
         'application/json': {
             'type': 'object',
@@ -79,7 +87,23 @@ def analyze_food(request):
             'properties': {
                 'name': {'type': 'string'},
                 'meal_type': {'type': 'string'},
-                'food_items': {'type': 'array'},
+                'food_items': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'name': {'type': 'string'},
+                            'serving_size': {'type': 'number'},
+                            'serving_unit': {'type': 'string'},
+                            'calories_per_serving': {'type': 'number'},
+                            'protein_g': {'type': 'number'},
+                            'carbs_g': {'type': 'number'},
+                            'fat_g': {'type': 'number'},
+                            'food_id': {'type': 'integer', 'nullable': True},
+                            'match_confidence': {'type': 'number', 'nullable': True},
+                        },
+                    },
+                },
                 'total_calories': {'type': 'number'},
                 'total_protein_g': {'type': 'number'},
                 'total_carbs_g': {'type': 'number'},
@@ -92,23 +116,7 @@ def analyze_food(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def analyze_meal(request):
-    description = request.data.get('description', '')
-    result = {
-        'name': description.title() if description else 'Unknown Meal',
-        'meal_type': 'lunch',
-        'food_items': [
-            {'name': 'Protein Source', 'serving_size': 100, 'serving_unit': 'g',
-             'calories_per_serving': 150, 'protein_g': 25, 'carbs_g': 0, 'fat_g': 5},
-            {'name': 'Vegetable', 'serving_size': 100, 'serving_unit': 'g',
-             'calories_per_serving': 50, 'protein_g': 2, 'carbs_g': 10, 'fat_g': 0}
-        ],
-        'total_calories': 200,
-        'total_protein_g': 27,
-        'total_carbs_g': 10,
-        'total_fat_g': 5,
-        'confidence': 0.75
-    }
-    return Response(result)
+    return analysis_response('meal', request.data.get('description', ''), request.user)
 
 
 @extend_schema(
@@ -145,16 +153,138 @@ def analyze_meal(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def analyze_exercise(request):
+    return analysis_response('exercise', request.data.get('description', ''))
+
+
+@extend_schema(
+    operation_id='ai_cache_stats',
+    tags=['AI'],
+    summary='AI analysis cache statistics',
+    description='Hit/miss counters of this process and the number of persisted results',
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'memory_hits': {'type': 'integer'},
+                'db_hits': {'type': 'integer'},
+                'misses': {'type': 'integer'},
+                'coalesced': {'type': 'integer'},
+                'evictions': {'type': 'integer'},
+                'hit_rate': {'type': 'number'},
+                'entries': {'type': 'integer'},
+            },
+        }
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response({**cache.stats.snapshot(), 'entries': AnalysisResult.objects.count()})
+
+
+def job_data(job):
+    return {
+        'id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
+
+
+JOB_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'string', 'format': 'uuid'},
+        'kind': {'type': 'string', 'enum': list(ANALYZERS)},
+        'status': {'type': 'string', 'enum': [status for status, _ in AnalysisJob.STATUS_CHOICES]},
+        'result': {'type': 'object', 'nullable': True},
+        'error': {'type': 'string', 'nullable': True},
+        'created_at': {'type': 'string', 'format': 'date-time'},
+        'finished_at': {'type': 'string', 'format': 'date-time', 'nullable': True},
+    },
+}
+
+
+@extend_schema(
+    operation_id='ai_create_job',
+    tags=['AI'],
+    summary='Queue an analysis',
+    description='Queue a food, meal or exercise analysis and poll GET /api/ai/jobs/{id}/ for its result',
+    request={
+        'application/json': {
+            'type': 'object',
+            'properties': {
+                'kind': {'type': 'string', 'enum': list(ANALYZERS)},
+                'description': {'type': 'string'},
+            },
+            'required': ['kind', 'description'],
+        }
+    },
+    responses={202: JOB_SCHEMA}
+)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def create_job(request):
+    kind = request.data.get('kind')
     description = request.data.get('description', '')
-    result = {
-        'name': description.title() if description else 'Unknown Exercise',
-        'muscle_group': 'chest',
-        'equipment': 'dumbbells',
-        'description': 'A compound exercise that targets multiple muscle groups.',
-        'is_compound': True,
-        'primary_muscles': ['chest', 'triceps', 'shoulders'],
-        'secondary_muscles': ['core'],
-        'difficulty': 'intermediate',
-        'confidence': 0.85
+    if kind not in ANALYZERS:
+        return Response({'error': f"kind must be one of {', '.join(ANALYZERS)}"}, status=400)
+    if not isinstance(description, str):
+        return Response({'error': 'description must be a string'}, status=400)
+
+    job = enqueue_job(kind, description, request.user)
+    if job is None:
+        response = Response({'error': 'Too many queued analyses, try again later'}, status=503)
+        response['Retry-After'] = '5'
+        return response
+    return Response(job_data(job), status=202)
+
+
+@extend_schema(
+    operation_id='ai_get_job',
+    tags=['AI'],
+    summary='Get a queued analysis',
+    description='Status of a queued analysis, with its result once done',
+    responses={200: JOB_SCHEMA}
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def job_detail(request, job_id):
+    job = AnalysisJob.objects.filter(id=job_id).first()
+    # Jobs of signed-in users are only visible to them
+    if job is None or (job.user_id is not None and job.user_id != request.user.id):
+        return Response({'error': 'Job not found'}, status=404)
+    return Response(job_data(jobs.expire_stale_job(job)))
+
+
+@extend_schema(
+    operation_id='ai_provider_stats',
+    tags=['AI'],
+    summary='AI provider statistics',
+    description='Provider call latency, queue depth, failures, fallbacks and circuit breaker state of this process',
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'provider': {'type': 'string'},
+                'breaker': {'type': 'string', 'enum': ['closed', 'open', 'half_open']},
+                'calls': {'type': 'integer'},
+                'failures': {'type': 'integer'},
+                'timeouts': {'type': 'integer'},
+                'fallbacks': {'type': 'integer'},
+                'rejected': {'type': 'integer'},
+                'queue_depth': {'type': 'integer'},
+                'in_flight': {'type': 'integer'},
+                'job_queue_depth': {'type': 'integer'},
+                'latency_ms': {'type': 'object'},
+            },
+        }
     }
-    return Response(result)
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def provider_stats(request):
+    return Response({**get_gateway().snapshot(), 'job_queue_depth': jobs.job_queue.depth})
@@ -126,3 +126,17 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
     'DISABLE_ERRORS_AND_WARNINGS': True,
 }
+
+# AI analysis: providers and the job worker pool (see ai.providers, ai.jobs)
+AI_STUB_LATENCY = float(os.environ.get('AI_STUB_LATENCY', 0))  # seconds per analysis
+AI_JOB_WORKERS = int(os.environ.get('AI_JOB_WORKERS', 4))
+AI_JOB_MAX_PENDING = int(os.environ.get('AI_JOB_MAX_PENDING', 100))
+AI_JOB_TIMEOUT = float(os.environ.get('AI_JOB_TIMEOUT', 300))  # seconds before an unfinished job fails
+AI_PROVIDER = os.environ.get('AI_PROVIDER', 'stub')  # stub or http
+AI_PROVIDER_URL = os.environ.get('AI_PROVIDER_URL', 'http://127.0.0.1:8001')
+AI_HTTP_POOL_SIZE = int(os.environ.get('AI_HTTP_POOL_SIZE', 4))  # keep-alive connections per provider
+AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 8))  # provider calls at once, process-wide
+AI_CALL_TIMEOUT = float(os.environ.get('AI_CALL_TIMEOUT', 20))  # seconds
+AI_QUEUE_TIMEOUT = float(os.environ.get('AI_QUEUE_TIMEOUT', 5))  # seconds waiting for a call slot
+AI_BREAKER_THRESHOLD = int(os.environ.get('AI_BREAKER_THRESHOLD', 5))  # consecutive failures
+AI_BREAKER_COOLDOWN = float(os.environ.get('AI_BREAKER_COOLDOWN', 30))  # seconds
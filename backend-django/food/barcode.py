@@ -0,0 +1,86 @@
+"""
+Barcode lookup of foods.
+
+The user's own foods are looked up through the barcode index on every scan.
+Canonical foods go through an in-process LRU cache that also remembers
+barcodes with no canonical food (negative caching), since most scans repeat
+the same products. Entries are keyed on the catalogue generation, so canonical
+food writes in any process retire them (see food.catalog).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from .catalog import catalog_generation
+from .models import FoodItem
+
+CANONICAL_CACHE_SIZE = 4096
+
+# Cached value for barcodes without a canonical food
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL; without one entries stay until evicted."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """Store a value for ttl seconds (default: the cache's TTL)."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, math.inf if ttl is None else time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# (catalogue generation, barcode) -> food or _MISSING
+canonical_barcode_cache = LRUCache(CANONICAL_CACHE_SIZE)
+
+
+def canonical_food_by_barcode(code: str) -> Optional[FoodItem]:
+    key = (catalog_generation(), code)
+    food = canonical_barcode_cache.get(key)
+    if food is None:
+        food = FoodItem.objects.filter(barcode=code, source='canonical').order_by('id').first()
+        canonical_barcode_cache.set(key, food if food is not None else _MISSING)
+    return None if food is _MISSING else food
+
+
+def lookup_barcode(code: str, user=None) -> Optional[FoodItem]:
+    """
+    The food with this barcode visible to the user: their own food first, then a canonical one.
+    """
+    code = (code or '').strip()
+    if not code:
+        return None
+    if user is not None and user.is_authenticated:
+        own = FoodItem.objects.filter(barcode=code, user=user).order_by('id').first()
+        if own is not None:
+            return own
+    return canonical_food_by_barcode(code)
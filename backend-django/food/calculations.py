@@ -0,0 +1,124 @@
+"""
+Calorie, category and metabolism calculations from macronutrients.
+
+Every function takes a batch of foods as NumPy arrays and classifies them all
+at once with np.select over the thresholds below; the single-food endpoints
+run a batch of one.
+"""
+from typing import Dict, List, Sequence
+import numpy as np
+
+# Energy per gram of each macro
+KCAL_PER_G = {'protein_g': 4, 'carbs_g': 4, 'fat_g': 9}
+
+# Largest batch accepted by the batch endpoints
+MAX_BATCH_SIZE = 1000
+
+MACRO_INPUTS = ['protein_g', 'carbs_g', 'fat_g']
+METABOLISM_INPUTS = MACRO_INPUTS + ['fiber_g']
+
+
+def parse_inputs(items, fields: Sequence[str], text_fields: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    """
+    Column arrays of the given fields over a list of input dicts; missing numbers count as 0.
+
+    Raises:
+        ValueError: If the list, an item or a value is malformed
+    """
+    if not isinstance(items, list):
+        raise ValueError("items must be a list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"at most {MAX_BATCH_SIZE} items per request")
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError("each item must be an object")
+    columns = {}
+    for field in fields:
+        try:
+            columns[field] = np.array([float(item.get(field, 0)) for item in items], dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be a number")
+        if not np.isfinite(columns[field]).all():
+            raise ValueError(f"{field} must be a number")
+    for field in text_fields:
+        columns[field] = np.array([str(item.get(field) or "").lower() for item in items], dtype=str)
+    return columns
+
+
+def calculate_calories(protein_g: np.ndarray, carbs_g: np.ndarray, fat_g: np.ndarray) -> List[dict]:
+    calories = (
+        protein_g * KCAL_PER_G['protein_g'] + carbs_g * KCAL_PER_G['carbs_g'] + fat_g * KCAL_PER_G['fat_g']
+    )
+    return [
+        {"calories": c, "protein_g": p, "carbs_g": cb, "fat_g": f}
+        for c, p, cb, f in zip(calories.tolist(), protein_g.tolist(), carbs_g.tolist(), fat_g.tolist())
+    ]
+
+
+def _ratio(part: np.ndarray, total: np.ndarray) -> np.ndarray:
+    return np.divide(part, total, out=np.zeros_like(part), where=total > 0)
+
+
+def detect_category(protein_g: np.ndarray, carbs_g: np.ndarray, fat_g: np.ndarray) -> List[dict]:
+    """Category by the dominant macro: protein above 40% of the macros, carbs or fat above 50%."""
+    total = protein_g + carbs_g + fat_g
+    category = np.select(
+        [total == 0, protein_g > total * 0.4, carbs_g > total * 0.5, fat_g > total * 0.5],
+        ["unknown", "protein", "carb", "fat"],
+        default="balanced"
+    )
+    return [
+        {"category": c, "protein_ratio": p, "carb_ratio": cb, "fat_ratio": f}
+        for c, p, cb, f in zip(
+            category.tolist(),
+            _ratio(protein_g, total).tolist(), _ratio(carbs_g, total).tolist(), _ratio(fat_g, total).tolist()
+        )
+    ]
+
+
+def infer_metabolism(
+    protein_g: np.ndarray, carbs_g: np.ndarray, fat_g: np.ndarray, fiber_g: np.ndarray, food_type: np.ndarray
+) -> List[dict]:
+    """
+    Glycemic index, absorption speed, thermic effect and satiety level of each food.
+
+    Fiber decides the glycemic index of foods with carbs and fiber; otherwise
+    the food type hints at it (whole/complex: low, sugar/candy/soda: high).
+    """
+    total = protein_g + carbs_g + fat_g
+
+    def food_type_has(*words):
+        return np.logical_or.reduce([np.char.find(food_type, word) >= 0 for word in words])
+
+    glycemic_index = np.select(
+        [
+            (carbs_g > 0) & (fiber_g > 0) & (fiber_g >= 5),
+            (carbs_g > 0) & (fiber_g > 0) & (fiber_g >= 3),
+            (carbs_g > 0) & (fiber_g > 0),
+            food_type_has("whole", "complex"),
+            food_type_has("sugar", "candy", "soda"),
+        ],
+        ["low", "medium", "high", "low", "high"],
+        default="medium"
+    )
+    absorption_speed = np.select(
+        [glycemic_index == "high", glycemic_index == "low"], ["fast", "slow"], default="moderate"
+    )
+    thermic_effect = np.select(
+        [protein_g > total * 0.3, protein_g > total * 0.15], ["high", "medium"], default="low"
+    )
+
+    satiety_score = (
+        np.where(protein_g > total * 0.2, 3, 0)
+        + np.select([fiber_g >= 5, fiber_g >= 3, fiber_g > 0], [3, 2, 1], default=0)
+        + np.where(fat_g > total * 0.2, 2, 0)
+    )
+    satiety_level = np.select(
+        [satiety_score >= 6, satiety_score >= 4, satiety_score >= 2], ["very_high", "high", "moderate"], default="low"
+    )
+
+    return [
+        {"glycemic_index": g, "absorption_speed": a, "thermic_effect": t, "satiety_level": s}
+        for g, a, t, s in zip(
+            glycemic_index.tolist(), absorption_speed.tolist(), thermic_effect.tolist(), satiety_level.tolist()
+        )
+    ]
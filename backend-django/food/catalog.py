@@ -0,0 +1,97 @@
+"""
+In-memory catalogue of canonical foods.
+
+Canonical foods only change when data/generate.py or an admin runs, yet they
+make up most of every food list. The catalogue holds them serialized once: a
+dict by id and the anonymous list response as JSON bytes, so reads serve them
+without queries.
+
+Coherence across worker processes comes from CatalogGeneration, a DB counter
+bumped by triggers on every canonical food write. A process re-reads it at
+most every CHECK_INTERVAL seconds and reloads when it moved; writes made in
+this process drop the catalogue right away (see signals). The other caches of
+canonical foods (barcodes, macros) key their entries on catalog_generation(),
+so the same writes empty them too.
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+from rest_framework.renderers import JSONRenderer
+from .models import CatalogGeneration, FoodItem
+
+CHECK_INTERVAL = 5  # seconds
+
+
+class CanonicalCatalog:
+    """Serialized canonical foods as of one generation."""
+
+    def __init__(self, generation: int, foods: List[dict]):
+        self.generation = generation
+        self.foods = foods
+        self.by_id: Dict[int, dict] = {food['id']: food for food in foods}
+        self.list_json: bytes = JSONRenderer().render(foods)
+        self.checked_at = time.monotonic()
+
+
+_catalog: Optional[CanonicalCatalog] = None
+_lock = threading.Lock()
+# Incremented by invalidate_catalog so a load racing with a local write is not kept
+_invalidations = 0
+# (generation, monotonic time it was read) of catalog_generation
+_generation = None
+
+
+def current_generation() -> int:
+    return CatalogGeneration.objects.filter(id=1).values_list('generation', flat=True).first() or 0
+
+
+def catalog_generation() -> int:
+    """The generation in the DB, re-read at most every CHECK_INTERVAL seconds."""
+    global _generation
+    checked = _generation
+    if checked is not None and time.monotonic() - checked[1] < CHECK_INTERVAL:
+        return checked[0]
+    invalidations = _invalidations
+    generation = current_generation()
+    if invalidations == _invalidations:
+        _generation = (generation, time.monotonic())
+    return generation
+
+
+def load_catalog(generation: int) -> CanonicalCatalog:
+    from .serializers import FoodItemSerializer
+    foods = FoodItem.objects.filter(source='canonical').order_by('id')
+    return CanonicalCatalog(generation, list(FoodItemSerializer(foods, many=True).data))
+
+
+def get_catalog() -> CanonicalCatalog:
+    """The catalogue, reloaded if the generation in the DB moved since the last check."""
+    global _catalog
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - catalog.checked_at < CHECK_INTERVAL:
+        return catalog
+    with _lock:
+        catalog = _catalog
+        if catalog is not None and time.monotonic() - catalog.checked_at < CHECK_INTERVAL:
+            return catalog
+        invalidations = _invalidations
+        generation = current_generation()
+        if catalog is not None and catalog.generation == generation:
+            catalog.checked_at = time.monotonic()
+            return catalog
+        catalog = load_catalog(generation)
+        if invalidations == _invalidations:
+            _catalog = catalog
+        return catalog
+
+
+def catalog_holds(food_id) -> bool:
+    catalog = _catalog
+    return catalog is not None and food_id in catalog.by_id
+
+
+def invalidate_catalog():
+    """Drop the catalogue after a canonical food write in this process."""
+    global _catalog, _generation, _invalidations
+    _invalidations += 1
+    _catalog = _generation = None
@@ -0,0 +1,105 @@
+"""
+Vectorized nutrition math.
+
+Food items are loaded into NumPy arrays (grams, serving size and a macro
+matrix with one column per MACRO_FIELDS entry), the macros of every item are
+computed at once and summed into groups with bincount. A year of meals is a
+few thousand rows, so reports take one query and a handful of array ops.
+"""
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+from .models import MealFoodItem
+from .rollups import MACRO_FIELDS
+
+# Keys of a totals dict, in MACRO_FIELDS order (the daily totals format)
+TOTAL_KEYS = ['calories', 'protein_g', 'carbs_g', 'fat_g', 'fiber_g', 'sugar_g', 'sodium_mg']
+
+UNCATEGORIZED = 'uncategorized'
+
+
+def item_macros(grams: np.ndarray, serving_size: np.ndarray, macros: np.ndarray) -> np.ndarray:
+    """
+    Macros of each item: per-serving macros scaled by grams / serving size.
+
+    Args:
+        grams: (n,) grams eaten
+        serving_size: (n,) serving size of each food; items with 0 count as nothing
+        macros: (n, len(MACRO_FIELDS)) macros per serving
+
+    Returns:
+        (n, len(MACRO_FIELDS)) array
+    """
+    scale = np.divide(grams, serving_size, out=np.zeros_like(grams), where=serving_size > 0)
+    return macros * scale[:, None]
+
+
+def group_sums(group_ids: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sum the rows of values (n, k) into n_groups rows by group id."""
+    if values.shape[0] == 0:
+        return np.zeros((n_groups, values.shape[1]))
+    return np.stack(
+        [np.bincount(group_ids, weights=values[:, j], minlength=n_groups) for j in range(values.shape[1])],
+        axis=1
+    )
+
+
+def as_totals(row: np.ndarray, keys: Sequence[str] = TOTAL_KEYS) -> Dict[str, float]:
+    return dict(zip(keys, np.round(row, 2).tolist()))
+
+
+class MealItemFrame:
+    """A user's meal items over a date range as parallel arrays."""
+
+    def __init__(self, start: date, end: date, rows: List[tuple]):
+        self.start = start
+        self.end = end
+        # Columns: date, meal type, category, grams, serving size, *macros
+        numbers = np.array([row[3:] for row in rows], dtype=float).reshape(len(rows), 2 + len(MACRO_FIELDS))
+        self.day_index = np.array([row[0].toordinal() for row in rows], dtype=np.intp) - start.toordinal()
+        self.meal_types, self.meal_type_ids = np.unique(
+            np.array([row[1] for row in rows], dtype=str), return_inverse=True
+        )
+        self.categories, self.category_ids = np.unique(
+            np.array([row[2] or UNCATEGORIZED for row in rows], dtype=str), return_inverse=True
+        )
+        self.macros = item_macros(numbers[:, 0], numbers[:, 1], numbers[:, 2:])
+
+    @property
+    def n_days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def dates(self) -> List[date]:
+        return [date.fromordinal(self.start.toordinal() + offset) for offset in range(self.n_days)]
+
+    def total(self) -> Dict[str, float]:
+        return as_totals(self.macros.sum(axis=0))
+
+    def by_day(self) -> List[Dict[str, float]]:
+        """Totals of every day from start to end, zeros for days without items."""
+        return [as_totals(row) for row in group_sums(self.day_index, self.macros, self.n_days)]
+
+    def by_meal_type(self) -> Dict[str, Dict[str, float]]:
+        sums = group_sums(self.meal_type_ids, self.macros, len(self.meal_types))
+        return {str(name): as_totals(row) for name, row in zip(self.meal_types, sums)}
+
+    def by_category(self) -> Dict[str, Dict[str, float]]:
+        sums = group_sums(self.category_ids, self.macros, len(self.categories))
+        return {str(name): as_totals(row) for name, row in zip(self.categories, sums)}
+
+
+def load_meal_items(user_id: int, start: date, end: date, meal_type: Optional[str] = None) -> MealItemFrame:
+    """Load the user's meal items from start to end (inclusive) with one query."""
+    output = FloatField()
+    items = MealFoodItem.objects.filter(meal__user_id=user_id, meal__date__range=(start, end))
+    if meal_type:
+        items = items.filter(meal__meal_type=meal_type)
+    rows = items.values_list(
+        'meal__date', 'meal__meal_type', 'food__category',
+        # Floats straight from SQLite; no Decimal conversion per value
+        Cast('grams', output), Cast('food__serving_size', output),
+        *(Coalesce(Cast(f'food__{field}', output), Value(0.0), output_field=output) for field in MACRO_FIELDS)
+    )
+    return MealItemFrame(start, end, list(rows))
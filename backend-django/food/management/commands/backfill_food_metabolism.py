@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from food.metabolism import INPUT_FIELDS, METABOLISM_FIELDS, infer_rows
+from food.models import FoodItem
+
+
+class Command(BaseCommand):
+    help = "Infer the metabolism attributes (glycemic index, absorption speed, ...) food items have no value for"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Foods per batch")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Worker processes inferring batches (1 infers in this process)"
+        )
+        parser.add_argument('--source', choices=[c for c, _ in FoodItem.SOURCE_CHOICES], help="Only foods of this source")
+
+    def handle(self, *args, **options):
+        foods = FoodItem.objects.order_by('id')
+        if options['source']:
+            foods = foods.filter(source=options['source'])
+
+        batch_size = options['batch_size']
+        workers = max(options['workers'], 1)
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        total = updated = 0
+        last_id = 0
+        try:
+            while True:
+                # Read a wave of batches here; workers only compute, the DB stays in this process
+                wave = []
+                for _ in range(workers):
+                    batch = list(foods.filter(id__gt=last_id).only(*INPUT_FIELDS, *METABOLISM_FIELDS)[:batch_size])
+                    if not batch:
+                        break
+                    wave.append(batch)
+                    last_id = batch[-1].id
+                if not wave:
+                    break
+
+                rows = [[(food.id, *(getattr(food, field) for field in INPUT_FIELDS)) for food in batch] for batch in wave]
+                results = executor.map(infer_rows, rows) if executor else map(infer_rows, rows)
+                for batch, inferred in zip(wave, results):
+                    updated += self.write_batch(batch, dict(inferred))
+                    total += len(batch)
+                self.stdout.write(f"  {total} foods...")
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Inferred metabolism for {total} foods, {updated} updated"))
+
+    def write_batch(self, foods, inferred):
+        """bulk_update the foods missing attributes; stored ones may have been set by hand and are kept."""
+        stale = []
+        for food in foods:
+            attrs = {
+                field: value for field, value in inferred[food.id].items()
+                if value is not None and getattr(food, field) is None
+            }
+            if not attrs:
+                continue
+            for field, value in attrs.items():
+                setattr(food, field, value)
+            stale.append(food)
+        if stale:
+            with transaction.atomic():
+                FoodItem.objects.bulk_update(stale, METABOLISM_FIELDS)
+        return len(stale)
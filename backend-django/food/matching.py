@@ -0,0 +1,272 @@
+"""
+Fuzzy matching of analysed food names to existing food items.
+
+AI meal analyses name items in free text ("Grilled chicken breast 150 g");
+matching them to a FoodItem the user can see spares the client creating a
+duplicate food. The index holds every canonical food and every food owned by
+a user, with the name normalized (accents, quantities and units dropped,
+plurals singularized) and split into trigrams. Postings are kept per scope
+(canonical, or one user), so a lookup only reads the foods visible to that
+user.
+
+Confidence is the Jaccard similarity of the names' trigrams. Trigrams are
+taken per word, so the order of words does not matter ("Rice, brown" is
+"brown rice") while typos cost a few trigrams. Candidates come from the
+rarest query trigrams only (prefix filtering): a food reaching MIN_CONFIDENCE
+must share one of them, so a lookup touches a few short postings instead of
+every food sharing a common trigram.
+
+The index is built once per process and kept current incrementally: signals
+add, rename or remove single foods written in this process. Every
+CHECK_INTERVAL seconds a lookup compares the catalogue generation and the
+food count and largest id with the DB; foods created by other processes are
+then loaded by id, anything else (canonical writes, deletions elsewhere)
+rebuilds the index. Renames of user foods in other processes are picked up
+by the rebuild every REBUILD_INTERVAL seconds.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from django.db.models import Count, Max, Q
+from .catalog import CHECK_INTERVAL, current_generation
+from .models import FoodItem
+
+REBUILD_INTERVAL = 300  # seconds
+
+# Lowest confidence reported as a match
+MIN_CONFIDENCE = 0.5
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_QUANTITY_RE = re.compile(r'\d+[a-z]*')
+# Amounts and filler words analyses put around a food's name
+QUANTITY_WORDS = {
+    'g', 'gr', 'gram', 'grams', 'kg', 'mg', 'ml', 'l', 'oz', 'lb', 'lbs',
+    'cup', 'cups', 'tbsp', 'tsp', 'slice', 'slices', 'piece', 'pieces',
+    'serving', 'servings', 'portion', 'of', 'a', 'an', 'the', 'some',
+}
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase ASCII words of a name without quantities, plurals singularized."""
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    words = []
+    for word in _WORD_RE.findall(text):
+        if word in QUANTITY_WORDS or _QUANTITY_RE.fullmatch(word):
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return ' '.join(words)
+
+
+def trigrams(key: str) -> Set[str]:
+    """Trigrams of each word, padded so word starts weigh more than endings."""
+    grams = set()
+    for word in key.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+def scope_of(user_id: Optional[int], source: str):
+    """Postings scope of a food: None for canonical foods, else the owner; False if nobody sees it."""
+    if source == 'canonical':
+        return None
+    return user_id if user_id is not None else False
+
+
+class FoodMatchIndex:
+    """Trigrams of food names by scope, updated in place under a lock."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[int], str]], generation: int = 0):
+        """
+        Args:
+            rows: (id, name, user_id, source) of the foods to index
+            generation: CatalogGeneration the rows were read at
+        """
+        self.generation = generation
+        self.count = 0
+        self.max_id = 0
+        self.built_at = self.checked_at = time.monotonic()
+        # food id -> (scope, key, trigrams)
+        self.entries: Dict[int, tuple] = {}
+        # scope -> trigram -> food ids
+        self.postings: Dict[object, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+        for row in rows:
+            self.add(*row)
+            self.count += 1
+            self.max_id = max(self.max_id, row[0])
+
+    def add(self, food_id: int, name: str, user_id: Optional[int], source: str):
+        """Index a food, replacing what was indexed for its id."""
+        scope = scope_of(user_id, source)
+        key = normalize_name(name)
+        with self._lock:
+            self._discard(food_id)
+            if scope is False or not key:
+                return
+            grams = trigrams(key)
+            self.entries[food_id] = (scope, key, grams)
+            for gram in grams:
+                self.postings[scope][gram].add(food_id)
+
+    def remove(self, food_id: int):
+        with self._lock:
+            self._discard(food_id)
+
+    def _discard(self, food_id):
+        entry = self.entries.pop(food_id, None)
+        if entry is None:
+            return
+        scope, _, grams = entry
+        for gram in grams:
+            self.postings[scope][gram].discard(food_id)
+
+    def _candidates(self, grams: Set[str], scopes) -> Set[int]:
+        """
+        Foods sharing one of the rarest query trigrams. Similarity >= MIN_CONFIDENCE
+        needs ceil(MIN_CONFIDENCE * len(grams)) shared trigrams, so one of any
+        len(grams) - that + 1 of them.
+        """
+        postings = [self.postings[scope] for scope in scopes if scope in self.postings]
+        ranked = sorted(grams, key=lambda gram: sum(len(p.get(gram, ())) for p in postings))
+        candidates = set()
+        for gram in ranked[:len(ranked) - ceil(MIN_CONFIDENCE * len(ranked)) + 1]:
+            for p in postings:
+                candidates |= p.get(gram, set())
+        return candidates
+
+    def match(self, name: str, user_id: Optional[int] = None) -> Optional[Tuple[int, float]]:
+        """
+        The food visible to a user (canonical or their own) best matching a name.
+
+        Ties prefer the user's own foods, then shorter names.
+
+        Returns:
+            Tuple of (food id, confidence), or None below MIN_CONFIDENCE
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        grams = trigrams(key)
+        scopes = [None] if user_id is None else [None, user_id]
+
+        best = None
+        with self._lock:
+            for food_id in self._candidates(grams, scopes):
+                scope, food_key, food_grams = self.entries[food_id]
+                confidence = jaccard(grams, food_grams)
+                if confidence < MIN_CONFIDENCE:
+                    continue
+                rank = (-confidence, scope is None, len(food_key), food_id)
+                if best is None or rank < best:
+                    best = rank
+        if best is None:
+            return None
+        return best[3], round(-best[0], 3)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def indexed_foods():
+    return FoodItem.objects.filter(Q(source='canonical') | Q(user__isnull=False))
+
+
+def build_index() -> FoodMatchIndex:
+    # Fingerprint first: a food created meanwhile is indexed and loaded again, never missed
+    generation = current_generation()
+    stats = FoodItem.objects.aggregate(count=Count('id'), max_id=Max('id'))
+    index = FoodMatchIndex(indexed_foods().values_list('id', 'name', 'user_id', 'source'), generation)
+    index.count, index.max_id = stats['count'], stats['max_id'] or 0
+    return index
+
+
+_index: Optional[FoodMatchIndex] = None
+_lock = threading.Lock()
+
+
+def refresh(index: FoodMatchIndex) -> bool:
+    """Bring an index up to date with the DB; False if it has to be rebuilt."""
+    if time.monotonic() - index.built_at >= REBUILD_INTERVAL or current_generation() != index.generation:
+        return False
+    stats = FoodItem.objects.aggregate(count=Count('id'), max_id=Max('id'))
+    count, max_id = stats['count'], stats['max_id'] or 0
+    if (count, max_id) == (index.count, index.max_id):
+        return True
+    # Only creations elsewhere can be loaded by id; a deletion leaves the count short
+    new = list(FoodItem.objects.filter(id__gt=index.max_id).values_list('id', 'name', 'user_id', 'source'))
+    if count - index.count != len(new):
+        return False
+    for row in new:
+        index.add(*row)
+    index.count, index.max_id = count, max_id
+    return True
+
+
+def get_match_index() -> FoodMatchIndex:
+    """The index of this process, refreshed if CHECK_INTERVAL passed since the last check."""
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at < CHECK_INTERVAL:
+        return index
+    with _lock:
+        index = _index
+        if index is not None and time.monotonic() - index.checked_at < CHECK_INTERVAL:
+            return index
+        if index is None or not refresh(index):
+            index = _index = build_index()
+        index.checked_at = time.monotonic()
+        return index
+
+
+def food_saved(food: FoodItem, created: bool):
+    """Index a food written in this process (see signals)."""
+    index = _index
+    if index is None:
+        return
+    index.add(food.pk, food.name, food.user_id, food.source)
+    if created:
+        with _lock:
+            index.count += 1
+            index.max_id = max(index.max_id, food.pk)
+
+
+def food_deleted(food_id: int):
+    index = _index
+    if index is None:
+        return
+    index.remove(food_id)
+    with _lock:
+        index.count -= 1
+
+
+def invalidate_index():
+    """Drop the index; the next lookup rebuilds it."""
+    global _index
+    _index = None
+
+
+def match_food_items(items: List[dict], user=None) -> List[dict]:
+    """
+    Copies of analysed food items with the matching food's id and confidence,
+    both None when no food visible to the user matches.
+    """
+    user_id = user.id if user is not None and user.is_authenticated else None
+    index = get_match_index()
+    matched = []
+    for item in items:
+        match = index.match(str(item.get('name') or ''), user_id)
+        food_id, confidence = match if match else (None, None)
+        matched.append({**item, 'food_id': food_id, 'match_confidence': confidence})
+    return matched
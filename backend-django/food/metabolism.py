@@ -0,0 +1,113 @@
+"""
+Metabolism attributes of foods (glycemic index, absorption speed, insulin
+response, satiety score, protein quality), inferred from name, category and
+macros per 100g.
+
+Used when foods are seeded (data/generate.py), created or updated through the
+API, and by the backfill_food_metabolism command. The API and the command only
+fill attributes a food has no value for, so values set by hand are kept.
+"""
+
+METABOLISM_FIELDS = ['glycemic_index', 'absorption_speed', 'insulin_response', 'satiety_score', 'protein_quality']
+
+# Inputs of get_metabolism_attrs, in argument order
+INPUT_FIELDS = ['name', 'category', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'glycemic_index']
+
+
+def get_metabolism_attrs(name, category, protein, carbs, fat, fiber, sugar, glycemic_index=None):
+    """Infer metabolism attributes based on food type and macros"""
+    food_name = name.lower()
+    absorption_speed = 'moderate'
+    satiety_score = None
+    protein_quality = None
+    insulin_response = None
+    gi = glycemic_index
+
+    # High fat foods -> slower absorption, lower GI
+    if fat > 15 or food_name in ['oil', 'butter', 'cheese', 'almonds', 'peanut butter', 'walnuts', 'avocado', 'olive oil']:
+        absorption_speed = 'slow'
+        insulin_response = 20 + int(fat * 2)
+        satiety_score = 7
+    # High sugar foods -> fast absorption, high GI
+    elif (sugar and sugar > 10) or food_name in ['orange juice']:
+        absorption_speed = 'fast'
+        if not gi:
+            gi = 65 + (10 if category == 'beverage' else 0)
+        insulin_response = 75 + (5 if category == 'beverage' else 0)
+        satiety_score = 2
+    # High fiber foods -> slower absorption
+    elif fiber > 5 or food_name in ['lentils', 'black beans', 'chickpeas', 'edamame', 'oats']:
+        absorption_speed = 'slow'
+        if not gi:
+            gi = 40 + (10 if food_name in ['lentils', 'black beans'] else 0)
+        insulin_response = 40
+        satiety_score = 7
+    # Protein foods -> moderate absorption
+    elif protein > 15 or food_name in ['chicken', 'beef', 'fish', 'salmon', 'tuna', 'egg', 'eggs', 'whey', 'yogurt', 'cottage']:
+        absorption_speed = 'moderate'
+        insulin_response = 30 + 10
+        satiety_score = 8
+    # Carb foods
+    elif carbs > 20:
+        if food_name in ['rice', 'bread', 'pasta', 'quinoa']:
+            absorption_speed = 'moderate'
+            if not gi:
+                gi = 50 + (25 if food_name in ['white rice', 'pasta'] else 0)
+            insulin_response = 55
+            satiety_score = 5
+        elif 'fruit' in food_name or food_name == 'banana':
+            absorption_speed = 'fast'
+            if not gi:
+                gi = 40 + 20
+            insulin_response = 50
+            satiety_score = 4
+        else:
+            absorption_speed = 'moderate'
+            if not gi:
+                gi = 50
+            insulin_response = 50
+            satiety_score = 5
+
+    # Infer protein quality based on food type
+    complete_proteins = ['chicken', 'beef', 'turkey', 'fish', 'salmon', 'tuna', 'egg', 'eggs', 'whey', 'yogurt', 'cottage', 'cheese']
+    moderate_proteins = ['oat', 'beans', 'lentils', 'quinoa', 'soy', 'nuts', 'almond', 'walnut', 'bread', 'hummus', 'chickpeas', 'edamame']
+
+    if any(p in food_name for p in complete_proteins):
+        protein_quality = 3  # Complete proteins, best for muscle building
+    elif any(p in food_name for p in moderate_proteins):
+        protein_quality = 2  # Moderate quality plant proteins
+    elif protein > 5:
+        protein_quality = 2  # Decent protein content
+    else:
+        protein_quality = 1  # Low/incomplete protein
+
+    return {
+        'glycemic_index': gi,
+        'absorption_speed': absorption_speed,
+        'insulin_response': insulin_response,
+        'satiety_score': satiety_score,
+        'protein_quality': protein_quality,
+    }
+
+
+def infer_food_metabolism(values: dict) -> dict:
+    """
+    get_metabolism_attrs of a food given as a dict of INPUT_FIELDS.
+
+    Missing or None macros count as 0; a known glycemic index is kept.
+    """
+    return get_metabolism_attrs(
+        values.get('name') or '',
+        values.get('category'),
+        *(float(values.get(field) or 0) for field in ['protein', 'carbs', 'fat', 'fiber', 'sugar']),
+        glycemic_index=values.get('glycemic_index'),
+    )
+
+
+def infer_rows(rows):
+    """
+    (id, attributes) of every (id, *INPUT_FIELDS) row.
+
+    Free of Django imports so the backfill command can run it in worker processes.
+    """
+    return [(row[0], infer_food_metabolism(dict(zip(INPUT_FIELDS, row[1:])))) for row in rows]
@@ -0,0 +1,54 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:53
+
+from django.db import migrations
+
+# FTS5 index over food names and brands. External content table: the index
+# stores only tokens and reads rows from food_fooditem. Triggers keep it in
+# sync with every write, bulk_create/bulk_update and raw SQL included.
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE food_fooditem_fts USING fts5(
+        name, brand,
+        content='food_fooditem', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER food_fooditem_fts_ai AFTER INSERT ON food_fooditem BEGIN
+        INSERT INTO food_fooditem_fts(rowid, name, brand) VALUES (new.id, new.name, new.brand);
+    END
+    """,
+    """
+    CREATE TRIGGER food_fooditem_fts_ad AFTER DELETE ON food_fooditem BEGIN
+        INSERT INTO food_fooditem_fts(food_fooditem_fts, rowid, name, brand)
+        VALUES ('delete', old.id, old.name, old.brand);
+    END
+    """,
+    """
+    CREATE TRIGGER food_fooditem_fts_au AFTER UPDATE OF name, brand ON food_fooditem BEGIN
+        INSERT INTO food_fooditem_fts(food_fooditem_fts, rowid, name, brand)
+        VALUES ('delete', old.id, old.name, old.brand);
+        INSERT INTO food_fooditem_fts(rowid, name, brand) VALUES (new.id, new.name, new.brand);
+    END
+    """,
+    # Index the existing foods
+    "INSERT INTO food_fooditem_fts(food_fooditem_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS food_fooditem_fts_au",
+    "DROP TRIGGER IF EXISTS food_fooditem_fts_ad",
+    "DROP TRIGGER IF EXISTS food_fooditem_fts_ai",
+    "DROP TABLE IF EXISTS food_fooditem_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FTS, reverse_sql=DROP_FTS),
+    ]
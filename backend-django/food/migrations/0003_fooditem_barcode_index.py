@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0002_fooditem_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['barcode'], name='fooditem_barcode_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:59
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+MACRO_FIELDS = ['calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium']
+
+
+def backfill_daily_nutrition(apps, schema_editor):
+    """Roll up existing meal items with one grouped query."""
+    MealFoodItem = apps.get_model('food', 'MealFoodItem')
+    DailyNutrition = apps.get_model('food', 'DailyNutrition')
+    output = FloatField()
+    sums = {
+        field: Coalesce(
+            Sum(Cast('grams', output) * F(f'food__{field}') / F('food__serving_size'), output_field=output),
+            Value(0.0), output_field=output
+        )
+        for field in MACRO_FIELDS
+    }
+    rows = MealFoodItem.objects.values('meal__user_id', 'meal__date').annotate(**sums).order_by()
+    DailyNutrition.objects.bulk_create([
+        DailyNutrition(
+            user_id=row['meal__user_id'],
+            date=row['meal__date'],
+            **{field: Decimal(str(row[field])).quantize(Decimal('0.01')) for field in MACRO_FIELDS}
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0003_fooditem_barcode_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutrition',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('calories', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('protein', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('carbs', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fat', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fiber', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('sugar', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('sodium', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_nutrition', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Nutrition',
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_nutrition, migrations.RunPython.noop),
+    ]
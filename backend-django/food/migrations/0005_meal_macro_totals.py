@@ -0,0 +1,115 @@
+# Generated by Django 6.1.2 on 2026-10-17 05:02
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+MACRO_FIELDS = ['calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium']
+
+
+def backfill_totals(apps, schema_editor):
+    """Store the macro totals of existing meals and templates, one grouped query each."""
+    output = FloatField()
+    sums = {
+        field: Coalesce(
+            Sum(Cast('grams', output) * F(f'food__{field}') / F('food__serving_size'), output_field=output),
+            Value(0.0), output_field=output
+        )
+        for field in MACRO_FIELDS
+    }
+    for owner_name, item_name, owner_key in [
+        ('Meal', 'MealFoodItem', 'meal_id'),
+        ('MealTemplate', 'MealTemplateFoodItem', 'template_id'),
+    ]:
+        Owner = apps.get_model('food', owner_name)
+        Item = apps.get_model('food', item_name)
+        rows = Item.objects.values(owner_key).annotate(**sums).order_by()
+        Owner.objects.bulk_update([
+            Owner(
+                pk=row[owner_key],
+                **{f'total_{field}': Decimal(str(row[field])).quantize(Decimal('0.01')) for field in MACRO_FIELDS}
+            )
+            for row in rows
+        ], [f'total_{field}' for field in MACRO_FIELDS], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0004_daily_nutrition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meal',
+            name='total_calories',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='total_carbs',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='total_fat',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='total_fiber',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='total_protein',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='total_sodium',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='total_sugar',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_calories',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_carbs',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_fat',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_fiber',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_protein',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_sodium',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mealtemplate',
+            name='total_sugar',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.1.2 on 2026-10-17 05:12
+
+from django.db import migrations, models
+
+# Every write touching a canonical food bumps the single generation row, so
+# processes holding the canonical catalogue in memory notice bulk and raw
+# writes (e.g. data/generate.py) too.
+BUMP = "UPDATE food_cataloggeneration SET generation = generation + 1 WHERE id = 1;"
+
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER food_fooditem_catalog_ai AFTER INSERT ON food_fooditem
+    WHEN new.source = 'canonical' BEGIN {BUMP} END
+    """,
+    f"""
+    CREATE TRIGGER food_fooditem_catalog_ad AFTER DELETE ON food_fooditem
+    WHEN old.source = 'canonical' BEGIN {BUMP} END
+    """,
+    f"""
+    CREATE TRIGGER food_fooditem_catalog_au AFTER UPDATE ON food_fooditem
+    WHEN old.source = 'canonical' OR new.source = 'canonical' BEGIN {BUMP} END
+    """,
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS food_fooditem_catalog_au",
+    "DROP TRIGGER IF EXISTS food_fooditem_catalog_ad",
+    "DROP TRIGGER IF EXISTS food_fooditem_catalog_ai",
+]
+
+
+def create_generation_row(apps, schema_editor):
+    CatalogGeneration = apps.get_model('food', 'CatalogGeneration')
+    CatalogGeneration.objects.get_or_create(id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0005_meal_macro_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogGeneration',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('generation', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_generation_row, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_TRIGGERS, reverse_sql=DROP_TRIGGERS),
+    ]
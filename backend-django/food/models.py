@@ -60,11 +60,61 @@ class FoodItem(models.Model):
         null=True
     )
 
+    class Meta:
+        indexes = [
+            # Barcode scans look foods up by exact barcode
+            models.Index(fields=['barcode'], name='fooditem_barcode_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
-class Meal(models.Model):
+class CatalogGeneration(models.Model):
+    """
+    Single row counting writes to canonical foods.
+
+    Incremented by triggers on food_fooditem (see migration 0006), so bulk and
+    raw writes count too; food.catalog compares it to decide when to reload.
+    """
+    id = models.AutoField(primary_key=True)
+    generation = models.BigIntegerField(default=0)
+
+
+class MacroTotals(models.Model):
+    """
+    Denormalized macro totals of a meal or template's food items.
+
+    Written by food.rollups from the items whenever items or their foods change
+    (see signals), never by saving the owner.
+    """
+    total_calories = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_protein = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_carbs = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_fat = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_fiber = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_sugar = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_sodium = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # in mg
+
+    TOTAL_FIELDS = [
+        'total_calories', 'total_protein', 'total_carbs', 'total_fat',
+        'total_fiber', 'total_sugar', 'total_sodium',
+    ]
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Never overwrite totals with the values this instance was loaded with
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.TOTAL_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class Meal(MacroTotals):
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='meals')
     name = models.CharField(max_length=255)
@@ -101,6 +151,35 @@ class Meal(models.Model):
         return f"{self.name} - {self.date}"
 
 
+class DailyNutrition(models.Model):
+    """
+    Per-user per-day nutrition totals of all meals, a rollup of MealFoodItem rows.
+
+    Kept current by food.rollups.refresh_daily_nutrition on meal, meal item and
+    food edits (see signals). Days without meal items have no row.
+    """
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='daily_nutrition')
+    date = models.DateField()
+
+    calories = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    protein = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    carbs = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fat = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fiber = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    sugar = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    sodium = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # in mg
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'date']
+        verbose_name_plural = 'Daily Nutrition'
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}: {self.calories} kcal"
+
+
 class MealFoodItem(models.Model):
     id = models.AutoField(primary_key=True)
     meal = models.ForeignKey(Meal, on_delete=models.CASCADE, related_name='food_items')
@@ -112,7 +191,7 @@ class MealFoodItem(models.Model):
         return f"{self.meal.name} - {self.food.name}"
 
 
-class MealTemplate(models.Model):
+class MealTemplate(MacroTotals):
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='meal_templates')
     name = models.CharField(max_length=255)
@@ -0,0 +1,109 @@
+"""
+Nutrition totals of food item lists for the calculate-nutrition endpoint.
+
+Foods are resolved with one in_bulk query per request and the totals are
+computed with the vectorized food.engine. Canonical foods are looked up far
+more often than they change, so their macros are kept in an in-process cache
+keyed on the catalogue generation (see food.catalog), which canonical food
+writes in any process move.
+"""
+import math
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from .barcode import LRUCache
+from .catalog import catalog_generation
+from .engine import as_totals, group_sums, item_macros
+from .models import FoodItem
+from .rollups import MACRO_FIELDS
+
+# Response keys of the macros, in MACRO_FIELDS order
+TOTAL_KEYS = [
+    'total_calories', 'total_protein_g', 'total_carbs_g', 'total_fat_g',
+    'total_fiber_g', 'total_sugar_g', 'total_sodium_mg'
+]
+
+CANONICAL_MACROS_SIZE = 8192
+
+# (catalogue generation, food id) -> FoodRow
+canonical_macros_cache = LRUCache(CANONICAL_MACROS_SIZE)
+
+# Serving size followed by the macros per serving in MACRO_FIELDS order
+FoodRow = Tuple[float, ...]
+
+
+def food_row(food: FoodItem) -> FoodRow:
+    return (float(food.serving_size),) + tuple(float(getattr(food, field) or 0) for field in MACRO_FIELDS)
+
+
+def resolve_foods(food_ids: Iterable[int]) -> Dict[int, FoodRow]:
+    """
+    Serving size and macros by food id: canonical foods from the cache, the rest with one query.
+
+    Unknown ids are left out.
+    """
+    generation = catalog_generation()
+    rows = {}
+    missing = set()
+    for food_id in set(food_ids):
+        cached = canonical_macros_cache.get((generation, food_id))
+        if cached is None:
+            missing.add(food_id)
+        else:
+            rows[food_id] = cached
+    if missing:
+        foods = FoodItem.objects.only('source', 'serving_size', *MACRO_FIELDS).in_bulk(missing)
+        for food_id, food in foods.items():
+            rows[food_id] = food_row(food)
+            if food.source == 'canonical':
+                canonical_macros_cache.set((generation, food_id), rows[food_id])
+    return rows
+
+
+def parse_items(items) -> List[Tuple[int, float]]:
+    """
+    (food id, grams) pairs of a list of {"food_id", "grams"} dicts.
+
+    Raises:
+        ValueError: If the list or an item is malformed
+    """
+    if not isinstance(items, list):
+        raise ValueError("food_items must be a list")
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("each food item must be an object")
+        if item.get("food_id") is None:
+            continue  # Counts as an unknown food
+        try:
+            food_id = int(item["food_id"])
+            grams = float(item.get("grams", 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid food item {item}")
+        if not math.isfinite(grams):
+            raise ValueError(f"invalid food item {item}")
+        parsed.append((food_id, grams))
+    return parsed
+
+
+def calculate_meals(meals: List[List[Tuple[int, float]]]) -> Tuple[List[dict], dict]:
+    """
+    Totals of every meal and of all meals together, resolving every food in one query.
+
+    Unknown foods count as zero.
+
+    Returns:
+        Tuple of (per-meal totals, grand totals)
+    """
+    foods = resolve_foods(food_id for items in meals for food_id, _ in items)
+    known = [
+        (meal_index, grams, foods[food_id])
+        for meal_index, items in enumerate(meals)
+        for food_id, grams in items
+        if food_id in foods
+    ]
+    meal_ids = np.array([meal_index for meal_index, _, _ in known], dtype=np.intp)
+    grams = np.array([grams for _, grams, _ in known], dtype=float)
+    rows = np.array([row for _, _, row in known], dtype=float).reshape(len(known), 1 + len(MACRO_FIELDS))
+
+    sums = group_sums(meal_ids, item_macros(grams, rows[:, 0], rows[:, 1:]), len(meals))
+    return [as_totals(row, TOTAL_KEYS) for row in sums], as_totals(sums.sum(axis=0), TOTAL_KEYS)
@@ -0,0 +1,110 @@
+"""
+Stored nutrition totals: per meal, per meal template and per user per day.
+
+Totals are computed in SQL as SUM(grams * macro / serving_size) grouped by the
+owner of the items and written back in bulk, so reads never touch the items.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Tuple
+from django.db.models import F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from .models import DailyNutrition, Meal, MealFoodItem, MealTemplate, MealTemplateFoodItem
+
+# Macro fields summed into DailyNutrition, named as on FoodItem
+MACRO_FIELDS = ['calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium']
+
+TWO_PLACES = Decimal('0.01')
+
+
+def macro_sums():
+    """Aggregates summing each macro of food items scaled by grams / serving size."""
+    # grams is cast so SQLite doesn't do integer division on whole decimals
+    output = FloatField()
+    return {
+        field: Coalesce(
+            Sum(Cast('grams', output) * F(f'food__{field}') / F('food__serving_size'), output_field=output),
+            Value(0.0), output_field=output
+        )
+        for field in MACRO_FIELDS
+    }
+
+
+def daily_totals_queryset(meal_items):
+    """Group meal items by (user, day) and sum each macro."""
+    return meal_items.values('meal__user_id', 'meal__date').annotate(**macro_sums()).order_by()
+
+
+def _refresh_owner_totals(owner_model, item_model, owner_key, owner_ids):
+    owner_ids = set(owner_ids)
+    if not owner_ids:
+        return
+    totals = {
+        row[owner_key]: row
+        for row in item_model.objects.filter(
+            **{f'{owner_key}__in': owner_ids}
+        ).values(owner_key).annotate(**macro_sums()).order_by()
+    }
+    owners = []
+    for owner_id in owner_ids:
+        row = totals.get(owner_id, {})
+        owner = owner_model(pk=owner_id)
+        for field in MACRO_FIELDS:
+            setattr(owner, f'total_{field}', Decimal(str(row.get(field, 0))).quantize(TWO_PLACES))
+        owners.append(owner)
+    # bulk_update: totals are not a user edit of the owner, no save signals
+    owner_model.objects.bulk_update(owners, owner_model.TOTAL_FIELDS)
+
+
+def refresh_meal_totals(meal_ids: Iterable[int]):
+    """Recompute stored totals of the given meals: one grouped query, one bulk UPDATE."""
+    _refresh_owner_totals(Meal, MealFoodItem, 'meal_id', meal_ids)
+
+
+def refresh_template_totals(template_ids: Iterable[int]):
+    """Recompute stored totals of the given meal templates: one grouped query, one bulk UPDATE."""
+    _refresh_owner_totals(MealTemplate, MealTemplateFoodItem, 'template_id', template_ids)
+
+
+def refresh_daily_nutrition(days: Iterable[Tuple[int, object]]):
+    """
+    Recompute the rollup rows of the given (user_id, date) days.
+
+    One grouped query reads the totals, one upsert writes the days that have
+    meal items and one delete removes the rows of days that no longer do.
+    """
+    days = set(days)
+    if not days:
+        return
+
+    dates_by_user = defaultdict(set)
+    for user_id, date in days:
+        dates_by_user[user_id].add(date)
+    in_days = Q()
+    for user_id, dates in dates_by_user.items():
+        in_days |= Q(user_id=user_id, date__in=dates)
+    items_in_days = Q()
+    for user_id, dates in dates_by_user.items():
+        items_in_days |= Q(meal__user_id=user_id, meal__date__in=dates)
+
+    rows = [
+        DailyNutrition(
+            user_id=row['meal__user_id'],
+            date=row['meal__date'],
+            **{field: Decimal(str(row[field])).quantize(TWO_PLACES) for field in MACRO_FIELDS}
+        )
+        for row in daily_totals_queryset(MealFoodItem.objects.filter(items_in_days))
+    ]
+    if rows:
+        DailyNutrition.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['user', 'date'],
+            update_fields=MACRO_FIELDS + ['updated_at']
+        )
+
+    filled = Q()
+    for row in rows:
+        filled |= Q(user_id=row.user_id, date=row.date)
+    empty = DailyNutrition.objects.filter(in_days)
+    if rows:
+        empty = empty.exclude(filled)
+    empty.delete()
@@ -0,0 +1,56 @@
+"""
+Full-text food search over the food_fooditem_fts FTS5 index (see migration 0002).
+"""
+import re
+from typing import List, Optional, Tuple
+from .models import FoodItem
+
+# bm25 column weights: a match in the name counts more than one in the brand
+NAME_WEIGHT = 10.0
+BRAND_WEIGHT = 2.0
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Turn user input into an FTS5 query: every word must match as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    never interpreted. Returns None if the input has no words.
+    """
+    words = _TOKEN_RE.findall((text or '').lower())
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_foods(text: str, user=None, limit: int = 20, offset: int = 0) -> Tuple[List[FoodItem], Optional[int]]:
+    """
+    Foods matching text, best BM25 rank first, in one query.
+
+    Visible foods are canonical ones plus the user's own.
+
+    Returns:
+        Tuple of (foods on this page, offset of the next page or None)
+    """
+    query = fts_query(text)
+    if query is None:
+        return [], None
+
+    user_id = user.id if user is not None and user.is_authenticated else None
+    # Fetch one extra row to know whether there is a next page
+    foods = list(FoodItem.objects.raw(
+        """
+        SELECT f.* FROM food_fooditem_fts
+        JOIN food_fooditem f ON f.id = food_fooditem_fts.rowid
+        WHERE food_fooditem_fts MATCH %s
+          AND (f.source = 'canonical' OR f.user_id = %s)
+        ORDER BY bm25(food_fooditem_fts, %s, %s), f.id
+        LIMIT %s OFFSET %s
+        """,
+        [query, user_id, NAME_WEIGHT, BRAND_WEIGHT, limit + 1, offset]
+    ))
+    if len(foods) <= limit:
+        return foods, None
+    return foods[:limit], offset + limit
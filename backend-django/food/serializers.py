@@ -55,7 +55,22 @@ class MealFoodItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'foodId', 'grams', 'order']
 
 
-class MealSerializer(serializers.ModelSerializer):
+class MacroTotalsSerializer(serializers.ModelSerializer):
+    # Stored macro totals of all food items (see rollups.refresh_meal_totals)
+    totalCalories = FloatWithoutTrailingZerosField(source='total_calories', read_only=True)
+    totalProtein = FloatWithoutTrailingZerosField(source='total_protein', read_only=True)
+    totalCarbs = FloatWithoutTrailingZerosField(source='total_carbs', read_only=True)
+    totalFat = FloatWithoutTrailingZerosField(source='total_fat', read_only=True)
+    totalFiber = FloatWithoutTrailingZerosField(source='total_fiber', read_only=True)
+    totalSugar = FloatWithoutTrailingZerosField(source='total_sugar', read_only=True)
+    totalSodium = FloatWithoutTrailingZerosField(source='total_sodium', read_only=True)
+
+    TOTAL_FIELDS = [
+        'totalCalories', 'totalProtein', 'totalCarbs', 'totalFat', 'totalFiber', 'totalSugar', 'totalSodium'
+    ]
+
+
+class MealSerializer(MacroTotalsSerializer):
     # Include nested food items with frontend-friendly format
     food_items = MealFoodItemSerializer(many=True, read_only=True)
     # Map snake_case to camelCase
@@ -65,7 +80,9 @@ class MealSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Meal
-        fields = ['id', 'name', 'mealType', 'date', 'loggedAt', 'eventTime', 'notes', 'source', 'food_items']
+        fields = [
+            'id', 'name', 'mealType', 'date', 'loggedAt', 'eventTime', 'notes', 'source', 'food_items'
+        ] + MacroTotalsSerializer.TOTAL_FIELDS
 
 
 class MealTemplateFoodItemSerializer(serializers.ModelSerializer):
@@ -78,13 +95,13 @@ class MealTemplateFoodItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'foodId', 'grams', 'order']
 
 
-class MealTemplateSerializer(serializers.ModelSerializer):
+class MealTemplateSerializer(MacroTotalsSerializer):
     # Include nested food items with frontend-friendly format
     food_items = MealTemplateFoodItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = MealTemplate
-        fields = ['id', 'name', 'category', 'notes', 'food_items']
+        fields = ['id', 'name', 'category', 'notes', 'food_items'] + MacroTotalsSerializer.TOTAL_FIELDS
 
 
 # Serializers for function-based views
@@ -103,6 +120,16 @@ class CalorieCalculationResponseSerializer(serializers.Serializer):
     fat_g = serializers.FloatField()
 
 
+class CalorieCalculationBatchRequestSerializer(serializers.Serializer):
+    """Request serializer for batch calorie calculation endpoint"""
+    items = CalorieCalculationRequestSerializer(many=True)
+
+
+class CalorieCalculationBatchResponseSerializer(serializers.Serializer):
+    """Response serializer for batch calorie calculation endpoint"""
+    results = CalorieCalculationResponseSerializer(many=True)
+
+
 class CategoryDetectionRequestSerializer(serializers.Serializer):
     """Request serializer for category detection endpoint"""
     protein_g = serializers.FloatField(default=0)
@@ -118,6 +145,16 @@ class CategoryDetectionResponseSerializer(serializers.Serializer):
     fat_ratio = serializers.FloatField()
 
 
+class CategoryDetectionBatchRequestSerializer(serializers.Serializer):
+    """Request serializer for batch category detection endpoint"""
+    items = CategoryDetectionRequestSerializer(many=True)
+
+
+class CategoryDetectionBatchResponseSerializer(serializers.Serializer):
+    """Response serializer for batch category detection endpoint"""
+    results = CategoryDetectionResponseSerializer(many=True)
+
+
 class MetabolismInferenceRequestSerializer(serializers.Serializer):
     """Request serializer for metabolism inference endpoint"""
     protein_g = serializers.FloatField(default=0)
@@ -135,12 +172,28 @@ class MetabolismInferenceResponseSerializer(serializers.Serializer):
     satiety_level = serializers.CharField()
 
 
+class MetabolismInferenceBatchRequestSerializer(serializers.Serializer):
+    """Request serializer for batch metabolism inference endpoint"""
+    items = MetabolismInferenceRequestSerializer(many=True)
+
+
+class MetabolismInferenceBatchResponseSerializer(serializers.Serializer):
+    """Response serializer for batch metabolism inference endpoint"""
+    results = MetabolismInferenceResponseSerializer(many=True)
+
+
 class NutritionCalculationRequestSerializer(serializers.Serializer):
     """Request serializer for nutrition calculation endpoint"""
     food_items = serializers.ListField(
         child=serializers.DictField(),
+        required=False,
         help_text="List of food items with food_id and grams"
     )
+    meals = serializers.ListField(
+        child=serializers.ListField(child=serializers.DictField()),
+        required=False,
+        help_text="Several lists of food items, totalled per meal and overall"
+    )
 
 
 class NutritionCalculationResponseSerializer(serializers.Serializer):
@@ -152,3 +205,8 @@ class NutritionCalculationResponseSerializer(serializers.Serializer):
     total_fiber_g = serializers.FloatField()
     total_sugar_g = serializers.FloatField()
     total_sodium_mg = serializers.FloatField()
+    meals = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        help_text="Totals of each meal, when meals were given"
+    )
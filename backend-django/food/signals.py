@@ -0,0 +1,121 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from users.versioning import bump_data_version
+from . import matching
+from .catalog import catalog_holds, invalidate_catalog
+from .models import FoodItem, Meal, MealFoodItem, MealTemplate, MealTemplateFoodItem
+from .rollups import refresh_daily_nutrition, refresh_meal_totals, refresh_template_totals
+
+
+@receiver([post_save, post_delete], sender=Meal)
+def bump_meal_data_version(sender, instance, **kwargs):
+    bump_data_version(instance.user_id, origin=kwargs.get('origin'))
+
+
+@receiver([post_save, post_delete], sender=MealFoodItem)
+def bump_meal_food_item_data_version(sender, instance, **kwargs):
+    bump_data_version(origin=kwargs.get('origin'), meals__id=instance.meal_id)
+
+
+@receiver([post_save, post_delete], sender=FoodItem)
+def drop_canonical_catalog(sender, instance, **kwargs):
+    # Also retires the barcode and macros caches keyed on the catalogue generation.
+    # Drop it too when a food in the catalogue stopped being canonical
+    if instance.source == 'canonical' or catalog_holds(instance.pk):
+        invalidate_catalog()
+
+
+@receiver(post_save, sender=FoodItem)
+def index_saved_food(sender, instance, created, **kwargs):
+    matching.food_saved(instance, created)
+
+
+@receiver(post_delete, sender=FoodItem)
+def unindex_deleted_food(sender, instance, **kwargs):
+    matching.food_deleted(instance.pk)
+
+
+def not_refreshed_yet(keys, origin, name):
+    """Keys not refreshed yet for this deletion origin (a delete fires one signal per item)."""
+    if origin is None:
+        return set(keys)
+    refreshed = origin.__dict__.setdefault(name, set())
+    keys = set(keys) - refreshed
+    refreshed.update(keys)
+    return keys
+
+
+def refresh_days_once(days, origin=None):
+    """Refresh rollup days, once per deletion origin for cascades deleting many items of a day."""
+    refresh_daily_nutrition(not_refreshed_yet(days, origin, '_daily_nutrition_refreshed'))
+
+
+@receiver(pre_save, sender=Meal)
+def remember_meal_day(sender, instance, **kwargs):
+    # A meal moved to another day or user must leave its old day's rollup
+    instance._rollup_old_day = None
+    if instance.pk:
+        instance._rollup_old_day = Meal.objects.filter(pk=instance.pk).values_list('user_id', 'date').first()
+
+
+@receiver(post_save, sender=Meal)
+def refresh_moved_meal_days(sender, instance, created, **kwargs):
+    # A new meal has no items yet; an edit only changes totals if the day changed
+    old_day = getattr(instance, '_rollup_old_day', None)
+    new_day = (instance.user_id, instance.date)
+    if not created and old_day and old_day != new_day:
+        refresh_daily_nutrition({old_day, new_day})
+
+
+@receiver(post_delete, sender=Meal)
+def refresh_deleted_meal_day(sender, instance, **kwargs):
+    refresh_days_once({(instance.user_id, instance.date)}, kwargs.get('origin'))
+
+
+@receiver([post_save, post_delete], sender=MealFoodItem)
+def refresh_meal_item_totals(sender, instance, **kwargs):
+    origin = kwargs.get('origin')
+    # Items deleted along with their meal leave nothing to update
+    if isinstance(origin, Meal):
+        return
+    meal_ids = not_refreshed_yet([instance.meal_id], origin, '_meal_totals_refreshed')
+    if meal_ids:
+        refresh_meal_totals(meal_ids)
+
+
+@receiver([post_save, post_delete], sender=MealTemplateFoodItem)
+def refresh_template_item_totals(sender, instance, **kwargs):
+    origin = kwargs.get('origin')
+    # Items deleted along with their template leave nothing to update
+    if isinstance(origin, MealTemplate):
+        return
+    template_ids = not_refreshed_yet([instance.template_id], origin, '_template_totals_refreshed')
+    if template_ids:
+        refresh_template_totals(template_ids)
+
+
+@receiver([post_save, post_delete], sender=MealFoodItem)
+def refresh_meal_item_day(sender, instance, **kwargs):
+    origin = kwargs.get('origin')
+    # One day lookup per meal for deletes of many items
+    if not not_refreshed_yet([instance.meal_id], origin, '_meal_days_refreshed'):
+        return
+    if MealFoodItem.meal.is_cached(instance):
+        day = (instance.meal.user_id, instance.meal.date)
+    else:
+        day = Meal.objects.filter(pk=instance.meal_id).values_list('user_id', 'date').first()
+    if day:
+        refresh_days_once({day}, origin)
+
+
+@receiver(post_save, sender=FoodItem)
+def refresh_food_totals(sender, instance, created, **kwargs):
+    # Macros of a food may have changed; every meal, template and day using it is recomputed
+    if created:
+        return
+    meal_items = MealFoodItem.objects.filter(food_id=instance.pk)
+    refresh_meal_totals(meal_items.values_list('meal_id', flat=True).distinct())
+    refresh_template_totals(
+        MealTemplateFoodItem.objects.filter(food_id=instance.pk).values_list('template_id', flat=True).distinct()
+    )
+    refresh_daily_nutrition(meal_items.values_list('meal__user_id', 'meal__date').distinct())
@@ -1,3 +1,648 @@
+from unittest import mock
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from food.catalog import catalog_generation
+from food.models import FoodItem
+from users.models import User
 
-# Create your tests here.
+
+def make_food(name, brand=None, user=None, source='canonical', **macros):
+    values = {'serving_size': 100, 'serving_unit': 'g', 'calories': 100}
+    values.update(macros)
+    return FoodItem.objects.create(name=name, brand=brand, user=user, source=source, **values)
+
+
+class TestFoodSearch(TestCase):
+    """Test full-text food search."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="fooduser", email="food@test.com", password="pass")
+        self.other = User.objects.create_user(username="otherfood", email="other@test.com", password="pass")
+
+        self.oats = make_food("Rolled Oats", brand="Quaker")
+        self.oat_milk = make_food("Oat Milk", brand="Oatly")
+        self.yogurt = make_food("Greek Yogurt", brand="Fage")
+        self.own = make_food("Overnight Oats", user=self.user, source='user')
+        self.private = make_food("Secret Oat Bar", user=self.other, source='user')
+
+    def search(self, **params):
+        response = self.client.get(reverse("fooditem-search"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def names(self, **params):
+        return [f["name"] for f in self.search(**params)["results"]]
+
+    def test_prefix_words_and_brand_match(self):
+        """Every word matches as a prefix; brands are searched too but rank below names."""
+        self.assertEqual(self.names(q="greek yog"), ["Greek Yogurt"])
+        self.assertEqual(self.names(q="fage"), ["Greek Yogurt"])
+        self.assertEqual(set(self.names(q="oat")), {"Rolled Oats", "Oat Milk"})
+
+        make_food("Quaker Granola")
+        self.assertEqual(self.names(q="quaker"), ["Quaker Granola", "Rolled Oats"])
+
+    def test_visibility(self):
+        """Anonymous users see canonical foods; users also see their own, never other users' foods."""
+        self.assertNotIn("Overnight Oats", self.names(q="oats"))
+        self.client.force_authenticate(user=self.user)
+        names = self.names(q="oat")
+        self.assertIn("Overnight Oats", names)
+        self.assertNotIn("Secret Oat Bar", names)
+
+    def test_index_follows_writes(self):
+        """Renames, deletes and bulk inserts are reflected immediately."""
+        self.yogurt.name = "Skyr"
+        self.yogurt.save()
+        self.assertEqual(self.names(q="greek"), [])
+        self.assertEqual(self.names(q="skyr"), ["Skyr"])
+
+        self.oat_milk.delete()
+        self.assertEqual(self.names(q="milk"), [])
+
+        FoodItem.objects.bulk_create([
+            FoodItem(name=f"Rice Cake {i}", source='canonical', serving_size=10, serving_unit='g', calories=35)
+            for i in range(3)
+        ])
+        self.assertEqual(len(self.names(q="rice cake")), 3)
+
+    def test_pagination_and_operators_in_query(self):
+        for i in range(5):
+            make_food(f"Apple {i}")
+        first = self.search(q="apple", limit=3)
+        self.assertEqual(len(first["results"]), 3)
+        second = self.search(q="apple", limit=3, offset=first["nextOffset"])
+        self.assertEqual(len(second["results"]), 2)
+        self.assertIsNone(second["nextOffset"])
+
+        # FTS5 syntax in user input is treated as plain words
+        self.assertEqual(self.names(q='apple" OR NEAR(*'), [])
+        self.assertEqual(self.client.get(reverse("fooditem-search"), {"q": " "}).status_code, 400)
+
+
+class TestBarcodeLookup(TestCase):
+    """Test looking foods up by barcode."""
+
+    def setUp(self):
+        from food.barcode import canonical_barcode_cache
+        canonical_barcode_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="scanuser", email="scan@test.com", password="pass")
+        other = User.objects.create_user(username="otherscan", email="otherscan@test.com", password="pass")
+        self.canonical = make_food("Cola", barcode="5449000000996")
+        make_food("Private Bar", barcode="111", user=other, source='user')
+
+    def lookup(self, code):
+        return self.client.get(reverse("fooditem-barcode", kwargs={"code": code}))
+
+    def test_canonical_lookup_is_cached(self):
+        self.assertEqual(self.lookup("5449000000996").data["name"], "Cola")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup("5449000000996").data["id"], self.canonical.id)
+
+    def test_missing_barcode_is_negatively_cached(self):
+        self.assertEqual(self.lookup("000").status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup("000").status_code, 404)
+
+        # Creating a canonical food with that barcode clears the cache
+        make_food("Water", barcode="000")
+        self.assertEqual(self.lookup("000").data["name"], "Water")
+
+        # Bulk updates send no signals, like writes of other processes; the generation still moves
+        self.assertEqual(self.lookup("5449000000996").data["name"], "Cola")
+        FoodItem.objects.filter(pk=self.canonical.pk).update(barcode="000")
+        self.assertEqual(self.lookup("5449000000996").data["name"], "Cola")
+        with mock.patch("food.catalog.CHECK_INTERVAL", 0):
+            self.assertEqual(self.lookup("5449000000996").status_code, 404)
+
+    def test_visibility(self):
+        """Other users' foods are never found; the user's own food wins over a canonical one."""
+        self.assertEqual(self.lookup("111").status_code, 404)
+
+        self.client.force_authenticate(user=self.user)
+        make_food("My Cola", barcode="5449000000996", user=self.user, source='user')
+        self.assertEqual(self.lookup("5449000000996").data["name"], "My Cola")
+
+
+class TestNutritionTotals(TestCase):
+    """Test the daily nutrition rollup and the totals endpoints."""
+
+    def setUp(self):
+        from datetime import date
+        from food.models import Meal, MealFoodItem
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="totalsuser", email="totals@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.rice = make_food("Rice", serving_size=100, calories=130, carbs=28, protein=2.7)
+        self.chicken = make_food("Chicken", serving_size=100, calories=165, protein=31, fat=3.6, sodium=74)
+
+        self.day1 = date(2025, 3, 1)
+        self.day3 = date(2025, 3, 3)
+        self.lunch = Meal.objects.create(user=self.user, name="Lunch", meal_type="lunch", date=self.day1)
+        MealFoodItem.objects.create(meal=self.lunch, food=self.rice, grams=200, order=0)
+        MealFoodItem.objects.create(meal=self.lunch, food=self.chicken, grams=150, order=1)
+        dinner = Meal.objects.create(user=self.user, name="Dinner", meal_type="dinner", date=self.day3)
+        MealFoodItem.objects.create(meal=dinner, food=self.rice, grams=50, order=0)
+
+    def totals(self, start="2025-03-01", end="2025-03-03"):
+        response = self.client.get(reverse("meal-totals"), {"from": start, "to": end})
+        self.assertEqual(response.status_code, 200)
+        return response.data["days"]
+
+    def test_series_covers_every_day(self):
+        with self.assertNumQueries(1):
+            days = self.totals()
+        self.assertEqual([d["date"] for d in days], ["2025-03-01", "2025-03-02", "2025-03-03"])
+        self.assertEqual(days[0]["calories"], 260 + 247.5)
+        self.assertEqual(days[0]["protein_g"], 5.4 + 46.5)
+        self.assertEqual(days[0]["sodium_mg"], 111)
+        self.assertEqual(days[1]["calories"], 0)
+        self.assertEqual(days[2]["calories"], 65)
+
+    def test_daily_totals_endpoint_reads_rollup(self):
+        response = self.client.get(reverse("meal-daily-totals", kwargs={"date_str": "2025-03-01"}))
+        self.assertEqual(response.data["calories"], 507.5)
+        self.assertEqual(response.data["date"], "2025-03-01")
+
+    def test_rollup_follows_edits(self):
+        """Item edits, moving a meal to another day, food macro edits and deletes update the rollup."""
+        item = self.lunch.food_items.get(food=self.rice)
+        item.grams = 100
+        item.save()
+        self.assertEqual(self.totals()[0]["calories"], 130 + 247.5)
+
+        self.lunch.date = self.day3
+        self.lunch.save()
+        days = self.totals()
+        self.assertEqual(days[0]["calories"], 0)
+        self.assertEqual(days[2]["calories"], 65 + 130 + 247.5)
+
+        self.rice.calories = 100
+        self.rice.save()
+        self.assertEqual(self.totals()[2]["calories"], 50 + 100 + 247.5)
+
+        self.lunch.delete()
+        self.assertEqual(self.totals()[2]["calories"], 50)
+
+    def test_report_groups_by_day_meal_type_and_category(self):
+        from food.models import FoodItem
+        FoodItem.objects.filter(pk=self.chicken.pk).update(category='protein')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("meal-report"), {"from": "2025-03-01", "to": "2025-03-03"})
+        data = response.data
+        self.assertEqual([d["calories"] for d in data["days"]], [507.5, 0, 65])
+        self.assertEqual(data["days"][0]["protein_g"], 51.9)
+        self.assertEqual(data["total"]["calories"], 572.5)
+        self.assertEqual(data["mealTypes"]["lunch"]["calories"], 507.5)
+        self.assertEqual(data["mealTypes"]["dinner"]["calories"], 65)
+        self.assertEqual(data["categories"], {
+            "protein": {"calories": 247.5, "protein_g": 46.5, "carbs_g": 0, "fat_g": 5.4,
+                        "fiber_g": 0, "sugar_g": 0, "sodium_mg": 111},
+            "uncategorized": {"calories": 325, "protein_g": 6.75, "carbs_g": 70, "fat_g": 0,
+                              "fiber_g": 0, "sugar_g": 0, "sodium_mg": 0},
+        })
+
+        data = self.client.get(reverse("meal-report"), {"from": "2025-03-01", "to": "2025-03-03", "mealType": "dinner"}).data
+        self.assertEqual(data["total"]["calories"], 65)
+        data = self.client.get(reverse("meal-report"), {"from": "2024-01-01", "to": "2024-01-02"}).data
+        self.assertEqual(data["total"]["calories"], 0)
+        self.assertEqual(data["mealTypes"], {})
+
+    def test_invalid_ranges(self):
+        url = reverse("meal-totals")
+        self.assertEqual(self.client.get(url, {"from": "2025-03-03", "to": "2025-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "2024-01-01", "to": "2025-06-01"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "March"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("meal-report"), {"from": "March"}).status_code, 400)
+
+
+class TestMealTotals(TestCase):
+    """Test the macro totals stored on meals and meal templates."""
+
+    def setUp(self):
+        from datetime import date
+        from food.models import Meal, MealFoodItem, MealTemplate, MealTemplateFoodItem
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="mealtotals", email="mealtotals@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.rice = make_food("Rice", serving_size=100, calories=130, carbs=28, protein=2.7)
+        self.chicken = make_food("Chicken", serving_size=100, calories=165, protein=31, fat=3.6, sodium=74)
+
+        self.meal = Meal.objects.create(user=self.user, name="Lunch", meal_type="lunch", date=date(2025, 3, 1))
+        self.rice_item = MealFoodItem.objects.create(meal=self.meal, food=self.rice, grams=200, order=0)
+        MealFoodItem.objects.create(meal=self.meal, food=self.chicken, grams=150, order=1)
+        self.template = MealTemplate.objects.create(user=self.user, name="Bowl")
+        MealTemplateFoodItem.objects.create(template=self.template, food=self.rice, grams=100, order=0)
+
+    def meal_data(self):
+        return self.client.get(reverse("meal-detail", kwargs={"pk": self.meal.pk})).data
+
+    def test_totals_are_serialized(self):
+        data = self.meal_data()
+        self.assertEqual(data["totalCalories"], 507.5)
+        self.assertEqual(data["totalProtein"], 51.9)
+        self.assertEqual(data["totalSodium"], 111)
+        self.assertEqual(data["totalFiber"], 0)
+
+        data = self.client.get(reverse("mealtemplate-detail", kwargs={"pk": self.template.pk})).data
+        self.assertEqual(data["totalCalories"], 130)
+        self.assertEqual(data["totalCarbs"], 28)
+
+    def test_totals_follow_item_and_food_edits(self):
+        self.rice_item.grams = 100
+        self.rice_item.save()
+        self.assertEqual(self.meal_data()["totalCalories"], 130 + 247.5)
+
+        self.rice.calories = 100
+        self.rice.save()
+        self.assertEqual(self.meal_data()["totalCalories"], 100 + 247.5)
+        self.template.refresh_from_db()
+        self.assertEqual(float(self.template.total_calories), 100)
+
+        self.rice_item.delete()
+        self.assertEqual(self.meal_data()["totalCalories"], 247.5)
+        self.template.food_items.all().delete()
+        self.template.refresh_from_db()
+        self.assertEqual(float(self.template.total_calories), 0)
+
+    def test_deleting_many_items_refreshes_each_meal_once(self):
+        from food.models import MealFoodItem
+        MealFoodItem.objects.bulk_create([
+            MealFoodItem(meal=self.meal, food=self.chicken, grams=10, order=2 + i) for i in range(20)
+        ])
+        with self.assertNumQueries(9):
+            MealFoodItem.objects.filter(meal=self.meal, food=self.chicken).delete()
+        self.assertEqual(self.meal_data()["totalCalories"], 260)
+
+        MealFoodItem.objects.bulk_create([
+            MealFoodItem(meal=self.meal, food=self.rice, grams=10, order=30 + i) for i in range(20)
+        ])
+        # Cascades to 21 meal items and the template's item
+        with self.assertNumQueries(13):
+            self.rice.delete()
+        self.assertEqual(self.meal_data()["totalCalories"], 0)
+
+    def test_template_deletes_refresh_totals_once(self):
+        from unittest import mock
+        from food.models import MealTemplateFoodItem
+        for order in (1, 2):
+            MealTemplateFoodItem.objects.create(template=self.template, food=self.chicken, grams=100, order=order)
+        with mock.patch("food.signals.refresh_template_totals") as refresh:
+            self.template.food_items.all().delete()
+        refresh.assert_called_once_with({self.template.pk})
+        with mock.patch("food.signals.refresh_template_totals") as refresh:
+            MealTemplateFoodItem.objects.create(template=self.template, food=self.rice, grams=100, order=0)
+            self.template.delete()
+        self.assertEqual(refresh.call_count, 1)
+
+    def test_saving_stale_instance_keeps_totals(self):
+        """A full save of an instance loaded before an item edit does not overwrite the stored totals."""
+        from food.models import Meal
+        stale = Meal.objects.get(pk=self.meal.pk)
+        self.rice_item.delete()
+        stale.notes = "Post workout"
+        stale.save()
+        self.assertEqual(Meal.objects.get(pk=self.meal.pk).total_calories, 247.5)
+        self.assertEqual(self.meal_data()["notes"], "Post workout")
+
+
+class TestCalculateNutrition(TestCase):
+    """Test the calculate-nutrition endpoint."""
+
+    def setUp(self):
+        from food.nutrition import canonical_macros_cache
+        canonical_macros_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="calcuser", email="calc@test.com", password="pass")
+        self.rice = make_food("Rice", serving_size=100, calories=130, carbs=28, protein=2.7)
+        self.chicken = make_food("Chicken", serving_size=100, calories=165, protein=31, fat=3.6, sodium=74)
+        self.own = make_food("Shake", user=self.user, source='user', serving_size=30, calories=120, protein=24)
+
+    def calculate(self, data):
+        response = self.client.post(reverse("calculate-nutrition"), data, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_single_list_keeps_response_format(self):
+        data = self.calculate({"food_items": [
+            {"food_id": self.rice.id, "grams": 200},
+            {"food_id": self.chicken.id, "grams": 150},
+            {"food_id": 999999, "grams": 100},
+        ]})
+        self.assertEqual(data["total_calories"], 507.5)
+        self.assertEqual(data["total_protein_g"], 51.9)
+        self.assertEqual(data["total_sodium_mg"], 111)
+        self.assertNotIn("meals", data)
+
+    def test_meals_resolve_foods_in_one_query(self):
+        meals = {"meals": [
+            [{"food_id": food.id, "grams": 10} for food in (self.rice, self.chicken, self.own)] * 5,
+            [{"food_id": self.own.id, "grams": 60}],
+            [],
+        ]}
+        # The catalogue generation is only re-read every CHECK_INTERVAL
+        catalog_generation()
+        with self.assertNumQueries(1):
+            data = self.calculate(meals)
+        self.assertEqual([meal["total_calories"] for meal in data["meals"]], [347.5, 240, 0])
+        self.assertEqual(data["total_calories"], 587.5)
+
+        # Canonical foods are served from memory; only the user's food is queried
+        with self.assertNumQueries(1):
+            self.calculate(meals)
+        with self.assertNumQueries(0):
+            self.calculate({"food_items": [{"food_id": self.rice.id, "grams": 50}]})
+
+    def test_canonical_edits_clear_cache(self):
+        self.calculate({"food_items": [{"food_id": self.rice.id, "grams": 100}]})
+        self.rice.calories = 100
+        self.rice.save()
+        data = self.calculate({"food_items": [{"food_id": self.rice.id, "grams": 100}]})
+        self.assertEqual(data["total_calories"], 100)
+
+    def test_writes_elsewhere_are_picked_up_after_the_check_interval(self):
+        """Bulk updates send no signals, like writes of other processes; the generation still moves."""
+        self.calculate({"food_items": [{"food_id": self.rice.id, "grams": 100}]})
+        FoodItem.objects.filter(pk=self.rice.pk).update(calories=100)
+        data = self.calculate({"food_items": [{"food_id": self.rice.id, "grams": 100}]})
+        self.assertEqual(data["total_calories"], 130)
+        with mock.patch("food.catalog.CHECK_INTERVAL", 0):
+            data = self.calculate({"food_items": [{"food_id": self.rice.id, "grams": 100}]})
+        self.assertEqual(data["total_calories"], 100)
+
+    def test_invalid_items(self):
+        url = reverse("calculate-nutrition")
+        for data in (
+            {"food_items": [{"food_id": self.rice.id, "grams": "lots"}]},
+            {"food_items": [{"food_id": "rice", "grams": 10}]},
+            {"meals": [[{"food_id": self.rice.id, "grams": 10}], "rice"]},
+            {"meals": {"food_id": self.rice.id}},
+        ):
+            self.assertEqual(self.client.post(url, data, format="json").status_code, 400)
+
+
+class TestCanonicalCatalog(TestCase):
+    """Test serving canonical foods from the in-memory catalogue."""
+
+    def setUp(self):
+        from food.catalog import invalidate_catalog
+        invalidate_catalog()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cataloguser", email="catalog@test.com", password="pass")
+        self.rice = make_food("Rice", serving_size=100, calories=130)
+        self.own = make_food("My Shake", user=self.user, source='user')
+        self.oats = make_food("Oats", calories=389)
+        other = User.objects.create_user(username="othercatalog", email="othercatalog@test.com", password="pass")
+        self.private = make_food("Secret", user=other, source='user')
+
+    def names(self):
+        response = self.client.get(reverse("fooditem-list"))
+        self.assertEqual(response.status_code, 200)
+        return [food["name"] for food in response.json()]
+
+    def test_reads_serve_catalogue_without_queries(self):
+        self.assertEqual(self.names(), ["Rice", "Oats"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), ["Rice", "Oats"])
+            response = self.client.get(reverse("fooditem-detail", kwargs={"pk": self.oats.pk}))
+        self.assertEqual(response.data["calories"], 389)
+
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(), ["Rice", "My Shake", "Oats"])
+        self.assertEqual(self.client.get(reverse("fooditem-detail", kwargs={"pk": self.own.pk})).data["name"], "My Shake")
+        self.assertEqual(self.client.get(reverse("fooditem-detail", kwargs={"pk": self.private.pk})).status_code, 404)
+
+    def test_local_writes_reload(self):
+        self.names()
+        self.rice.name = "White Rice"
+        self.rice.save()
+        self.assertEqual(self.names(), ["White Rice", "Oats"])
+
+        self.oats.source = 'user'
+        self.oats.save()
+        self.assertEqual(self.names(), ["White Rice"])
+
+    def test_generation_tracks_bulk_writes_from_other_processes(self):
+        """Writes that send no signals still move the generation, picked up at the next check."""
+        from unittest import mock
+        from food import catalog
+        self.names()
+        generation = catalog.current_generation()
+        FoodItem.objects.filter(pk=self.rice.pk).update(calories=150)
+        FoodItem.objects.filter(pk=self.own.pk).update(calories=150)
+        self.assertEqual(catalog.current_generation(), generation + 1)
+
+        self.assertEqual(catalog.get_catalog().by_id[self.rice.pk]["calories"], 130)
+        with mock.patch.object(catalog, "CHECK_INTERVAL", 0):
+            self.assertEqual(catalog.get_catalog().by_id[self.rice.pk]["calories"], 150)
+
+
+class TestFoodCalculations(TestCase):
+    """Test the calorie, category and metabolism calculation endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, name, data, status=200):
+        response = self.client.post(reverse(name), data, format="json")
+        self.assertEqual(response.status_code, status)
+        return response.data
+
+    def test_single_endpoints(self):
+        self.assertEqual(self.post("calculate-calories", {"protein_g": 25, "carbs_g": 50, "fat_g": 10})["calories"], 390)
+        data = self.post("detect-category", {"protein_g": 30, "carbs_g": 10, "fat_g": 5})
+        self.assertEqual(data["category"], "protein")
+        self.assertAlmostEqual(data["protein_ratio"], 30 / 45)
+        self.assertEqual(self.post("detect-category", {})["category"], "unknown")
+        self.assertEqual(self.post("infer-metabolism", {"carbs_g": 20, "food_type": "Candy bar"}), {
+            "glycemic_index": "high", "absorption_speed": "fast", "thermic_effect": "low", "satiety_level": "low"
+        })
+        self.post("calculate-calories", {"protein_g": "lots"}, status=400)
+
+    def test_batches_match_single_results(self):
+        foods = [
+            {"protein_g": 30, "carbs_g": 10, "fat_g": 5, "fiber_g": 0},
+            {"protein_g": 5, "carbs_g": 60, "fat_g": 5, "fiber_g": 6, "food_type": "grain"},
+            {"protein_g": 2, "carbs_g": 3, "fat_g": 20, "fiber_g": 3.5},
+            {"protein_g": 10, "carbs_g": 12, "fat_g": 10, "fiber_g": 1, "food_type": "Whole wheat"},
+            {"protein_g": 0, "carbs_g": 0, "fat_g": 0, "food_type": "soda"},
+            {"carbs_g": 40, "fat_g": 1, "food_type": "complex carb"},
+        ]
+        for name in ("calculate-calories", "detect-category", "infer-metabolism"):
+            results = self.post(f"{name}-batch", {"items": foods})["results"]
+            self.assertEqual(results, [self.post(name, food) for food in foods])
+
+        metabolism = self.post("infer-metabolism-batch", {"items": foods})["results"]
+        self.assertEqual([m["glycemic_index"] for m in metabolism], ["medium", "low", "medium", "high", "high", "low"])
+        self.assertEqual([m["satiety_level"] for m in metabolism], ["moderate", "moderate", "high", "very_high", "low", "low"])
+        self.assertEqual(self.post("detect-category-batch", {"items": []})["results"], [])
+
+    def test_invalid_batches(self):
+        self.post("detect-category-batch", {"items": {"protein_g": 1}}, status=400)
+        self.post("detect-category-batch", {}, status=400)
+        self.post("calculate-calories-batch", {"items": [{"fat_g": None}]}, status=400)
+        self.post("calculate-calories-batch", {"items": [{}] * 1001}, status=400)
+
+
+class TestFoodMetabolism(TestCase):
+    """Test inferring metabolism attributes of foods."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="metabuser", email="metab@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+
+    def test_create_and_update_infer_attributes(self):
+        response = self.client.post(reverse("fooditem-list"), {
+            "name": "Lentils", "servingSize": 100, "servingType": "g",
+            "calories": 116, "protein": 9, "carbs": 20, "fat": 0.4, "fiber": 7.9, "sugar": 1.8,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        food = FoodItem.objects.get(pk=response.data["id"])
+        self.assertEqual(food.absorption_speed, "slow")
+        self.assertEqual(food.glycemic_index, 50)
+        self.assertEqual(food.satiety_score, 7)
+        self.assertEqual(food.protein_quality, 2)
+
+        # Attributes sent by the client win; stored ones are kept, missing ones inferred
+        FoodItem.objects.filter(pk=food.pk).update(insulin_response=None)
+        response = self.client.patch(reverse("fooditem-detail", kwargs={"pk": food.pk}), {
+            "name": "Lentil Chips", "fiber": 1, "fat": 20, "satietyScore": 3,
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        food.refresh_from_db()
+        self.assertEqual(food.absorption_speed, "slow")
+        self.assertEqual(food.insulin_response, 60)
+        self.assertEqual(food.satiety_score, 3)
+        self.assertEqual(food.glycemic_index, 50)
+
+        response = self.client.patch(reverse("fooditem-detail", kwargs={"pk": food.pk}), {"sugar": 30}, format="json")
+        self.assertEqual(response.status_code, 200)
+        food.refresh_from_db()
+        self.assertEqual((food.absorption_speed, food.satiety_score), ("slow", 3))
+
+    def test_backfill_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        FoodItem.objects.bulk_create([
+            FoodItem(name=f"Chicken {i}", source='canonical', serving_size=100, serving_unit='g',
+                     calories=165, protein=31, fat=3.6)
+            for i in range(5)
+        ] + [FoodItem(name="Soda", source='user', serving_size=330, serving_unit='ml', calories=140, carbs=39, sugar=39)])
+
+        out = StringIO()
+        call_command("backfill_food_metabolism", "--batch-size", "2", "--workers", "2", stdout=out)
+        self.assertIn("Inferred metabolism for 6 foods, 6 updated", out.getvalue())
+        self.assertEqual(set(FoodItem.objects.filter(name__startswith="Chicken").values_list("satiety_score", "protein_quality")), {(8, 3)})
+        soda = FoodItem.objects.get(name="Soda")
+        self.assertEqual((soda.absorption_speed, soda.glycemic_index), ("fast", 65))
+
+        out = StringIO()
+        call_command("backfill_food_metabolism", "--workers", "1", "--source", "user", stdout=out)
+        self.assertIn("Inferred metabolism for 1 foods, 0 updated", out.getvalue())
+
+    def test_backfill_keeps_values_set_by_hand(self):
+        from io import StringIO
+        from django.core.management import call_command
+        response = self.client.post(reverse("fooditem-list"), {
+            "name": "Cola", "servingSize": 330, "servingType": "ml", "calories": 140, "protein": 0, "carbs": 39, "fat": 0,
+            "sugar": 39, "glycemicIndex": 58, "absorptionSpeed": "moderate",
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        FoodItem.objects.filter(pk=response.data["id"]).update(satiety_score=None)
+
+        out = StringIO()
+        call_command("backfill_food_metabolism", "--workers", "1", stdout=out)
+        self.assertIn("Inferred metabolism for 1 foods, 1 updated", out.getvalue())
+        cola = FoodItem.objects.get(pk=response.data["id"])
+        self.assertEqual((cola.glycemic_index, cola.absorption_speed, cola.satiety_score), (58, "moderate", 2))
+
+
+class TestFoodMatching(TestCase):
+    """Test matching analysed item names to food items."""
+
+    def setUp(self):
+        from food import matching
+        self.matching = matching
+        matching.invalidate_index()
+        self.addCleanup(matching.invalidate_index)
+        self.user = User.objects.create_user(username="matchuser", email="match@test.com", password="pass")
+        other = User.objects.create_user(username="othermatch", email="othermatch@test.com", password="pass")
+        self.chicken = make_food("Chicken Breast")
+        self.rice = make_food("Brown Rice")
+        self.eggs = make_food("Eggs")
+        self.shake = make_food("Protein Shake", user=self.user, source='user')
+        self.private = make_food("Protein Shake Vanilla", user=other, source='user')
+
+    def match(self, name, user=None):
+        return self.matching.get_match_index().match(name, user.id if user else None)
+
+    def test_matches_despite_quantities_plurals_order_and_typos(self):
+        self.assertEqual(self.match("Chicken breast 150 g"), (self.chicken.pk, 1.0))
+        self.assertEqual(self.match("2 egg"), (self.eggs.pk, 1.0))
+        self.assertEqual(self.match("rice, brown"), (self.rice.pk, 1.0))
+        food_id, confidence = self.match("brwn rice")
+        self.assertEqual(food_id, self.rice.pk)
+        self.assertTrue(0.5 <= confidence < 1)
+        self.assertIsNone(self.match("Vegetable"))
+        self.assertIsNone(self.match("100 g"))
+
+    def test_only_foods_visible_to_the_user_match(self):
+        self.assertIsNone(self.match("Protein Shake"))
+        self.assertEqual(self.match("Protein Shake", self.user), (self.shake.pk, 1.0))
+        self.assertEqual(self.match("Vanilla Protein Shake", self.user)[0], self.shake.pk)
+
+    def test_local_writes_update_the_index_in_place(self):
+        index = self.matching.get_match_index()
+        bagel = make_food("Sesame Bagel", user=self.user, source='user')
+        self.shake.name = "Whey Shake"
+        self.shake.save()
+        self.private.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.match("sesame bagels", self.user), (bagel.pk, 1.0))
+            self.assertEqual(self.match("whey shake", self.user), (self.shake.pk, 1.0))
+            self.assertIsNone(self.match("protein shake", self.user))
+
+        from unittest import mock
+        with mock.patch.object(self.matching, "CHECK_INTERVAL", 0):
+            self.assertIs(self.matching.get_match_index(), index)
+
+    def test_writes_from_other_processes_are_picked_up(self):
+        from unittest import mock
+        index = self.matching.get_match_index()
+        # bulk_create sends no signals, like a write made by another process
+        FoodItem.objects.bulk_create([FoodItem(
+            name="Cottage Cheese", user=self.user, source='user', serving_size=100, serving_unit='g', calories=98
+        )])
+        with mock.patch.object(self.matching, "CHECK_INTERVAL", 0):
+            self.assertEqual(self.match("cottage cheese", self.user)[1], 1.0)
+            self.assertIs(self.matching.get_match_index(), index)
+
+            with mock.patch.object(self.matching, "food_deleted"):
+                self.chicken.delete()
+            self.assertIsNone(self.match("chicken breast"))
+            self.assertIsNot(self.matching.get_match_index(), index)
+
+    def test_lookups_take_under_a_millisecond(self):
+        import time
+        adjectives = ["grilled", "baked", "raw", "smoked", "roasted", "fried", "steamed", "dried", "fresh", "frozen"]
+        foods = ["chicken", "salmon", "potato", "apple", "rice", "bean", "oat", "yogurt", "cheese", "bread",
+                 "tomato", "spinach", "almond", "banana", "beef", "tofu", "lentil", "pasta", "egg", "carrot"]
+        styles = ["", "salad", "soup", "bowl", "wrap", "sandwich", "curry", "stew", "pie", "chips"]
+        rows = [
+            (i, f"{a} {f} {s}", i % 50 + 1, 'canonical' if i % 3 else 'user')
+            for i, (a, f, s) in enumerate(((a, f, s) for a in adjectives for f in foods for s in styles), start=1)
+        ]
+        index = self.matching.FoodMatchIndex(rows)
+        queries = ["Grilled Chicken Salad", "smoked salmn", "Fried potato chips 200 g", "Protein Source", "oats"]
+        started = time.perf_counter()
+        for _ in range(200):
+            for query in queries:
+                index.match(query, 7)
+        per_item = (time.perf_counter() - started) / (200 * len(queries))
+        self.assertEqual(len(index), 2000)
+        self.assertLess(per_item, 0.001)
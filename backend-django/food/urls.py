@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     FoodItemViewSet, MealViewSet, MealTemplateViewSet,
-    calculate_calories, detect_category, infer_metabolism, calculate_nutrition
+    calculate_calories, detect_category, infer_metabolism, calculate_nutrition,
+    calculate_calories_batch, detect_category_batch, infer_metabolism_batch
 )
 
 router = DefaultRouter()
@@ -15,5 +16,8 @@ urlpatterns = [
     path('calculations/calculate-calories/', calculate_calories, name='calculate-calories'),
     path('calculations/detect-category/', detect_category, name='detect-category'),
     path('calculations/infer-metabolism/', infer_metabolism, name='infer-metabolism'),
+    path('calculations/calculate-calories/batch/', calculate_calories_batch, name='calculate-calories-batch'),
+    path('calculations/detect-category/batch/', detect_category_batch, name='detect-category-batch'),
+    path('calculations/infer-metabolism/batch/', infer_metabolism_batch, name='infer-metabolism-batch'),
     path('calculations/calculate-nutrition/', calculate_nutrition, name='calculate-nutrition'),
 ]
@@ -1,18 +1,89 @@
+import heapq
+from operator import itemgetter
+from django.http import HttpResponse
 from rest_framework import viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Sum, F
 from drf_spectacular.utils import extend_schema
-from .models import FoodItem, Meal, MealFoodItem, MealTemplate, MealTemplateFoodItem
+from users.versioning import etag_on_data_version
+from workouts.pagination import parse_page_size
+from . import calculations
+from .barcode import lookup_barcode
+from .calculations import parse_inputs
+from .catalog import get_catalog
+from .engine import load_meal_items
+from .metabolism import INPUT_FIELDS, infer_food_metabolism
+from .nutrition import calculate_meals, parse_items
+from .search import search_foods
+from .models import DailyNutrition, FoodItem, Meal, MealFoodItem, MealTemplate, MealTemplateFoodItem
 from .serializers import (
     FoodItemSerializer, MealSerializer, MealTemplateSerializer,
     CalorieCalculationRequestSerializer, CalorieCalculationResponseSerializer,
+    CalorieCalculationBatchRequestSerializer, CalorieCalculationBatchResponseSerializer,
     CategoryDetectionRequestSerializer, CategoryDetectionResponseSerializer,
+    CategoryDetectionBatchRequestSerializer, CategoryDetectionBatchResponseSerializer,
     MetabolismInferenceRequestSerializer, MetabolismInferenceResponseSerializer,
+    MetabolismInferenceBatchRequestSerializer, MetabolismInferenceBatchResponseSerializer,
     NutritionCalculationRequestSerializer, NutritionCalculationResponseSerializer
 )
 
+# Longest date range served by MealViewSet.totals and report
+MAX_TOTALS_DAYS = 366
+
+
+def nutrition_totals(day):
+    """Totals of a DailyNutrition row (or zeros for a day without one) in the daily totals format."""
+    if day is None:
+        return {key: 0.0 for key in (
+            "calories", "protein_g", "carbs_g", "fat_g", "fiber_g", "sugar_g", "sodium_mg"
+        )}
+    return {
+        "calories": float(day.calories),
+        "protein_g": float(day.protein),
+        "carbs_g": float(day.carbs),
+        "fat_g": float(day.fat),
+        "fiber_g": float(day.fiber),
+        "sugar_g": float(day.sugar),
+        "sodium_mg": float(day.sodium),
+    }
+
+
+def parse_date_range(request):
+    """
+    The inclusive (from, to) dates of a range endpoint's query.
+
+    Raises:
+        ValueError: With the error message if the range is missing, reversed or too long
+    """
+    from datetime import datetime
+
+    try:
+        start = datetime.strptime(request.query_params.get("from", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(request.query_params.get("to", ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("from and to are required. Use YYYY-MM-DD")
+    if end < start:
+        raise ValueError("to must not be before from")
+    if (end - start).days >= MAX_TOTALS_DAYS:
+        raise ValueError(f"Date range is limited to {MAX_TOTALS_DAYS} days")
+    return start, end
+
+
+def inferred_metabolism(serializer, instance=None):
+    """
+    Metabolism attributes to save with a created or updated food, inferred from
+    its validated data over the current values. Only attributes the food has no
+    value for are inferred; values the client sent, now or before, are kept.
+    """
+    data = serializer.validated_data
+    values = {field: data[field] if field in data else getattr(instance, field, None) for field in INPUT_FIELDS}
+    return {
+        field: value for field, value in infer_food_metabolism(values).items()
+        if field not in data and getattr(instance, field, None) is None
+    }
+
+
 class FoodItemViewSet(viewsets.ModelViewSet):
     serializer_class = FoodItemSerializer
     permission_classes = []  # AllowAny for list/retrieve, will override in get_permissions
@@ -26,15 +97,24 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         return FoodItem.objects.filter(source='canonical')
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "search", "barcode"]:
             return [AllowAny()]
         return super().get_permissions()
 
     def list(self, request, *args, **kwargs):
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response(serializer.data)
+        # Canonical foods come pre-serialized from the in-memory catalogue
+        catalog = get_catalog()
+        if not request.user.is_authenticated:
+            return HttpResponse(catalog.list_json, content_type="application/json")
+        own = FoodItem.objects.filter(user=request.user).exclude(source='canonical').order_by('id')
+        own_data = self.get_serializer(own, many=True).data
+        return Response(list(heapq.merge(catalog.foods, own_data, key=itemgetter('id'))))
 
     def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_field)
+        food = get_catalog().by_id.get(int(pk)) if str(pk).isdigit() else None
+        if food is not None:
+            return Response(food)
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -42,14 +122,14 @@ class FoodItemViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=request.user, source='user')
+        serializer.save(user=request.user, source='user', **inferred_metabolism(serializer))
         return Response(serializer.data, status=201)
 
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(**inferred_metabolism(serializer, instance))
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
@@ -57,12 +137,43 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         instance.delete()
         return Response(status=204)
 
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        Full-text search over food names and brands, best match first.
+        Every word of `q` matches as a prefix. Paginated with `limit` and `offset`.
+        """
+        query = request.query_params.get("q", "")
+        if not query.strip():
+            return Response({"error": "q is required"}, status=400)
+        try:
+            limit = parse_page_size(request.query_params.get("limit"))
+            offset = int(request.query_params.get("offset") or 0)
+            if offset < 0:
+                raise ValueError("offset must not be negative")
+        except ValueError:
+            return Response({"error": "Invalid limit or offset"}, status=400)
+
+        foods, next_offset = search_foods(query, request.user, limit, offset)
+        serializer = self.get_serializer(foods, many=True)
+        return Response({"results": serializer.data, "nextOffset": next_offset})
+
+    @action(detail=False, methods=["get"], url_path="barcode/(?P<code>[^/]+)")
+    def barcode(self, request, code=None):
+        """The user's own food with this barcode, else a canonical one."""
+        food = lookup_barcode(code, request.user)
+        if food is None:
+            return Response({"error": "Food not found"}, status=404)
+        serializer = self.get_serializer(food)
+        return Response(serializer.data)
+
 class MealViewSet(viewsets.ModelViewSet):
     serializer_class = MealSerializer
 
     def get_queryset(self):
         return Meal.objects.filter(user=self.request.user)
 
+    @etag_on_data_version
     def list(self, request, *args, **kwargs):
         serializer = self.get_serializer(self.get_queryset(), many=True)
         return Response(serializer.data)
@@ -105,47 +216,62 @@ class MealViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="daily/totals/(?P<date_str>[^/.]+)")
     def daily_totals(self, request, date_str=None):
         from datetime import datetime
-        from decimal import Decimal
 
         try:
             date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=400)
 
-        meals = Meal.objects.filter(user=request.user, date=date_obj)
-
-        # Calculate totals from meal food items using grams instead of servings
-        meal_food_items = MealFoodItem.objects.filter(meal__in=meals).select_related('food')
-
-        total_calories = Decimal(0)
-        total_protein = Decimal(0)
-        total_carbs = Decimal(0)
-        total_fat = Decimal(0)
-        total_fiber = Decimal(0)
-        total_sugar = Decimal(0)
-        total_sodium = Decimal(0)
-
-        for mfi in meal_food_items:
-            # Calculate multiplier based on serving size (grams in meal / serving_size in food)
-            multiplier = mfi.grams / mfi.food.serving_size
-            total_calories += mfi.food.calories * multiplier
-            total_protein += mfi.food.protein * multiplier
-            total_carbs += mfi.food.carbs * multiplier
-            total_fat += mfi.food.fat * multiplier
-            total_fiber += mfi.food.fiber * multiplier
-            total_sugar += mfi.food.sugar * multiplier
-            if mfi.food.sodium:
-                total_sodium += mfi.food.sodium * multiplier
+        # Totals come from the daily rollup (grams / serving_size * macro, summed in SQL)
+        day = DailyNutrition.objects.filter(user=request.user, date=date_obj).first()
+        return Response({"date": date_str, **nutrition_totals(day)})
+
+    @action(detail=False, methods=["get"])
+    def totals(self, request):
+        """
+        Per-day nutrition totals from `from` to `to` (YYYY-MM-DD, inclusive),
+        one entry per day, days without meals as zeros.
+        """
+        from datetime import timedelta
 
+        try:
+            start, end = parse_date_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        days = {
+            d.date: d for d in DailyNutrition.objects.filter(user=request.user, date__range=(start, end))
+        }
+        series = []
+        for offset in range((end - start).days + 1):
+            date_obj = start + timedelta(days=offset)
+            series.append({"date": date_obj.isoformat(), **nutrition_totals(days.get(date_obj))})
+        return Response({"from": start.isoformat(), "to": end.isoformat(), "days": series})
+
+    @action(detail=False, methods=["get"])
+    def report(self, request):
+        """
+        Nutrition report from `from` to `to` (YYYY-MM-DD, inclusive): totals per day
+        (zeros for days without meals), per meal type, per food category and overall.
+        Optionally limited to one `mealType`.
+        """
+        try:
+            start, end = parse_date_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        frame = load_meal_items(request.user.id, start, end, request.query_params.get("mealType"))
+        days = [
+            {"date": date_obj.isoformat(), **totals}
+            for date_obj, totals in zip(frame.dates(), frame.by_day())
+        ]
         return Response({
-            "date": date_str,
-            "calories": float(total_calories),
-            "protein_g": float(total_protein),
-            "carbs_g": float(total_carbs),
-            "fat_g": float(total_fat),
-            "fiber_g": float(total_fiber),
-            "sugar_g": float(total_sugar),
-            "sodium_mg": float(total_sodium),
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "total": frame.total(),
+            "days": days,
+            "mealTypes": frame.by_meal_type(),
+            "categories": frame.by_category(),
         })
 
 class MealTemplateViewSet(viewsets.ModelViewSet):
@@ -181,6 +307,19 @@ class MealTemplateViewSet(viewsets.ModelViewSet):
         instance.delete()
         return Response(status=204)
 
+def run_calculation(request, calculate, fields, text_fields=(), batch=False):
+    """
+    Run a food.calculations function over one food (the request body) or a batch
+    ({"items": [...]}, answered with {"results": [...]}).
+    """
+    items = request.data.get("items") if batch else [request.data]
+    try:
+        columns = parse_inputs(items, fields, text_fields)
+    except ValueError as e:
+        return Response({"error": f"Invalid input: {e}"}, status=400)
+    results = calculate(**columns)
+    return Response({"results": results} if batch else results[0])
+
 @extend_schema(
     request=CalorieCalculationRequestSerializer,
     responses={200: CalorieCalculationResponseSerializer},
@@ -189,11 +328,17 @@ class MealTemplateViewSet(viewsets.ModelViewSet):
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def calculate_calories(request):
-    protein = request.data.get("protein_g", 0)
-    carbs = request.data.get("carbs_g", 0)
-    fat = request.data.get("fat_g", 0)
-    calories = (protein * 4) + (carbs * 4) + (fat * 9)
-    return Response({"calories": calories, "protein_g": protein, "carbs_g": carbs, "fat_g": fat})
+    return run_calculation(request, calculations.calculate_calories, calculations.MACRO_INPUTS)
+
+@extend_schema(
+    request=CalorieCalculationBatchRequestSerializer,
+    responses={200: CalorieCalculationBatchResponseSerializer},
+    description="Calculate calories of many foods at once; results are in input order"
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def calculate_calories_batch(request):
+    return run_calculation(request, calculations.calculate_calories, calculations.MACRO_INPUTS, batch=True)
 
 @extend_schema(
     request=CategoryDetectionRequestSerializer,
@@ -203,28 +348,17 @@ def calculate_calories(request):
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def detect_category(request):
-    protein = request.data.get("protein_g", 0)
-    carbs = request.data.get("carbs_g", 0)
-    fat = request.data.get("fat_g", 0)
-    total = protein + carbs + fat
-
-    if total == 0:
-        category = "unknown"
-    elif protein > total * 0.4:
-        category = "protein"
-    elif carbs > total * 0.5:
-        category = "carb"
-    elif fat > total * 0.5:
-        category = "fat"
-    else:
-        category = "balanced"
-
-    return Response({
-        "category": category,
-        "protein_ratio": protein / total if total > 0 else 0,
-        "carb_ratio": carbs / total if total > 0 else 0,
-        "fat_ratio": fat / total if total > 0 else 0
-    })
+    return run_calculation(request, calculations.detect_category, calculations.MACRO_INPUTS)
+
+@extend_schema(
+    request=CategoryDetectionBatchRequestSerializer,
+    responses={200: CategoryDetectionBatchResponseSerializer},
+    description="Detect the category of many foods at once; results are in input order"
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def detect_category_batch(request):
+    return run_calculation(request, calculations.detect_category, calculations.MACRO_INPUTS, batch=True)
 
 @extend_schema(
     request=MetabolismInferenceRequestSerializer,
@@ -234,104 +368,46 @@ def detect_category(request):
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def infer_metabolism(request):
-    protein = request.data.get("protein_g", 0)
-    carbs = request.data.get("carbs_g", 0)
-    fat = request.data.get("fat_g", 0)
-    fiber = request.data.get("fiber_g", 0)
-    food_type = request.data.get("food_type", "").lower()
-
-    total = protein + carbs + fat
-
-    if carbs > 0 and fiber > 0:
-        glycemic_index = "low" if fiber >= 5 else ("medium" if fiber >= 3 else "high")
-    elif "whole" in food_type or "complex" in food_type:
-        glycemic_index = "low"
-    elif "sugar" in food_type or "candy" in food_type or "soda" in food_type:
-        glycemic_index = "high"
-    else:
-        glycemic_index = "medium"
-
-    if glycemic_index == "high":
-        absorption_speed = "fast"
-    elif glycemic_index == "low":
-        absorption_speed = "slow"
-    else:
-        absorption_speed = "moderate"
-
-    thermic_effect = "high" if protein > total * 0.3 else ("medium" if protein > total * 0.15 else "low")
-
-    satiety_score = 0
-    if protein > total * 0.2:
-        satiety_score += 3
-    if fiber >= 5:
-        satiety_score += 3
-    elif fiber >= 3:
-        satiety_score += 2
-    elif fiber > 0:
-        satiety_score += 1
-    if fat > total * 0.2:
-        satiety_score += 2
-
-    if satiety_score >= 6:
-        satiety_level = "very_high"
-    elif satiety_score >= 4:
-        satiety_level = "high"
-    elif satiety_score >= 2:
-        satiety_level = "moderate"
-    else:
-        satiety_level = "low"
-
-    return Response({
-        "glycemic_index": glycemic_index,
-        "absorption_speed": absorption_speed,
-        "thermic_effect": thermic_effect,
-        "satiety_level": satiety_level
-    })
+    return run_calculation(
+        request, calculations.infer_metabolism, calculations.METABOLISM_INPUTS, text_fields=["food_type"]
+    )
+
+@extend_schema(
+    request=MetabolismInferenceBatchRequestSerializer,
+    responses={200: MetabolismInferenceBatchResponseSerializer},
+    description="Infer metabolic properties of many foods at once; results are in input order"
+)
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def infer_metabolism_batch(request):
+    return run_calculation(
+        request, calculations.infer_metabolism, calculations.METABOLISM_INPUTS, text_fields=["food_type"],
+        batch=True
+    )
 
 @extend_schema(
     request=NutritionCalculationRequestSerializer,
     responses={200: NutritionCalculationResponseSerializer},
-    description="Calculate total nutrition for a list of food items"
+    description=(
+        "Calculate total nutrition for a list of food items, or for several meals at once "
+        "({\"meals\": [[...], [...]]}) with per-meal totals in \"meals\" and grand totals"
+    )
 )
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def calculate_nutrition(request):
-    from decimal import Decimal
-
-    items = request.data.get("food_items", [])
-    total_calories = Decimal(0)
-    total_protein = Decimal(0)
-    total_carbs = Decimal(0)
-    total_fat = Decimal(0)
-    total_fiber = Decimal(0)
-    total_sugar = Decimal(0)
-    total_sodium = Decimal(0)
-
-    for item in items:
-        food_id = item.get("food_id")
-        grams = item.get("grams", 0)
-
-        try:
-            food = FoodItem.objects.get(id=food_id)
-            # Calculate multiplier based on grams vs serving size
-            multiplier = Decimal(grams) / food.serving_size
-            total_calories += food.calories * multiplier
-            total_protein += food.protein * multiplier
-            total_carbs += food.carbs * multiplier
-            total_fat += food.fat * multiplier
-            total_fiber += food.fiber * multiplier
-            total_sugar += food.sugar * multiplier
-            if food.sodium:
-                total_sodium += food.sodium * multiplier
-        except FoodItem.DoesNotExist:
-            continue
-
-    return Response({
-        "total_calories": float(round(total_calories, 2)),
-        "total_protein_g": float(round(total_protein, 2)),
-        "total_carbs_g": float(round(total_carbs, 2)),
-        "total_fat_g": float(round(total_fat, 2)),
-        "total_fiber_g": float(round(total_fiber, 2)),
-        "total_sugar_g": float(round(total_sugar, 2)),
-        "total_sodium_mg": float(round(total_sodium, 2))
-    })
+    meals = request.data.get("meals")
+    try:
+        if meals is None:
+            meals = [parse_items(request.data.get("food_items", []))]
+        elif isinstance(meals, list):
+            meals = [parse_items(items) for items in meals]
+        else:
+            raise ValueError("meals must be a list")
+    except ValueError as e:
+        return Response({"error": f"Invalid food items: {e}"}, status=400)
+
+    meal_totals, totals = calculate_meals(meals)
+    if "meals" in request.data:
+        return Response({"meals": meal_totals, **totals})
+    return Response(totals)
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_exercisesettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='data_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
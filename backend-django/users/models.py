@@ -7,6 +7,8 @@ class User(AbstractUser):
     username = models.CharField(max_length=255, unique=True)
     is_active = models.BooleanField(default=True)
     dark_mode = models.BooleanField(default=False)
+    # Bumped on every write to the user's data; used as ETag (see users.versioning)
+    data_version = models.BigIntegerField(default=0)
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
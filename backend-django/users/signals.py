@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ExerciseSettings
+from .versioning import bump_data_version
+
+
+@receiver([post_save, post_delete], sender=ExerciseSettings)
+def bump_exercise_settings_data_version(sender, instance, **kwargs):
+    # Preset responses embed lastUsedWeights from ExerciseSettings
+    bump_data_version(instance.user_id, origin=kwargs.get('origin'))
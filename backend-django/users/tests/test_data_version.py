@@ -0,0 +1,81 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from food.models import FoodItem, Meal, MealFoodItem
+from workouts.models import Exercise, WorkoutSession, WorkoutSet
+
+User = get_user_model()
+
+
+class DataVersionETagTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='etaguser',
+            email='etag@example.com',
+            password='testpass123'
+        )
+        # Real JWT auth so the user row (and its data_version) is loaded per request
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.exercise = Exercise.objects.create(name='Bench Press')
+        self.session = WorkoutSession.objects.create(user=self.user, name='Push')
+
+    def _version(self):
+        self.user.refresh_from_db()
+        return self.user.data_version
+
+    def test_not_modified_without_queries(self):
+        """A matching If-None-Match answers 304 with only the auth query."""
+        response = self.client.get('/api/workouts/sessions/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/workouts/sessions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        """Set, session and meal writes bump the version so the old ETag no longer matches."""
+        etag = self.client.get('/api/workouts/sessions/active/')['ETag']
+
+        version = self._version()
+        workout_set = WorkoutSet.objects.create(session=self.session, exercise=self.exercise, set_order=0)
+        self.assertGreater(self._version(), version)
+
+        response = self.client.get('/api/workouts/sessions/active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        version = self._version()
+        workout_set.delete()
+        self.assertGreater(self._version(), version)
+
+        version = self._version()
+        food = FoodItem.objects.create(name='Rice', serving_size=100, serving_unit='g', calories=130)
+        meal = Meal.objects.create(user=self.user, name='Lunch', meal_type='lunch', date='2025-01-06')
+        MealFoodItem.objects.create(meal=meal, food=food, grams=150, order=0)
+        self.assertGreater(self._version(), version)
+
+        etag = self.client.get('/api/food/meals/')['ETag']
+        self.assertEqual(
+            self.client.get('/api/food/meals/', HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_cascade_delete_bumps_once_per_origin(self):
+        """Deleting a session with many sets doesn't bump once per set."""
+        WorkoutSet.objects.bulk_create([
+            WorkoutSet(session=self.session, exercise=self.exercise, set_order=i) for i in range(20)
+        ])
+        version = self._version()
+        self.session.delete()
+        # One bump for the sets of the session, one for the session itself
+        self.assertEqual(self._version(), version + 2)
+
+    def test_other_users_writes_do_not_invalidate(self):
+        etag = self.client.get('/api/workouts/presets/')['ETag']
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass')
+        WorkoutSession.objects.create(user=other, name='Other')
+        response = self.client.get('/api/workouts/presets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -145,3 +145,35 @@ class ExerciseSettingsTests(TestCase):
         self.assertIn(str(self.exercise.id), response.data['lastUsedWeights'])
         self.assertEqual(response.data['lastUsedWeights'][str(self.exercise.id)]['weight'], 80)
         self.assertEqual(response.data['lastUsedWeights'][str(self.exercise.id)]['reps'], 10)
+
+    def test_preset_lists_load_last_used_weights_once(self):
+        """Test that preset list and templates cost the same queries however many presets they return"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from workouts.models import WorkoutPreset, WorkoutPresetExercise, SupersetExerciseItem
+
+        squat = Exercise.objects.create(name='Squat')
+        ExerciseSettings.objects.create(user=self.user, exercise=self.exercise, weight=80, reps=10)
+        ExerciseSettings.objects.create(user=self.user, exercise=squat, weight=100, reps=5)
+
+        def add_presets(count, user):
+            for i in range(count):
+                preset = WorkoutPreset.objects.create(user=user, name=f'Preset {i}')
+                WorkoutPresetExercise.objects.create(
+                    preset=preset, exercise=self.exercise, type='normal', sets=3, order=0
+                )
+                superset = WorkoutPresetExercise.objects.create(preset=preset, type='superset', sets=3, order=1)
+                SupersetExerciseItem.objects.create(superset=superset, exercise=squat, order=0)
+
+        for url, owner in (('/api/workouts/presets/', self.user), ('/api/workouts/presets/templates/', None)):
+            add_presets(1, owner)
+            with CaptureQueriesContext(connection) as one:
+                self.client.get(url)
+            add_presets(5, owner)
+            with CaptureQueriesContext(connection) as many:
+                response = self.client.get(url)
+            self.assertEqual(len(many), len(one))
+
+            preset = response.data[0]
+            self.assertEqual(preset['lastUsedWeights'][str(self.exercise.id)]['weight'], 80)
+            self.assertEqual(preset['lastUsedWeights'][str(squat.id)]['reps'], 5)
@@ -0,0 +1,77 @@
+"""
+Per-user data version.
+
+Every write to user-scoped data bumps User.data_version, which is then used as
+an ETag for the user's list endpoints. The version lives on the User row, so it
+is already loaded by authentication and a 304 costs no extra queries.
+"""
+from functools import wraps
+from django.db.models import F
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+
+def bump_data_version(user_id=None, origin=None, **user_lookups):
+    """
+    Increment data_version with a single UPDATE.
+
+    Args:
+        user_id: Id of the user whose data changed
+        origin: Deletion origin passed by post_delete; cascades from one origin
+            bump each user only once instead of once per deleted row
+        **user_lookups: Alternative to user_id, e.g. workout_sessions__id=5,
+            for rows that only reference the user through a parent
+    """
+    from .models import User
+
+    if user_id is not None:
+        user_lookups = {'pk': user_id}
+    if not user_lookups:
+        return
+
+    if origin is not None:
+        key = tuple(sorted(user_lookups.items()))
+        bumped = origin.__dict__.setdefault('_data_version_bumped', set())
+        if key in bumped:
+            return
+        bumped.add(key)
+
+    User.objects.filter(**user_lookups).update(data_version=F('data_version') + 1)
+
+
+def data_version_etag(user):
+    return f'W/"{user.pk}-{user.data_version}"'
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag.removeprefix('W/') in candidates
+
+
+def etag_on_data_version(view_method):
+    """
+    Decorate a user-scoped read so it carries the user's data version as ETag
+    and answers a matching If-None-Match with 304 before the view runs.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        user = request.user
+        if not user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        etag = data_version_etag(user)
+        if _etag_matches(request, etag):
+            response = Response(status=304)
+        else:
+            response = view_method(self, request, *args, **kwargs)
+
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response['ETag'] = etag
+            patch_vary_headers(response, ['Authorization'])
+        return response
+    return wrapper
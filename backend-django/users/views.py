@@ -73,7 +73,8 @@ def update_profile(request):
     dark_mode = request.data.get('dark_mode')
     if dark_mode is not None:
         request.user.dark_mode = bool(dark_mode)
-        request.user.save()
+        # update_fields so a stale in-memory data_version is never written back
+        request.user.save(update_fields=['dark_mode'])
     return Response({'id': request.user.id, 'username': request.user.username, 'email': request.user.email, 'dark_mode': request.user.dark_mode})
 
 
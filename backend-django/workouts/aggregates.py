@@ -0,0 +1,120 @@
+from decimal import Decimal, InvalidOperation
+from django.db.models import DateTimeField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import WorkoutSession, WorkoutSet
+
+
+def _decimal(value):
+    if value in (None, ''):
+        return Decimal(0)
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def set_volume(set_obj) -> Decimal:
+    """
+    Volume a set contributes to its session once completed.
+
+    Dropdown sets count every entry of dropdown_weights ([main, drop1, ...]);
+    entries that are not objects (client input is stored as sent) count as
+    nothing. The load of other sets is weight plus bodyweight, so bodyweight
+    and weighted bodyweight sets count too.
+    """
+    drops = set_obj.dropdown_weights
+    if set_obj.set_type == 'dropdown' and drops and isinstance(drops, list):
+        return sum(
+            (_decimal(drop.get('weight')) * _decimal(drop.get('reps')) for drop in drops if isinstance(drop, dict)),
+            Decimal(0)
+        )
+    load = _decimal(set_obj.weight) + _decimal(set_obj.bodyweight)
+    return load * _decimal(set_obj.reps)
+
+
+def set_snapshot(set_obj):
+    """(volume, completed_at) of a set as it counts towards session aggregates."""
+    completed_at = set_obj.completed_at
+    if isinstance(completed_at, str):
+        # Set fields assigned straight from request data aren't parsed until saved
+        completed_at = parse_datetime(completed_at)
+        if completed_at is not None and timezone.is_naive(completed_at):
+            completed_at = timezone.make_aware(completed_at)
+    if completed_at is None:
+        return Decimal(0), None
+    return set_volume(set_obj), completed_at
+
+
+def apply_set_changes(session_id, before, after):
+    """
+    Update a session's stored aggregates from set snapshots taken before and after a write.
+
+    Volume and completed count are applied as deltas. Completion bounds are
+    widened with Least/Greatest when sets are completed and only re-read from
+    the session's sets when a completion was removed. One UPDATE, run after the
+    set write itself.
+
+    Args:
+        session_id: Id of the session the sets belong to
+        before: Snapshots of the affected sets before the write (deleted or changed)
+        after: Snapshots of the affected sets after the write (created or changed)
+    """
+    removed = sorted(t for _, t in before if t is not None)
+    added = sorted(t for _, t in after if t is not None)
+    volume_delta = sum((v for v, _ in after), Decimal(0)) - sum((v for v, _ in before), Decimal(0))
+    if not volume_delta and removed == added:
+        return
+
+    updates = {
+        'total_volume': F('total_volume') + volume_delta,
+        'completed_sets': F('completed_sets') + (len(added) - len(removed)),
+    }
+    if removed:
+        completed = WorkoutSet.objects.filter(session_id=OuterRef('pk'), completed_at__isnull=False)
+        updates['first_completed_at'] = Subquery(completed.order_by('completed_at').values('completed_at')[:1])
+        updates['last_completed_at'] = Subquery(completed.order_by('-completed_at').values('completed_at')[:1])
+    elif added:
+        first = Value(added[0], output_field=DateTimeField())
+        last = Value(added[-1], output_field=DateTimeField())
+        updates['first_completed_at'] = Coalesce(Least('first_completed_at', first), first)
+        updates['last_completed_at'] = Coalesce(Greatest('last_completed_at', last), last)
+
+    WorkoutSession.objects.filter(id=session_id).update(**updates)
+
+
+def recalculate_session_aggregates(sessions):
+    """
+    Recompute stored aggregates of the given sessions from their sets.
+
+    Used by the backfill command and to repair sessions whose sets were written
+    outside the set write paths. Returns the sessions with aggregates set (saved).
+    """
+    sessions = list(sessions)
+    by_id = {s.id: s for s in sessions}
+    for session in sessions:
+        session.total_volume = Decimal(0)
+        session.completed_sets = 0
+        session.first_completed_at = None
+        session.last_completed_at = None
+
+    completed_sets = WorkoutSet.objects.filter(
+        session_id__in=list(by_id), completed_at__isnull=False
+    ).only('session_id', 'set_type', 'weight', 'reps', 'bodyweight', 'dropdown_weights', 'completed_at')
+    for set_obj in completed_sets:
+        session = by_id[set_obj.session_id]
+        session.total_volume += set_volume(set_obj)
+        session.completed_sets += 1
+        if session.first_completed_at is None or set_obj.completed_at < session.first_completed_at:
+            session.first_completed_at = set_obj.completed_at
+        if session.last_completed_at is None or set_obj.completed_at > session.last_completed_at:
+            session.last_completed_at = set_obj.completed_at
+
+    for session in sessions:
+        session.duration_seconds = session.compute_duration_seconds()
+
+    WorkoutSession.objects.bulk_update(
+        sessions, WorkoutSession.AGGREGATE_FIELDS + ['duration_seconds']
+    )
+    return sessions
@@ -0,0 +1,80 @@
+"""
+Compiled set blueprints of workout presets.
+
+Starting a workout used to walk the preset tree (exercises, superset items and
+their exercises) on every start. A blueprint is that walk done once: a flat
+list of the sets a preset generates, in order. It is cached under the preset's
+updated_at, which every edit of the preset, its exercises, their superset
+items or a referenced exercise touches (see signals), so a changed preset
+simply misses the cache in every process.
+"""
+from typing import List, Tuple
+from django.core.cache import cache
+from django.utils import timezone
+from .models import WorkoutPreset
+
+# (exercise_id, is_bodyweight, kind, dropdowns); kind is 'warmup', 'working' or 'dropdown'
+BlueprintEntry = Tuple[int, bool, str, int]
+
+BLUEPRINT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def compile_blueprint(preset_exercises) -> List[BlueprintEntry]:
+    """
+    Flatten preset exercises into the ordered list of sets they generate.
+
+    Superset items are read through .all() and sorted here, so a prefetch of
+    superset_exercises__exercise is used instead of a query per superset.
+    """
+    blueprint: List[BlueprintEntry] = []
+    for preset_ex in preset_exercises:
+        if preset_ex.type == "superset":
+            superset_items = sorted(preset_ex.superset_exercises.all(), key=lambda item: item.order)
+
+            # Warmup sets
+            for sup_item in superset_items:
+                if sup_item.include_warmup:
+                    blueprint.append((sup_item.exercise.id, sup_item.exercise.is_bodyweight, 'warmup', 0))
+
+            # Round robin sets
+            for _ in range(preset_ex.sets):
+                for sup_item in superset_items:
+                    blueprint.append((sup_item.exercise.id, sup_item.exercise.is_bodyweight, 'working', 0))
+
+        elif preset_ex.exercise:
+            exercise = preset_ex.exercise
+            if preset_ex.include_warmup:
+                blueprint.append((exercise.id, exercise.is_bodyweight, 'warmup', 0))
+
+            # Dropdown - ONE set per dropdown row (matching frontend model)
+            kind = 'dropdown' if preset_ex.type == "dropdown" else 'working'
+            dropdowns = (preset_ex.dropdowns or 0) if kind == 'dropdown' else 0
+            for _ in range(preset_ex.sets):
+                blueprint.append((exercise.id, exercise.is_bodyweight, kind, dropdowns))
+    return blueprint
+
+
+def blueprint_cache_key(preset: WorkoutPreset) -> str:
+    return f"workouts:preset-blueprint:{preset.pk}:{preset.updated_at.timestamp()}"
+
+
+def get_preset_blueprint(preset: WorkoutPreset) -> List[BlueprintEntry]:
+    """The preset's blueprint from cache, compiled (three queries) on a miss."""
+    key = blueprint_cache_key(preset)
+    blueprint = cache.get(key)
+    if blueprint is None:
+        preset_exercises = preset.exercises.select_related('exercise').prefetch_related(
+            'superset_exercises__exercise'
+        ).order_by('order')
+        blueprint = compile_blueprint(preset_exercises)
+        cache.set(key, blueprint, BLUEPRINT_CACHE_TIMEOUT)
+    return blueprint
+
+
+def blueprint_exercise_ids(blueprint: List[BlueprintEntry]) -> List[int]:
+    return list(dict.fromkeys(exercise_id for exercise_id, _, _, _ in blueprint))
+
+
+def invalidate_preset_blueprints(*conditions, **preset_lookups):
+    """Touch updated_at of the matching presets so their cached blueprints are no longer used."""
+    WorkoutPreset.objects.filter(*conditions, **preset_lookups).update(updated_at=timezone.now())
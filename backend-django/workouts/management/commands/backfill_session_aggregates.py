@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from workouts.aggregates import recalculate_session_aggregates
+from workouts.models import WorkoutSession
+
+
+class Command(BaseCommand):
+    help = "Recompute stored workout session aggregates (volume, completed sets, completion times, duration)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Sessions per batch")
+        parser.add_argument('--user', type=int, help="Only backfill sessions of this user id")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sessions = WorkoutSession.objects.order_by('id')
+        if options['user']:
+            sessions = sessions.filter(user_id=options['user'])
+
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(sessions.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                recalculate_session_aggregates(batch)
+            total += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"  {total} sessions...")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled aggregates for {total} sessions"))
@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0006_workoutset_dropdown_weights'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workoutsession',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='session_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0007_workoutsession_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutsession',
+            name='completed_sets',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='workoutsession',
+            name='duration_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workoutsession',
+            name='first_completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workoutsession',
+            name='last_completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workoutsession',
+            name='total_volume',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
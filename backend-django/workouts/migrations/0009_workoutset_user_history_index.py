@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-17 04:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_user_from_session(apps, schema_editor):
+    WorkoutSet = apps.get_model('workouts', 'WorkoutSet')
+    WorkoutSession = apps.get_model('workouts', 'WorkoutSession')
+    WorkoutSet.objects.filter(user__isnull=True).update(
+        user_id=models.Subquery(
+            WorkoutSession.objects.filter(id=models.OuterRef('session_id')).values('user_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0008_workoutsession_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutset',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='workout_sets', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_user_from_session, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='workoutset',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False)), fields=['user', 'exercise', '-completed_at', '-id'], name='set_user_exercise_done_idx'),
+        ),
+    ]
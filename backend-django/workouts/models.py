@@ -1,3 +1,4 @@
+from datetime import datetime
 from django.db import models
 
 
@@ -186,9 +187,45 @@ class WorkoutSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=False, null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
 
+    # Denormalized aggregates over completed sets, maintained by the set write
+    # paths (see workouts.aggregates) instead of being recomputed on every read
+    total_volume = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    completed_sets = models.IntegerField(default=0)
+    first_completed_at = models.DateTimeField(null=True, blank=True)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.IntegerField(null=True, blank=True)
+
+    AGGREGATE_FIELDS = ['total_volume', 'completed_sets', 'first_completed_at', 'last_completed_at']
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's history seeks on (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='session_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.created_at}"
 
+    def compute_duration_seconds(self):
+        if not isinstance(self.created_at, datetime) or not isinstance(self.finished_at, datetime):
+            return None
+        return int((self.finished_at - self.created_at).total_seconds())
+
+    def save(self, *args, **kwargs):
+        self.duration_seconds = self.compute_duration_seconds()
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding:
+            if update_fields is None:
+                # Aggregates are updated in place by the set write paths; never
+                # overwrite them with the values this instance was loaded with
+                kwargs['update_fields'] = [
+                    f.name for f in self._meta.concrete_fields
+                    if not f.primary_key and f.name not in self.AGGREGATE_FIELDS
+                ]
+            elif 'duration_seconds' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['duration_seconds']
+        super().save(*args, **kwargs)
+
 
 class WorkoutSet(models.Model):
     SET_TYPES = [
@@ -199,6 +236,8 @@ class WorkoutSet(models.Model):
 
     id = models.AutoField(primary_key=True)
     session = models.ForeignKey(WorkoutSession, on_delete=models.CASCADE, related_name='sets')
+    # Denormalized from session.user so a user's history for one exercise is an index range scan
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, null=True, blank=True, related_name='workout_sets')
     set_order = models.IntegerField()
 
     exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE)
@@ -210,5 +249,20 @@ class WorkoutSet(models.Model):
     dropdown_weights = models.JSONField(null=True, blank=True, help_text="For dropdown sets, stores array of {weight, reps} for each drop set")
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Per-exercise history: completed sets of one user and exercise, newest first
+            models.Index(
+                fields=['user', 'exercise', '-completed_at', '-id'],
+                name='set_user_exercise_done_idx',
+                condition=models.Q(completed_at__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.exercise.name} - {self.set_type} Set {self.set_order}"
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.session_id is not None:
+            self.user_id = self.session.user_id
+        super().save(*args, **kwargs)
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(value, pk):
+    """Encode the (datetime, id) position of the last row on a page as an opaque token."""
+    payload = {'c': value.isoformat() if value else None, 'i': pk}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token back into (datetime, id). Raises ValueError if malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = datetime.fromisoformat(payload['c']) if payload['c'] else None
+        pk = int(payload['i'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    return value, pk
+
+
+def parse_page_size(value):
+    """Parse the `limit` query param, clamped to MAX_PAGE_SIZE. Raises ValueError if not a positive int."""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_keyset(queryset, field, cursor=None, limit=DEFAULT_PAGE_SIZE, nullable=True):
+    """
+    Keyset-paginate a queryset newest first on (field, id).
+
+    Instead of OFFSET, each page seeks past the last row of the previous one,
+    so the cost of a page doesn't depend on how deep into the history it is.
+    Rows with a NULL field sort after all dated rows; pass nullable=False when
+    the queryset already excludes them to keep the seek a plain range condition.
+
+    Returns:
+        Tuple of (rows on this page, cursor for the next page or None)
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        if value is None:
+            queryset = queryset.filter(**{f'{field}__isnull': True, 'id__lt': pk})
+        else:
+            seek = Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+            if nullable:
+                seek |= Q(**{f'{field}__isnull': True})
+            queryset = queryset.filter(seek)
+
+    # Fetch one extra row to know whether there is a next page
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.id)
+
+
+def paginate_by_created_at(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Keyset-paginate sessions newest first on (created_at, id)."""
+    return paginate_keyset(queryset, 'created_at', cursor=cursor, limit=limit)
@@ -0,0 +1,180 @@
+"""
+In-process exercise search index for the exercise picker.
+
+The index holds every exercise with its name normalized, split into words and
+into trigrams, plus its muscle groups, regions, equipment and tags. It is built
+with a few prefetched queries and kept per process. Each search checks a
+fingerprint of the exercise table (count and latest updated_at, one aggregate
+query) and rebuilds the index when it changed. Signals touch updated_at of the
+affected exercises when their muscle groups, tags or equipment change (see
+signals), so every process notices edits.
+
+Ranking: exact name, name prefix, word prefix, substring, then trigram
+similarity for typos ("bech pres" still finds "Bench Press").
+"""
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Exercise
+
+# Minimum trigram similarity for a fuzzy match
+TRIGRAM_THRESHOLD = 0.3
+
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.9
+SCORE_WORD_PREFIX = 0.8
+SCORE_SUBSTRING = 0.6
+# Fuzzy matches score their similarity scaled into [0, SCORE_FUZZY)
+SCORE_FUZZY = 0.5
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace to single spaces."""
+    return ' '.join(_WORD_RE.findall((text or '').lower()))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word padded like pg_trgm, so short prefixes match word starts."""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ExerciseSearchIndex:
+    """Precomputed search data for all exercises. Immutable once built."""
+
+    def __init__(self, exercises, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.entries: Dict[int, dict] = {}
+        # Facet value (normalized) -> exercise ids, per filter
+        self.facets: Dict[str, Dict[str, Set[int]]] = {
+            'muscleGroup': defaultdict(set),
+            'region': defaultdict(set),
+            'equipment': defaultdict(set),
+            'tag': defaultdict(set),
+        }
+        # Trigram -> exercise ids, to find fuzzy candidates without scanning every name
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+
+        for exercise in exercises:
+            key = normalize(exercise.name)
+            grams = trigrams(key)
+            muscle_groups = list(exercise.muscle_groups.all())
+            equipment = exercise.equipment.name if exercise.equipment else None
+            self.entries[exercise.id] = {
+                'key': key,
+                'words': key.split(),
+                'trigrams': grams,
+                'data': {
+                    'id': exercise.id,
+                    'name': exercise.name,
+                    'muscleGroups': [mg.name for mg in muscle_groups],
+                    'equipment': equipment,
+                    'bodyweight': exercise.is_bodyweight,
+                },
+            }
+            for gram in grams:
+                self.postings[gram].add(exercise.id)
+            for mg in muscle_groups:
+                self.facets['muscleGroup'][normalize(mg.name)].add(exercise.id)
+                if mg.region:
+                    self.facets['region'][normalize(mg.region.name)].add(exercise.id)
+            if equipment:
+                self.facets['equipment'][normalize(equipment)].add(exercise.id)
+            for tag in exercise.tags.all():
+                self.facets['tag'][normalize(tag.name)].add(exercise.id)
+
+    def filter_ids(self, filters: Dict[str, List[str]]) -> Optional[Set[int]]:
+        """Ids matching all given filters (any of the values per filter), None if unfiltered."""
+        allowed = None
+        for facet, values in filters.items():
+            matching = set()
+            for value in values:
+                matching |= self.facets[facet].get(normalize(value), set())
+            allowed = matching if allowed is None else allowed & matching
+        return allowed
+
+    def score(self, entry: dict, query: str, query_grams: Set[str]) -> float:
+        key = entry['key']
+        if key == query:
+            return SCORE_EXACT
+        if key.startswith(query):
+            return SCORE_PREFIX
+        if all(any(word.startswith(q) for word in entry['words']) for q in query.split()):
+            return SCORE_WORD_PREFIX
+        if query in key:
+            return SCORE_SUBSTRING
+        shared = len(entry['trigrams'] & query_grams)
+        similarity = shared / (len(entry['trigrams']) + len(query_grams) - shared) if shared else 0
+        return similarity * SCORE_FUZZY if similarity >= TRIGRAM_THRESHOLD else 0
+
+    def search(self, query: str = '', filters: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        """
+        Ranked exercise data for a query, best first, ties by name.
+
+        Without a query, all exercises matching the filters are returned by name.
+        """
+        allowed = self.filter_ids(filters or {})
+        query = normalize(query)
+
+        if not query:
+            ids = self.entries.keys() if allowed is None else allowed
+            entries = [self.entries[i] for i in ids if i in self.entries]
+            return [e['data'] for e in sorted(entries, key=lambda e: (e['key'], e['data']['id']))]
+
+        query_grams = trigrams(query)
+        if len(query) < 3:
+            # Too short for trigrams to find mid-word substrings, scan names instead
+            candidates = set(self.entries)
+        else:
+            candidates = set()
+            for gram in query_grams:
+                candidates |= self.postings.get(gram, set())
+        if allowed is not None:
+            candidates &= allowed
+
+        ranked = []
+        for exercise_id in candidates:
+            entry = self.entries[exercise_id]
+            score = self.score(entry, query, query_grams)
+            if score > 0:
+                ranked.append((-score, entry['key'], exercise_id, entry['data']))
+        ranked.sort(key=lambda row: row[:3])
+        return [data for _, _, _, data in ranked]
+
+
+_index: Optional[ExerciseSearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def exercise_fingerprint():
+    stats = Exercise.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return stats['count'], stats['latest']
+
+
+def get_exercise_index() -> ExerciseSearchIndex:
+    """The process's exercise index, rebuilt if exercises changed since it was built."""
+    global _index
+    fingerprint = exercise_fingerprint()
+    index = _index
+    if index is not None and index.fingerprint == fingerprint:
+        return index
+    with _index_lock:
+        if _index is None or _index.fingerprint != fingerprint:
+            exercises = Exercise.objects.select_related('equipment').prefetch_related(
+                'muscle_groups__region', 'tags'
+            )
+            _index = ExerciseSearchIndex(exercises, fingerprint)
+        return _index
+
+
+def touch_exercises(*conditions, **lookups):
+    """Touch updated_at of the matching exercises so search indexes rebuild."""
+    Exercise.objects.filter(*conditions, **lookups).update(updated_at=timezone.now())
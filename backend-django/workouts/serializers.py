@@ -49,7 +49,7 @@ class ExerciseSerializer(serializers.ModelSerializer):
 
 
 class WorkoutSetSerializer(serializers.ModelSerializer):
-    exerciseId = serializers.ReadOnlyField(source='exercise.id')
+    exerciseId = serializers.ReadOnlyField(source='exercise_id')
     loggedAt = serializers.DateTimeField(source='completed_at', allow_null=True)
     dropdownWeights = serializers.JSONField(source='dropdown_weights', required=False)
     setType = serializers.CharField(source='set_type')
@@ -64,11 +64,40 @@ class WorkoutSessionSerializer(serializers.ModelSerializer):
     sets = WorkoutSetSerializer(many=True, read_only=True)
     startedAt = serializers.DateTimeField(source='created_at')
     endedAt = serializers.DateTimeField(source='finished_at', allow_null=True)
+    totalVolume = serializers.FloatField(source='total_volume', read_only=True)
+    completedSets = serializers.IntegerField(source='completed_sets', read_only=True)
+    firstCompletedAt = serializers.DateTimeField(source='first_completed_at', read_only=True)
+    lastCompletedAt = serializers.DateTimeField(source='last_completed_at', read_only=True)
+    durationSeconds = serializers.IntegerField(source='duration_seconds', read_only=True)
 
     class Meta:
         model = WorkoutSession
         # Explicitly list fields to use camelCase names for frontend
-        fields = ['id', 'name', 'notes', 'startedAt', 'endedAt', 'user', 'preset', 'sets']
+        fields = [
+            'id', 'name', 'notes', 'startedAt', 'endedAt', 'user', 'preset', 'sets',
+            'totalVolume', 'completedSets', 'firstCompletedAt', 'lastCompletedAt', 'durationSeconds'
+        ]
+
+
+class WorkoutSessionSummarySerializer(serializers.ModelSerializer):
+    """Session history row with set aggregates instead of nested sets."""
+    startedAt = serializers.DateTimeField(source='created_at')
+    endedAt = serializers.DateTimeField(source='finished_at', allow_null=True)
+    setCount = serializers.IntegerField(source='set_count', read_only=True)
+    completedSetCount = serializers.IntegerField(source='completed_sets', read_only=True)
+    totalVolume = serializers.FloatField(source='total_volume', read_only=True)
+    durationSeconds = serializers.IntegerField(source='duration_seconds', read_only=True)
+    exerciseIds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorkoutSession
+        fields = [
+            'id', 'name', 'notes', 'startedAt', 'endedAt', 'preset',
+            'setCount', 'completedSetCount', 'totalVolume', 'durationSeconds', 'exerciseIds'
+        ]
+
+    def get_exerciseIds(self, obj):
+        return self.context.get('exercise_ids', {}).get(obj.id, [])
 
 
 class SupersetExerciseItemSerializer(serializers.ModelSerializer):
@@ -113,6 +142,39 @@ class WritableWorkoutPresetExerciseSerializer(serializers.ModelSerializer):
         fields = ['id', 'exerciseId', 'type', 'sets', 'dropdowns', 'includeWarmup', 'order']
 
 
+def preset_exercise_ids(preset):
+    """Ids of the exercises in a preset, superset items included (uses prefetched exercises)."""
+    exercise_ids = []
+    for ex in preset.exercises.all():
+        if ex.exercise_id:
+            exercise_ids.append(ex.exercise_id)
+        # Also include superset exercises
+        for sup_ex in ex.superset_exercises.all():
+            if sup_ex.exercise_id:
+                exercise_ids.append(sup_ex.exercise_id)
+    return exercise_ids
+
+
+def last_used_weights(user, exercise_ids):
+    """The user's last used weights/reps per exercise id, from ExerciseSettings in one query."""
+    from users.models import ExerciseSettings
+
+    settings = ExerciseSettings.objects.filter(
+        user=user,
+        exercise_id__in=set(exercise_ids)
+    ).values_list('exercise_id', 'weight', 'reps', 'sub_sets')
+
+    result = {}
+    for exercise_id, weight, reps, sub_sets in settings:
+        data = {'reps': reps}
+        if weight is not None:
+            data['weight'] = weight
+        if sub_sets:
+            data['subSets'] = sub_sets
+        result[exercise_id] = data
+    return result
+
+
 class WorkoutPresetSerializer(serializers.ModelSerializer):
     exercises = WorkoutPresetExerciseSerializer(many=True, read_only=True)
     user_id = serializers.ReadOnlyField()
@@ -130,36 +192,20 @@ class WorkoutPresetSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return {}
 
-        from users.models import ExerciseSettings
-
         # Get all exercise IDs in this preset
-        exercise_ids = []
-        for ex in obj.exercises.all():
-            if ex.exercise:
-                exercise_ids.append(ex.exercise_id)
-            # Also include superset exercises
-            for sup_ex in ex.superset_exercises.all():
-                if sup_ex.exercise:
-                    exercise_ids.append(sup_ex.exercise_id)
-
+        exercise_ids = preset_exercise_ids(obj)
         if not exercise_ids:
             return {}
 
-        # Get last used settings for these exercises
-        settings = ExerciseSettings.objects.filter(
-            user=request.user,
-            exercise_id__in=exercise_ids
-        ).select_related('exercise')
+        # List responses load the settings for all presets at once
+        last_used = self.context.get('last_used_weights')
+        if last_used is None:
+            last_used = last_used_weights(request.user, exercise_ids)
 
         result = {}
-        for setting in settings:
-            data = {'reps': setting.reps}
-            if setting.weight is not None:
-                data['weight'] = setting.weight
-            if setting.sub_sets:
-                data['subSets'] = setting.sub_sets
-            result[str(setting.exercise_id)] = data
-
+        for exercise_id in exercise_ids:
+            if exercise_id in last_used:
+                result[str(exercise_id)] = last_used[exercise_id]
         return result
 
     def update(self, instance, validated_data):
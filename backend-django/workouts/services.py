@@ -1,131 +1,490 @@
-from typing import List
-from .models import WorkoutSet, WorkoutSession, WorkoutPresetExercise
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from users.versioning import bump_data_version
+from .models import WorkoutSet, WorkoutSession, WorkoutPreset, WorkoutPresetExercise, SupersetExerciseItem
+from .aggregates import apply_set_changes, set_snapshot
+from .blueprints import BlueprintEntry, compile_blueprint
 
+# Fields written when syncing sets from a frontend session payload
+SET_SYNC_FIELDS = ['set_order', 'exercise_id', 'set_type', 'weight', 'reps', 'bodyweight', 'completed_at']
 
-def generate_sets_from_preset(preset_exercises: List[WorkoutPresetExercise], session: WorkoutSession) -> List[WorkoutSet]:
+
+# Starting load of a working set when the user has no history for the exercise
+DEFAULT_WEIGHT = 60
+DEFAULT_REPS = 10
+DROPDOWN_STEP = 2.5
+
+
+def parse_progression(data) -> Optional[dict]:
     """
-    Generate WorkoutSet instances (unsaved) from preset exercises.
+    Parse an optional progressive-overload rule from request data.
+
+    {"weightIncrement": 2.5, "targetReps": 10} adds the increment to every
+    starting weight of an exercise whose last sets all reached targetReps.
+    Raises ValueError if malformed.
+    """
+    if not data:
+        return None
+    if not isinstance(data, dict):
+        raise ValueError("progression must be an object")
+    increment = Decimal(str(data.get('weightIncrement', 0)))
+    target_reps = int(data.get('targetReps', DEFAULT_REPS))
+    if increment < 0 or target_reps < 1:
+        raise ValueError("weightIncrement must be >= 0 and targetReps positive")
+    return {'weight_increment': increment, 'target_reps': target_reps}
+
+
+def _clean_dropdowns(drops) -> Optional[List[dict]]:
+    """
+    Stored dropdown entries usable as starting loads. Set writes keep
+    dropdown_weights as the client sent them, so entries that are not objects
+    with a numeric weight are skipped, as aggregates.set_volume does.
+    """
+    if not isinstance(drops, list):
+        return None
+    cleaned = []
+    for drop in drops:
+        if not isinstance(drop, dict):
+            continue
+        try:
+            weight = Decimal(str(drop.get('weight') or 0))
+        except InvalidOperation:
+            continue
+        if not weight.is_finite():
+            continue
+        reps = drop.get('reps')
+        valid_reps = isinstance(reps, int) and not isinstance(reps, bool)
+        cleaned.append({**drop, 'weight': float(weight), 'reps': reps if valid_reps else None})
+    return cleaned or None
+
+
+def _apply_progression(loads: List[dict], progression: dict) -> List[dict]:
+    if any((load['reps'] or 0) < progression['target_reps'] for load in loads):
+        return loads
+    increment = progression['weight_increment']
+    progressed = []
+    for load in loads:
+        load = dict(load)
+        if load['weight'] is not None:
+            load['weight'] = load['weight'] + increment
+        if load['dropdown_weights']:
+            load['dropdown_weights'] = [
+                {**drop, 'weight': float(Decimal(str(drop.get('weight') or 0)) + increment)}
+                for drop in load['dropdown_weights']
+            ]
+        progressed.append(load)
+    return progressed
+
+
+def load_starting_loads(user_id: int, exercise_ids: List[int], progression: Optional[dict] = None) -> Dict[int, List[dict]]:
+    """
+    Starting weight/reps for each exercise, per working set, from the user's history.
+
+    The working sets of the last session in which the user completed the
+    exercise are read in one query for all exercises, through the
+    (user, exercise, completed_at) index. Exercises without history fall back
+    to the user's ExerciseSettings (one more query, only when needed).
+
+    Returns:
+        Dict exercise_id -> list of {'weight', 'reps', 'dropdown_weights'},
+        in set order; exercises with neither history nor settings are missing
+    """
+    from users.models import ExerciseSettings
+
+    exercise_ids = set(exercise_ids)
+    if not exercise_ids:
+        return {}
+
+    done = WorkoutSet.objects.filter(user_id=user_id, completed_at__isnull=False)
+    last_session = done.filter(exercise_id=OuterRef('exercise_id')).order_by('-completed_at', '-id').values('session_id')[:1]
+    last_sets = done.filter(
+        exercise_id__in=exercise_ids, session_id=Subquery(last_session)
+    ).exclude(
+        # Warmup sets are logged without weight
+        set_type='normal', weight__isnull=True
+    ).order_by('exercise_id', 'set_order').values_list('exercise_id', 'weight', 'reps', 'dropdown_weights')
+
+    loads: Dict[int, List[dict]] = {}
+    for exercise_id, weight, reps, dropdown_weights in last_sets:
+        loads.setdefault(exercise_id, []).append(
+            {'weight': weight, 'reps': reps, 'dropdown_weights': _clean_dropdowns(dropdown_weights)}
+        )
+
+    missing = exercise_ids - loads.keys()
+    if missing:
+        settings = ExerciseSettings.objects.filter(
+            user_id=user_id, exercise_id__in=missing
+        ).values_list('exercise_id', 'weight', 'reps', 'sub_sets')
+        for exercise_id, weight, reps, sub_sets in settings:
+            loads[exercise_id] = [{
+                'weight': Decimal(str(weight)) if weight is not None else None,
+                'reps': reps,
+                'dropdown_weights': _clean_dropdowns(sub_sets),
+            }]
+
+    if progression and progression['weight_increment']:
+        loads = {ex_id: _apply_progression(ex_loads, progression) for ex_id, ex_loads in loads.items()}
+    return loads
+
+
+def _working_load(starting_loads: Dict[int, List[dict]], exercise_id: int, position: int) -> Optional[dict]:
+    """Load of the n-th working set; sets past the last recorded one repeat it."""
+    history = starting_loads.get(exercise_id)
+    if not history:
+        return None
+    return history[min(position, len(history) - 1)]
+
+
+def _dropdown_weights(load: Optional[dict], dropdowns: int, base_weight, reps: int) -> List[dict]:
+    """Dropdown weights array [main, drop1, drop2, ...] for one dropdown set."""
+    if load and load['dropdown_weights'] and len(load['dropdown_weights']) == dropdowns + 1:
+        return [{'weight': float(d.get('weight') or 0), 'reps': d.get('reps') or reps} for d in load['dropdown_weights']]
+    dropdown_weights = [{'weight': float(base_weight), 'reps': reps}]
+    for d in range(1, dropdowns + 1):
+        dropdown_weights.append({
+            'weight': float(max(0, base_weight - Decimal(str(d * DROPDOWN_STEP)))),
+            'reps': reps
+        })
+    return dropdown_weights
+
+
+def generate_sets_from_blueprint(blueprint: List[BlueprintEntry], session: WorkoutSession,
+                                 starting_loads: Optional[Dict[int, List[dict]]] = None) -> List[WorkoutSet]:
+    """
+    Generate WorkoutSet instances (unsaved) from a compiled preset blueprint.
 
     Args:
-        preset_exercises: List of WorkoutPresetExercise
+        blueprint: Flat list of sets from compile_blueprint()/get_preset_blueprint()
         session: WorkoutSession instance
+        starting_loads: Per-exercise starting loads from load_starting_loads();
+            exercises missing from it start at DEFAULT_WEIGHT x DEFAULT_REPS
 
     Returns:
         List of unsaved WorkoutSet instances
     """
+    starting_loads = starting_loads or {}
     sets: List[WorkoutSet] = []
-    set_order = 0
-    base_weight = 60
-
-    for preset_ex in preset_exercises:
-        if preset_ex.type == "superset":
-            if not preset_ex.superset_exercises:
-                continue
-            
-            superset_items = preset_ex.superset_exercises.all().order_by('order')
-
-            # Warmup sets
-            for sup_item in superset_items:
-                if sup_item.include_warmup:
-                    exercise = sup_item.exercise
-                    bodyweight = exercise.is_bodyweight
-                    set_type = "bodyweight" if bodyweight else "normal"
-                    weight = None  # Warmup sets have no weight
-
-                    sets.append(WorkoutSet(
-                        session=session,
-                        exercise=exercise,
-                        set_type=set_type,
-                        weight=weight,
-                        reps=10,
-                        set_order=set_order,
-                        completed_at=None
-                    ))
-                    set_order += 1
-
-            # Round robin sets
-            number_of_sets = preset_ex.sets
-
-            for _ in range(number_of_sets):
-                for sup_item in superset_items:
-                    exercise = sup_item.exercise
-                    bodyweight = exercise.is_bodyweight
-                    set_type = "bodyweight" if bodyweight else "normal"
-                    weight = None if bodyweight else base_weight
-
-                    sets.append(WorkoutSet(
-                        session=session,
-                        exercise=exercise,
-                        set_type=set_type,
-                        weight=weight,
-                        reps=10,
-                        set_order=set_order,
-                        completed_at=None
-                    ))
-                    set_order += 1
-
-        elif preset_ex.exercise:
-            exercise = preset_ex.exercise
-            bodyweight = exercise.is_bodyweight
-            number_of_sets = preset_ex.sets
-
-            # Warmup
-            if preset_ex.include_warmup:
-                set_type = "bodyweight" if bodyweight else "normal"
-                weight = None  # Warmup sets have no weight
-
-                sets.append(WorkoutSet(
-                    session=session,
-                    exercise=exercise,
-                    set_type=set_type,
-                    weight=weight,
-                    reps=10,
-                    set_order=set_order,
-                    completed_at=None
-                ))
-                set_order += 1
-
-            # Dropdown - create ONE set per dropdown row (matching frontend model)
-            if preset_ex.type == "dropdown":
-                dropdowns = preset_ex.dropdowns or 0
-                for _ in range(number_of_sets):
-                    # Build dropdown weights array: [main, drop1, drop2, ...]
-                    dropdown_weights = [
-                        {'weight': float(base_weight), 'reps': 10}
-                    ]
-                    for d in range(1, dropdowns + 1):
-                        dropdown_weights.append({
-                            'weight': float(max(0, base_weight - (d * 2.5))),
-                            'reps': 10
-                        })
-
-                    sets.append(WorkoutSet(
-                        session=session,
-                        exercise=exercise,
-                        set_type="dropdown",
-                        weight=base_weight,
-                        reps=10,
-                        dropdown_weights=dropdown_weights,
-                        set_order=set_order,
-                        completed_at=None
-                    ))
-                    set_order += 1
-
-            # Normal/Bodyweight
-            else:
-                for _ in range(number_of_sets):
-                    set_type = "bodyweight" if bodyweight else "normal"
-                    weight = None if bodyweight else base_weight
-
-                    sets.append(WorkoutSet(
-                        session=session,
-                        exercise=exercise,
-                        set_type=set_type,
-                        weight=weight,
-                        reps=10,
-                        set_order=set_order,
-                        completed_at=None
-                    ))
-                    set_order += 1
+    # Working sets generated so far per exercise, to seed set n from last time's set n
+    positions: Dict[int, int] = defaultdict(int)
+
+    for set_order, (exercise_id, bodyweight, kind, dropdowns) in enumerate(blueprint):
+        set_obj = WorkoutSet(
+            session=session,
+            user_id=session.user_id,
+            exercise_id=exercise_id,
+            set_type="bodyweight" if bodyweight else "normal",
+            weight=None,  # Warmup sets have no weight
+            reps=DEFAULT_REPS,
+            set_order=set_order,
+            completed_at=None
+        )
+        if kind != 'warmup':
+            load = _working_load(starting_loads, exercise_id, positions[exercise_id])
+            positions[exercise_id] += 1
+            set_obj.reps = (load and load['reps']) or DEFAULT_REPS
+            base_weight = load['weight'] if load and load['weight'] is not None else Decimal(DEFAULT_WEIGHT)
+
+            if kind == 'dropdown':
+                set_obj.set_type = "dropdown"
+                set_obj.weight = base_weight
+                set_obj.dropdown_weights = _dropdown_weights(load, dropdowns, base_weight, set_obj.reps)
+            elif not bodyweight:
+                set_obj.weight = base_weight
+        sets.append(set_obj)
 
     return sets
+
+
+def generate_sets_from_preset(preset_exercises: List[WorkoutPresetExercise], session: WorkoutSession,
+                              starting_loads: Optional[Dict[int, List[dict]]] = None) -> List[WorkoutSet]:
+    """
+    Generate WorkoutSet instances (unsaved) from preset exercises.
+
+    Args:
+        preset_exercises: List of WorkoutPresetExercise
+        session: WorkoutSession instance
+        starting_loads: Per-exercise starting loads from load_starting_loads()
+
+    Returns:
+        List of unsaved WorkoutSet instances
+    """
+    return generate_sets_from_blueprint(compile_blueprint(preset_exercises), session, starting_loads)
+
+
+def _to_decimal(value):
+    """
+    Normalize a client weight to the stored 2-decimal precision so unchanged values compare equal.
+    Raises ValueError if malformed.
+    """
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except InvalidOperation as e:
+        raise ValueError(f"Invalid number: {value}") from e
+
+
+def _to_datetime(value):
+    """Parse a client timestamp (JS toISOString() or datetime). Raises ValueError if malformed."""
+    if value is None or isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"Invalid datetime: {value}")
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def set_values_from_payload(set_data: dict, idx: int) -> dict:
+    """Map a frontend set payload (camelCase) to WorkoutSet field values."""
+    reps = set_data.get('reps')
+    exercise_id = set_data.get('exerciseId')
+    return {
+        'set_order': set_data.get('set_order', idx),
+        'exercise_id': int(exercise_id) if exercise_id is not None else None,
+        'set_type': set_data.get('setType') or 'normal',
+        'weight': _to_decimal(set_data.get('weight')),
+        'reps': int(reps) if reps is not None else None,
+        'bodyweight': _to_decimal(set_data.get('bodyweight')),
+        'completed_at': _to_datetime(set_data.get('loggedAt')),
+    }
+
+
+def sync_session_sets(session: WorkoutSession, sets_data: List[dict], new_session: bool = False) -> Dict[str, List[int]]:
+    """
+    Make the session's stored sets match the given payload as a single diff.
+
+    Payload items whose id matches a stored set update it, other items are
+    created, and stored sets missing from the payload are deleted. Writes are
+    one bulk_create, one bulk_update limited to rows (and fields) that actually
+    changed, and one filtered delete. Call inside a transaction.
+
+    Args:
+        session: WorkoutSession the sets belong to
+        sets_data: List of frontend set payloads
+        new_session: Session was just created, so there are no stored sets to diff against
+
+    Returns:
+        Dict with 'created', 'updated' and 'deleted' set ids
+
+    Raises:
+        ValueError: If a payload item has malformed values
+    """
+    existing_by_id = {} if new_session else {s.id: s for s in WorkoutSet.objects.filter(session=session)}
+
+    to_create: List[WorkoutSet] = []
+    to_update: List[WorkoutSet] = []
+    changed_fields = set()
+    kept_ids = set()
+    before = []
+
+    for idx, set_data in enumerate(sets_data):
+        values = set_values_from_payload(set_data, idx)
+        set_obj = existing_by_id.get(set_data.get('id'))
+        if set_obj is None:
+            to_create.append(WorkoutSet(session=session, user_id=session.user_id, **values))
+            continue
+
+        kept_ids.add(set_obj.id)
+        fields = [f for f, v in values.items() if getattr(set_obj, f) != v]
+        if fields:
+            before.append(set_snapshot(set_obj))
+            for f in fields:
+                setattr(set_obj, f, values[f])
+            changed_fields.update(fields)
+            to_update.append(set_obj)
+
+    deleted_ids = [pk for pk in existing_by_id if pk not in kept_ids]
+    before.extend(set_snapshot(existing_by_id[pk]) for pk in deleted_ids)
+
+    if to_create:
+        WorkoutSet.objects.bulk_create(to_create)
+    if to_update:
+        WorkoutSet.objects.bulk_update(to_update, sorted(changed_fields))
+    if deleted_ids:
+        WorkoutSet.objects.filter(id__in=deleted_ids).delete()
+    if to_create or to_update:
+        # Bulk writes don't send signals (deletes above do)
+        bump_data_version(session.user_id)
+    apply_set_changes(session.id, before, [set_snapshot(s) for s in to_create + to_update])
+
+    return {
+        'created': [s.id for s in to_create],
+        'updated': [s.id for s in to_update],
+        'deleted': deleted_ids,
+    }
+
+
+# Fields a batch "patch" operation may change, frontend name -> model field
+BATCH_PATCH_FIELDS = {
+    'weight': 'weight',
+    'reps': 'reps',
+    'bodyweight': 'bodyweight',
+    'dropdownWeights': 'dropdown_weights',
+}
+BATCH_OPS = ('complete', 'uncomplete', 'patch')
+
+
+def _batch_field_value(field, value):
+    if field in ('weight', 'bodyweight'):
+        return _to_decimal(value)
+    if field == 'reps':
+        return int(value) if value is not None else None
+    return value
+
+
+def apply_set_operations(user, operations: List[dict]) -> List[dict]:
+    """
+    Apply a batch of set operations for a user with one read and one bulk_update.
+
+    Each operation is {"id": <set id>, "op": "complete" | "uncomplete" | "patch"}.
+    "complete" accepts an optional "loggedAt" (defaults to now) and "patch" takes
+    "fields" with any of weight, reps, bodyweight, dropdownWeights. Operations on
+    the same set are applied in order. Call inside a transaction.
+
+    Returns:
+        One compact result per operation: the set's resulting values, or an
+        error for sets that don't exist or belong to another user
+
+    Raises:
+        ValueError: If an operation is malformed (nothing is written)
+    """
+    now = timezone.now()
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPS:
+            raise ValueError(f"op must be one of {', '.join(BATCH_OPS)}")
+        set_id = int(operation['id']) if operation.get('id') is not None else None
+        if set_id is None:
+            raise ValueError("id is required")
+
+        if operation['op'] == 'complete':
+            values = {'completed_at': _to_datetime(operation.get('loggedAt')) or now}
+        elif operation['op'] == 'uncomplete':
+            values = {'completed_at': None}
+        else:
+            fields = operation.get('fields') or {}
+            if not isinstance(fields, dict):
+                raise ValueError("fields must be an object")
+            unknown = set(fields) - set(BATCH_PATCH_FIELDS)
+            if unknown:
+                raise ValueError(f"Cannot patch {', '.join(sorted(unknown))}")
+            values = {
+                BATCH_PATCH_FIELDS[k]: _batch_field_value(BATCH_PATCH_FIELDS[k], v)
+                for k, v in fields.items()
+            }
+        parsed.append((set_id, values))
+
+    sets_by_id = WorkoutSet.objects.filter(
+        session__user=user, id__in={set_id for set_id, _ in parsed}
+    ).in_bulk()
+
+    changed = {}
+    changed_fields = set()
+    before = {}
+    for set_id, values in parsed:
+        set_obj = sets_by_id.get(set_id)
+        if set_obj is None:
+            continue
+        for field, value in values.items():
+            if getattr(set_obj, field) != value:
+                if set_id not in before:
+                    before[set_id] = set_snapshot(set_obj)
+                setattr(set_obj, field, value)
+                changed_fields.add(field)
+                changed[set_id] = set_obj
+
+    if changed:
+        WorkoutSet.objects.bulk_update(list(changed.values()), sorted(changed_fields))
+        bump_data_version(user.id)
+
+        # Session aggregates, one update per affected session
+        by_session = {}
+        for set_id, set_obj in changed.items():
+            snapshots = by_session.setdefault(set_obj.session_id, ([], []))
+            snapshots[0].append(before[set_id])
+            snapshots[1].append(set_snapshot(set_obj))
+        for session_id, (session_before, session_after) in by_session.items():
+            apply_set_changes(session_id, session_before, session_after)
+
+    results = []
+    for set_id, _ in parsed:
+        set_obj = sets_by_id.get(set_id)
+        if set_obj is None:
+            results.append({'id': set_id, 'error': 'Not found'})
+            continue
+        results.append({
+            'id': set_id,
+            'weight': float(set_obj.weight) if set_obj.weight is not None else None,
+            'reps': set_obj.reps,
+            'bodyweight': float(set_obj.bodyweight) if set_obj.bodyweight is not None else None,
+            'dropdownWeights': set_obj.dropdown_weights,
+            'loggedAt': set_obj.completed_at.isoformat() if set_obj.completed_at else None,
+        })
+    return results
+
+
+def copy_presets(templates: List[WorkoutPreset], user) -> List[WorkoutPreset]:
+    """
+    Deep-copy presets with their exercises and superset items to a user.
+
+    The graph is read with prefetches and written level by level: one
+    bulk_create of presets, one of preset exercises and one of superset items,
+    each level's returned ids remapping the foreign keys of the next. Copies
+    keep the order of templates and of their exercises. Call inside a
+    transaction.
+
+    Returns:
+        The new presets (saved), in the order of templates
+    """
+    graph = WorkoutPreset.objects.filter(id__in=[t.id for t in templates]).prefetch_related(
+        Prefetch('exercises', queryset=WorkoutPresetExercise.objects.order_by('order')),
+        Prefetch('exercises__superset_exercises', queryset=SupersetExerciseItem.objects.order_by('order')),
+    ).in_bulk()
+    sources = [graph[t.id] for t in templates]
+
+    new_presets = WorkoutPreset.objects.bulk_create([
+        WorkoutPreset(user=user, name=source.name, notes=source.notes)
+        for source in sources
+    ])
+
+    exercise_pairs = [
+        (preset_ex, WorkoutPresetExercise(
+            preset=new_preset,
+            exercise_id=preset_ex.exercise_id,
+            type=preset_ex.type,
+            sets=preset_ex.sets,
+            dropdowns=preset_ex.dropdowns,
+            include_warmup=preset_ex.include_warmup,
+            order=preset_ex.order,
+        ))
+        for source, new_preset in zip(sources, new_presets)
+        for preset_ex in source.exercises.all()
+    ]
+    WorkoutPresetExercise.objects.bulk_create([new_ex for _, new_ex in exercise_pairs])
+
+    SupersetExerciseItem.objects.bulk_create([
+        SupersetExerciseItem(
+            superset=new_ex,
+            exercise_id=sup_item.exercise_id,
+            type=sup_item.type,
+            dropdowns=sup_item.dropdowns,
+            include_warmup=sup_item.include_warmup,
+            order=sup_item.order,
+        )
+        for preset_ex, new_ex in exercise_pairs
+        # Only supersets carry items
+        if preset_ex.type == "superset"
+        for sup_item in preset_ex.superset_exercises.all()
+    ])
+
+    # bulk_create doesn't send post_save, bump the version for the new presets
+    bump_data_version(user.id)
+    return new_presets
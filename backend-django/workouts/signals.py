@@ -0,0 +1,99 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.db.models import Q
+from django.dispatch import receiver
+from users.versioning import bump_data_version
+from .blueprints import invalidate_preset_blueprints
+from .search import touch_exercises
+from .models import (
+    Exercise, ExerciseMuscleGroup, ExerciseTag, Equipment, MuscleGroup, MuscleRegion,
+    WorkoutSession, WorkoutSet, WorkoutPreset, WorkoutPresetExercise, SupersetExerciseItem
+)
+
+
+@receiver([post_save, post_delete], sender=WorkoutSession)
+@receiver([post_save, post_delete], sender=WorkoutPreset)
+def bump_owner_data_version(sender, instance, **kwargs):
+    # Template presets (user=None) aren't part of any user's data
+    if instance.user_id:
+        bump_data_version(instance.user_id, origin=kwargs.get('origin'))
+
+
+@receiver([post_save, post_delete], sender=WorkoutSet)
+def bump_set_data_version(sender, instance, **kwargs):
+    bump_data_version(origin=kwargs.get('origin'), workout_sessions__id=instance.session_id)
+
+
+@receiver([post_save, post_delete], sender=WorkoutPresetExercise)
+def bump_preset_exercise_data_version(sender, instance, **kwargs):
+    bump_data_version(origin=kwargs.get('origin'), workout_presets__id=instance.preset_id)
+
+
+@receiver([post_save, post_delete], sender=SupersetExerciseItem)
+def bump_superset_item_data_version(sender, instance, **kwargs):
+    bump_data_version(origin=kwargs.get('origin'), workout_presets__exercises__id=instance.superset_id)
+
+
+@receiver([post_save, post_delete], sender=WorkoutPresetExercise)
+def invalidate_preset_exercise_blueprint(sender, instance, **kwargs):
+    invalidate_preset_blueprints(pk=instance.preset_id)
+
+
+@receiver([post_save, post_delete], sender=SupersetExerciseItem)
+def invalidate_superset_item_blueprint(sender, instance, **kwargs):
+    invalidate_preset_blueprints(exercises__id=instance.superset_id)
+
+
+@receiver(post_save, sender=Exercise)
+def invalidate_exercise_blueprints(sender, instance, created, **kwargs):
+    # Blueprints embed is_bodyweight of the exercises they reference
+    if not created:
+        invalidate_preset_blueprints(
+            Q(exercises__exercise_id=instance.pk) | Q(exercises__superset_exercises__exercise_id=instance.pk)
+        )
+
+
+# Exercise search indexes rebuild when exercise updated_at changes; touch it when
+# data the index holds about an exercise changes outside Exercise.save()
+
+@receiver([post_save, post_delete], sender=ExerciseMuscleGroup)
+def touch_exercise_on_muscle_group_link(sender, instance, **kwargs):
+    touch_exercises(pk=instance.exercise_id)
+
+
+@receiver(m2m_changed, sender=Exercise.tags.through)
+@receiver(m2m_changed, sender=Exercise.muscle_groups.through)
+def touch_exercises_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_exercises(pk=instance.pk)
+    elif pk_set:
+        touch_exercises(pk__in=pk_set)
+    elif action == 'pre_clear':
+        field = 'tags' if sender is Exercise.tags.through else 'muscle_groups'
+        touch_exercises(**{field: instance})
+
+
+# Lookup from each related model to the exercises whose index entry shows it
+EXERCISE_LOOKUPS = {
+    MuscleGroup: 'muscle_groups',
+    MuscleRegion: 'muscle_groups__region',
+    Equipment: 'equipment',
+    ExerciseTag: 'tags',
+}
+
+
+@receiver(post_save, sender=MuscleGroup)
+@receiver(post_save, sender=MuscleRegion)
+@receiver(post_save, sender=Equipment)
+@receiver(post_save, sender=ExerciseTag)
+def touch_exercises_on_rename(sender, instance, created, **kwargs):
+    if not created:
+        touch_exercises(**{EXERCISE_LOOKUPS[sender]: instance})
+
+
+@receiver(pre_delete, sender=Equipment)
+@receiver(pre_delete, sender=ExerciseTag)
+def touch_exercises_on_delete(sender, instance, **kwargs):
+    # Equipment is SET_NULL and tag links are fast-deleted, neither sends signals per exercise
+    touch_exercises(**{EXERCISE_LOOKUPS[sender]: instance})
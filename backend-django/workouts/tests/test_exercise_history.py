@@ -0,0 +1,83 @@
+"""
+Tests for the per-exercise set history endpoint.
+"""
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import Exercise, WorkoutSession, WorkoutSet
+from users.models import User
+
+
+class TestExerciseHistory(TestCase):
+    """Test listing a user's completed sets for one exercise."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="histuser", email="hist@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.bench = Exercise.objects.create(name="Bench Press")
+        self.squat = Exercise.objects.create(name="Squat")
+
+        base = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+        self.sessions = []
+        for day in range(3):
+            session = WorkoutSession.objects.create(
+                user=self.user, name=f"Day {day}", created_at=base + timedelta(days=day)
+            )
+            self.sessions.append(session)
+            for i in range(3):
+                WorkoutSet.objects.create(
+                    session=session, exercise=self.bench, set_order=i, weight=60 + i, reps=10,
+                    completed_at=session.created_at + timedelta(minutes=i)
+                )
+            # Incomplete set and another exercise are not part of the history
+            WorkoutSet.objects.create(session=session, exercise=self.bench, set_order=3, weight=70, reps=10)
+            WorkoutSet.objects.create(
+                session=session, exercise=self.squat, set_order=4, weight=100, reps=5,
+                completed_at=session.created_at
+            )
+
+        other = User.objects.create_user(username="other", email="other@test.com", password="pass")
+        other_session = WorkoutSession.objects.create(user=other, name="Other", created_at=base)
+        WorkoutSet.objects.create(
+            session=other_session, exercise=self.bench, set_order=0, weight=200, reps=1, completed_at=base
+        )
+
+    def test_history_grouped_by_session_newest_first(self):
+        response = self.client.get(reverse("exercise-history", kwargs={"pk": self.bench.id}))
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([g["name"] for g in results], ["Day 2", "Day 1", "Day 0"])
+        self.assertEqual([s["weight"] for s in results[0]["sets"]], [62, 61, 60])
+        self.assertIsNone(response.data["nextCursor"])
+
+    def test_history_pages_continue_across_sessions(self):
+        """Paging by sets visits all nine sets once; a split session continues on the next page."""
+        url = reverse("exercise-history", kwargs={"pk": self.bench.id})
+        first = self.client.get(url, {"limit": 4}).data
+        self.assertEqual([len(g["sets"]) for g in first["results"]], [3, 1])
+
+        second = self.client.get(url, {"limit": 4, "cursor": first["nextCursor"]}).data
+        self.assertEqual(second["results"][0]["sessionId"], first["results"][-1]["sessionId"])
+
+        third = self.client.get(url, {"limit": 4, "cursor": second["nextCursor"]}).data
+        self.assertIsNone(third["nextCursor"])
+        ids = [s["id"] for page in (first, second, third) for g in page["results"] for s in g["sets"]]
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(len(set(ids)), 9)
+
+    def test_history_uses_user_exercise_index(self):
+        """The history query is served by the (user, exercise, completed_at) index."""
+        plan = WorkoutSet.objects.filter(
+            user=self.user, exercise=self.bench, completed_at__isnull=False
+        ).order_by('-completed_at', '-id').explain()
+        self.assertIn("set_user_exercise_done_idx", plan)
+
+    def test_unknown_exercise_returns_404(self):
+        response = self.client.get(reverse("exercise-history", kwargs={"pk": 9999}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_sets_carry_user_from_session(self):
+        """Sets created through any path record the session's user."""
+        self.assertFalse(WorkoutSet.objects.filter(user__isnull=True).exists())
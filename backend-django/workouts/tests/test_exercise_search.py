@@ -0,0 +1,93 @@
+"""
+Tests for the ranked exercise search endpoint.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import (
+    Equipment, Exercise, ExerciseMuscleGroup, ExerciseTag, MuscleGroup, MuscleRegion
+)
+
+
+class TestExerciseSearch(TestCase):
+    """Test searching exercises by name with filters."""
+
+    def setUp(self):
+        self.client = APIClient()
+        upper = MuscleRegion.objects.create(name="Upper Body")
+        lower = MuscleRegion.objects.create(name="Lower Body")
+        chest = MuscleGroup.objects.create(name="Chest", region=upper)
+        quads = MuscleGroup.objects.create(name="Quads", region=lower)
+        self.barbell = Equipment.objects.create(name="Barbell")
+        dumbbell = Equipment.objects.create(name="Dumbbell")
+        self.compound = ExerciseTag.objects.create(name="Compound")
+
+        def exercise(name, muscle, equipment=None, bodyweight=False):
+            ex = Exercise.objects.create(name=name, equipment=equipment, is_bodyweight=bodyweight)
+            ExerciseMuscleGroup.objects.create(exercise=ex, muscle_group=muscle)
+            return ex
+
+        self.bench = exercise("Bench Press", chest, self.barbell)
+        self.incline = exercise("Incline Dumbbell Bench Press", chest, dumbbell)
+        self.squat = exercise("Back Squat", quads, self.barbell)
+        self.pushup = exercise("Push-Up", chest, bodyweight=True)
+        self.bench.tags.add(self.compound)
+        self.squat.tags.add(self.compound)
+
+    def search(self, **params):
+        response = self.client.get(reverse("exercise-search"), params, doseq=True)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def names(self, **params):
+        return [r["name"] for r in self.search(**params)["results"]]
+
+    def test_ranking_prefix_before_substring(self):
+        """Name prefix ranks above a later word match; unrelated exercises are left out."""
+        self.assertEqual(self.names(q="bench"), ["Bench Press", "Incline Dumbbell Bench Press"])
+        self.assertEqual(self.names(q="pres")[0], "Bench Press")
+        self.assertEqual(self.names(q="push up"), ["Push-Up"])
+
+    def test_typos_match_by_trigram_similarity(self):
+        self.assertEqual(self.names(q="bench pres"), ["Bench Press", "Incline Dumbbell Bench Press"])
+        self.assertIn("Back Squat", self.names(q="bak squat"))
+
+    def test_filters(self):
+        """Filters match names case-insensitively, combine with AND and accept several values."""
+        self.assertEqual(self.names(region="lower body"), ["Back Squat"])
+        self.assertEqual(self.names(muscleGroup="Chest", equipment="Barbell"), ["Bench Press"])
+        self.assertEqual(self.names(tag="compound", q="b"), ["Back Squat", "Bench Press"])
+        self.assertEqual(
+            self.names(equipment=["Barbell", "Dumbbell"], muscleGroup="Chest"),
+            ["Bench Press", "Incline Dumbbell Bench Press"]
+        )
+
+    def test_results_have_picker_shape_and_paginate(self):
+        first = self.search(limit=3)
+        self.assertEqual(first["count"], 4)
+        self.assertEqual(first["nextOffset"], 3)
+        row = first["results"][0]
+        self.assertEqual(row, {
+            "id": self.squat.id, "name": "Back Squat", "muscleGroups": ["Quads"],
+            "equipment": "Barbell", "bodyweight": False,
+        })
+        second = self.search(limit=3, offset=3)
+        self.assertEqual([r["name"] for r in second["results"]], ["Push-Up"])
+        self.assertIsNone(second["nextOffset"])
+        self.assertEqual(self.client.get(reverse("exercise-search"), {"offset": -1}).status_code, 400)
+
+    def test_index_rebuilds_when_exercises_change(self):
+        self.search(q="bench")
+        with self.assertNumQueries(1):
+            # Unchanged exercises: only the fingerprint query
+            self.search(q="bench")
+
+        Exercise.objects.create(name="Close-Grip Bench Press")
+        self.assertIn("Close-Grip Bench Press", self.names(q="bench"))
+
+        self.barbell.name = "Olympic Barbell"
+        self.barbell.save()
+        self.assertEqual(self.names(equipment="Olympic Barbell"), ["Back Squat", "Bench Press"])
+
+        self.bench.tags.remove(self.compound)
+        self.assertEqual(self.names(tag="Compound"), ["Back Squat"])
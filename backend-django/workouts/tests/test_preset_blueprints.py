@@ -0,0 +1,90 @@
+"""
+Tests for compiled, cached preset blueprints used by start_workout.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.blueprints import get_preset_blueprint
+from workouts.models import Exercise, WorkoutPreset, WorkoutPresetExercise, SupersetExerciseItem
+from users.models import User
+
+
+class TestPresetBlueprints(TestCase):
+    """Test blueprint compilation, caching and invalidation."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="blueprintuser", email="bp@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.bench = Exercise.objects.create(name="Bench Press")
+        self.dips = Exercise.objects.create(name="Dips")
+        self.curl = Exercise.objects.create(name="Curl")
+
+        self.preset = WorkoutPreset.objects.create(user=self.user, name="Push")
+        WorkoutPresetExercise.objects.create(
+            preset=self.preset, exercise=self.bench, type="dropdown", sets=2, dropdowns=1, include_warmup=True, order=0
+        )
+        self.add_superset(self.preset, order=1)
+
+    def add_superset(self, preset, order):
+        superset = WorkoutPresetExercise.objects.create(preset=preset, type="superset", sets=2, order=order)
+        SupersetExerciseItem.objects.create(superset=superset, exercise=self.curl, order=1)
+        SupersetExerciseItem.objects.create(superset=superset, exercise=self.dips, order=0, include_warmup=True)
+        return superset
+
+    def start(self, preset):
+        return self.client.post(reverse("workoutpreset-start-workout", kwargs={"pk": preset.id}), {}, format="json")
+
+    def test_blueprint_is_flat_and_ordered(self):
+        self.preset.refresh_from_db()
+        blueprint = get_preset_blueprint(self.preset)
+        self.assertEqual(blueprint, [
+            (self.bench.id, False, 'warmup', 0),
+            (self.bench.id, False, 'dropdown', 1),
+            (self.bench.id, False, 'dropdown', 1),
+            (self.dips.id, False, 'warmup', 0),
+            (self.dips.id, False, 'working', 0),
+            (self.curl.id, False, 'working', 0),
+            (self.dips.id, False, 'working', 0),
+            (self.curl.id, False, 'working', 0),
+        ])
+
+    def test_cached_blueprint_costs_no_queries(self):
+        self.preset.refresh_from_db()
+        get_preset_blueprint(self.preset)
+        with self.assertNumQueries(0):
+            get_preset_blueprint(self.preset)
+
+    def test_edits_invalidate_blueprint(self):
+        """Editing a superset item or a referenced exercise recompiles the blueprint."""
+        self.start(self.preset)
+
+        SupersetExerciseItem.objects.filter(exercise=self.curl).get().delete()
+        response = self.start(self.preset)
+        self.assertNotIn(self.curl.id, [s["exerciseId"] for s in response.data["sets"]])
+
+        self.dips.is_bodyweight = True
+        self.dips.save()
+        response = self.start(self.preset)
+        dips_types = {s["setType"] for s in response.data["sets"] if s["exerciseId"] == self.dips.id}
+        self.assertEqual(dips_types, {"bodyweight"})
+
+    def test_start_workout_query_count_independent_of_supersets(self):
+        """Starting a preset costs the same queries with one superset or many."""
+        self.start(self.preset)
+        with CaptureQueriesContext(connection) as small:
+            response = self.start(self.preset)
+        self.assertEqual(len(response.data["sets"]), 8)
+
+        big = WorkoutPreset.objects.create(user=self.user, name="Big")
+        for order in range(5):
+            self.add_superset(big, order)
+        self.start(big)
+        with CaptureQueriesContext(connection) as large:
+            response = self.start(big)
+        self.assertEqual(len(response.data["sets"]), 25)
+        self.assertEqual(len(large), len(small))
@@ -0,0 +1,144 @@
+"""
+Tests for denormalized workout session aggregates.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import Exercise, WorkoutSession, WorkoutSet
+from users.models import User
+
+
+class TestSessionAggregates(TestCase):
+    """Test that set write paths keep session aggregates in step with the sets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="agguser", email="agg@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.bench = Exercise.objects.create(name="Bench Press")
+        self.dips = Exercise.objects.create(name="Dips", is_bodyweight=True)
+        self.started = datetime(2025, 1, 6, 9, 0, tzinfo=timezone.utc)
+        self.session = WorkoutSession.objects.create(user=self.user, name="Push", created_at=self.started)
+        self.normal = WorkoutSet.objects.create(
+            session=self.session, exercise=self.bench, set_order=0, weight=60, reps=10
+        )
+        self.dropdown = WorkoutSet.objects.create(
+            session=self.session, exercise=self.bench, set_order=1, set_type="dropdown", weight=60, reps=10,
+            dropdown_weights=[{"weight": 60, "reps": 10}, {"weight": 50, "reps": 8}]
+        )
+        self.bodyweight = WorkoutSet.objects.create(
+            session=self.session, exercise=self.dips, set_order=2, set_type="bodyweight", reps=12, bodyweight=80
+        )
+
+    def _session(self):
+        return WorkoutSession.objects.get(id=self.session.id)
+
+    def test_complete_and_uncomplete(self):
+        """Completing adds the set's volume and completion time; uncompleting removes them."""
+        self.client.post(reverse("workoutset-complete", kwargs={"pk": self.normal.id}))
+        self.client.post(reverse("workoutset-complete", kwargs={"pk": self.dropdown.id}))
+        self.client.post(reverse("workoutset-complete", kwargs={"pk": self.bodyweight.id}))
+
+        session = self._session()
+        # 60x10 + (60x10 + 50x8) + 80x12
+        self.assertEqual(session.total_volume, Decimal("2560"))
+        self.assertEqual(session.completed_sets, 3)
+        first_done = WorkoutSet.objects.get(id=self.normal.id).completed_at
+        self.assertEqual(session.first_completed_at, first_done)
+
+        self.client.post(reverse("workoutset-uncomplete", kwargs={"pk": self.normal.id}))
+        session = self._session()
+        self.assertEqual(session.total_volume, Decimal("1960"))
+        self.assertEqual(session.completed_sets, 2)
+        self.assertEqual(session.first_completed_at, WorkoutSet.objects.get(id=self.dropdown.id).completed_at)
+
+    def test_failed_aggregate_update_rolls_back_the_set_write(self):
+        """A set write never lands without its session aggregates."""
+        from unittest import mock
+        with mock.patch("workouts.views.apply_set_changes", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse("workoutset-complete", kwargs={"pk": self.normal.id}))
+            with self.assertRaises(RuntimeError):
+                self.client.delete(reverse("workoutset-detail", kwargs={"pk": self.normal.id}))
+        self.assertIsNone(WorkoutSet.objects.get(id=self.normal.id).completed_at)
+        self.assertEqual(self._session().completed_sets, 0)
+
+    def test_malformed_dropdown_entries_count_as_nothing(self):
+        """Dropdown entries that are not objects don't break writes or the backfill."""
+        self.client.post(reverse("workoutset-complete", kwargs={"pk": self.dropdown.id}))
+        response = self.client.patch(
+            reverse("workoutset-detail", kwargs={"pk": self.dropdown.id}),
+            {"dropdownWeights": [{"weight": 60, "reps": 10}, 5, "drop", None]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._session().total_volume, Decimal("600"))
+
+        WorkoutSet.objects.filter(id=self.dropdown.id).update(dropdown_weights="60x10")
+        call_command("backfill_session_aggregates", stdout=StringIO())
+        # Not a list of entries: the set counts like a normal one, 60x10
+        self.assertEqual(self._session().total_volume, Decimal("600"))
+
+    def test_patch_and_delete_completed_set(self):
+        """Editing a completed set applies the volume delta; deleting it removes its share."""
+        self.client.post(reverse("workoutset-complete", kwargs={"pk": self.normal.id}))
+        self.client.patch(
+            reverse("workoutset-detail", kwargs={"pk": self.normal.id}), {"weight": 70}, format="json"
+        )
+        self.assertEqual(self._session().total_volume, Decimal("700"))
+
+        self.client.delete(reverse("workoutset-detail", kwargs={"pk": self.normal.id}))
+        session = self._session()
+        self.assertEqual(session.total_volume, 0)
+        self.assertEqual(session.completed_sets, 0)
+        self.assertIsNone(session.first_completed_at)
+
+    def test_batch_and_session_sync(self):
+        """Batch operations and session PATCH sync keep aggregates current."""
+        self.client.post(reverse("workoutset-batch"), {"operations": [
+            {"id": self.normal.id, "op": "complete", "loggedAt": "2025-01-06T09:10:00Z"},
+            {"id": self.bodyweight.id, "op": "complete", "loggedAt": "2025-01-06T09:20:00Z"},
+        ]}, format="json")
+        session = self._session()
+        self.assertEqual(session.total_volume, Decimal("1560"))
+        self.assertEqual(session.last_completed_at, self.started + timedelta(minutes=20))
+
+        # Resend only the bench set with more reps; the other two sets are dropped
+        response = self.client.patch(reverse("workoutsession-detail", kwargs={"pk": self.session.id}), {
+            "sets": [{"id": self.normal.id, "exerciseId": self.bench.id, "setType": "normal",
+                      "weight": 60, "reps": 12, "loggedAt": "2025-01-06T09:10:00Z"}],
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        session = self._session()
+        self.assertEqual(session.total_volume, Decimal("720"))
+        self.assertEqual(session.completed_sets, 1)
+        self.assertEqual(session.last_completed_at, self.started + timedelta(minutes=10))
+
+    def test_finish_sets_duration_and_keeps_aggregates(self):
+        """finish records the duration and a stale session save doesn't clobber aggregates."""
+        stale = WorkoutSession.objects.get(id=self.session.id)
+        self.client.post(reverse("workoutset-complete", kwargs={"pk": self.normal.id}))
+
+        stale.finished_at = self.started + timedelta(minutes=50)
+        stale.save()
+        session = self._session()
+        self.assertEqual(session.duration_seconds, 50 * 60)
+        self.assertEqual(session.total_volume, Decimal("600"))
+
+        response = self.client.post(reverse("workoutsession-finish", kwargs={"pk": self.session.id}))
+        self.assertIsNotNone(response.data["durationSeconds"])
+        self.assertEqual(response.data["totalVolume"], 600)
+
+    def test_backfill_command(self):
+        """The backfill command recomputes aggregates from stored sets."""
+        WorkoutSet.objects.filter(session=self.session).update(completed_at=self.started + timedelta(minutes=5))
+        WorkoutSession.objects.filter(id=self.session.id).update(finished_at=self.started + timedelta(hours=1))
+
+        call_command("backfill_session_aggregates", batch_size=1, stdout=StringIO())
+        session = self._session()
+        self.assertEqual(session.total_volume, Decimal("2560"))
+        self.assertEqual(session.completed_sets, 3)
+        self.assertEqual(session.duration_seconds, 3600)
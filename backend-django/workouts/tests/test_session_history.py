@@ -0,0 +1,161 @@
+"""
+Tests for cursor-paginated, filtered workout session history.
+"""
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import Exercise, WorkoutPreset, WorkoutSession, WorkoutSet
+from workouts.aggregates import recalculate_session_aggregates
+from users.models import User
+
+
+class TestSessionHistory(TestCase):
+    """Test listing session history with keyset pagination and filters."""
+
+    def setUp(self):
+        """Create a user with ten sessions, one per day, the even ones from a preset."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="historyuser", email="history@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.preset = WorkoutPreset.objects.create(user=self.user, name="Push Day")
+
+        self.base = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+        self.sessions = []
+        for day in range(10):
+            self.sessions.append(WorkoutSession.objects.create(
+                user=self.user,
+                name=f"Session {day}",
+                preset=self.preset if day % 2 == 0 else None,
+                created_at=self.base + timedelta(days=day),
+            ))
+
+        # Another user's sessions must never show up
+        other = User.objects.create_user(username="other", email="other@test.com", password="pass")
+        WorkoutSession.objects.create(user=other, name="Other", created_at=self.base)
+
+    def test_list_without_limit_returns_plain_list(self):
+        """Without limit/cursor the response stays a plain list."""
+        response = self.client.get(reverse("workoutsession-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 10)
+
+    def test_pages_walk_history_newest_first(self):
+        """Following nextCursor visits every session exactly once, newest first."""
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(reverse("workoutsession-list"), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen.extend(s["id"] for s in response.data["results"])
+            cursor = response.data["nextCursor"]
+            if not cursor:
+                break
+
+        expected = [s.id for s in reversed(self.sessions)]
+        self.assertEqual(seen, expected)
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        """Sessions sharing a start time are neither skipped nor repeated across pages."""
+        latest = self.base + timedelta(days=9)
+        extra = [
+            WorkoutSession.objects.create(user=self.user, name=f"Tie {i}", created_at=latest)
+            for i in range(3)
+        ]
+
+        first = self.client.get(reverse("workoutsession-list"), {"limit": 2})
+        second = self.client.get(
+            reverse("workoutsession-list"), {"limit": 2, "cursor": first.data["nextCursor"]}
+        )
+        ids = [s["id"] for s in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, [extra[2].id, extra[1].id, extra[0].id, self.sessions[9].id])
+
+    def test_date_and_preset_filters(self):
+        """from/to bound the start date (to is inclusive for dates) and preset narrows further."""
+        response = self.client.get(
+            reverse("workoutsession-list"),
+            {"from": "2025-01-03", "to": "2025-01-06", "limit": 10}
+        )
+        names = [s["name"] for s in response.data["results"]]
+        self.assertEqual(names, ["Session 5", "Session 4", "Session 3", "Session 2"])
+
+        response = self.client.get(
+            reverse("workoutsession-list"),
+            {"from": "2025-01-03", "to": "2025-01-06", "preset": self.preset.id}
+        )
+        names = sorted(s["name"] for s in response.data)
+        self.assertEqual(names, ["Session 2", "Session 4"])
+
+    def test_invalid_params_return_400(self):
+        """Malformed cursors, limits and dates are rejected."""
+        url = reverse("workoutsession-list")
+        self.assertEqual(self.client.get(url, {"cursor": "not-a-cursor"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"limit": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "yesterday"}).status_code, 400)
+
+
+class TestSessionSummaryView(TestCase):
+    """Test the view=summary projection of the session list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="summaryuser", email="summary@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.bench = Exercise.objects.create(name="Bench Press")
+        self.dips = Exercise.objects.create(name="Dips", is_bodyweight=True)
+
+        started = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+        self.session = WorkoutSession.objects.create(
+            user=self.user, name="Push", created_at=started, finished_at=started + timedelta(minutes=45)
+        )
+        done = started + timedelta(minutes=5)
+        WorkoutSet.objects.create(session=self.session, exercise=self.bench, set_order=0, weight=60, reps=10, completed_at=done)
+        WorkoutSet.objects.create(session=self.session, exercise=self.bench, set_order=1, weight=70, reps=5, completed_at=done)
+        WorkoutSet.objects.create(session=self.session, exercise=self.bench, set_order=2, weight=80, reps=5)
+        WorkoutSet.objects.create(session=self.session, exercise=self.dips, set_order=3, set_type="bodyweight", reps=12, completed_at=done)
+
+        self.empty = WorkoutSession.objects.create(user=self.user, name="Empty", created_at=started + timedelta(days=1))
+        # Sets were written directly, outside the set write paths
+        recalculate_session_aggregates([self.session, self.empty])
+
+    def test_summary_aggregates(self):
+        """Summary rows carry counts, volume, duration and exercise ids but no sets."""
+        response = self.client.get(reverse("workoutsession-list"), {"view": "summary"})
+        self.assertEqual(response.status_code, 200)
+        rows = {row["id"]: row for row in response.data}
+
+        row = rows[self.session.id]
+        self.assertNotIn("sets", row)
+        self.assertEqual(row["setCount"], 4)
+        self.assertEqual(row["completedSetCount"], 3)
+        self.assertEqual(row["totalVolume"], 950)
+        self.assertEqual(row["durationSeconds"], 45 * 60)
+        self.assertEqual(row["exerciseIds"], [self.bench.id, self.dips.id])
+
+        empty = rows[self.empty.id]
+        self.assertEqual(empty["setCount"], 0)
+        self.assertEqual(empty["totalVolume"], 0)
+        self.assertIsNone(empty["durationSeconds"])
+        self.assertEqual(empty["exerciseIds"], [])
+
+    def test_full_summary_filters_sets_by_subquery(self):
+        """Without pagination, sets are filtered by a subquery rather than a list of every session id."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("workoutsession-list"), {"view": "summary"})
+        self.assertEqual(len(response.data), 2)
+        sets_query = next(q["sql"] for q in queries.captured_queries if 'FROM "workouts_workoutset"' in q["sql"])
+        self.assertIn("IN (SELECT", sets_query)
+
+    def test_summary_with_pagination_uses_constant_queries(self):
+        """A summary page costs the same number of queries regardless of set count."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("workoutsession-list"), {"view": "summary", "limit": 1})
+        self.assertEqual([r["id"] for r in response.data["results"]], [self.empty.id])
+        self.assertIsNotNone(response.data["nextCursor"])
@@ -0,0 +1,126 @@
+"""
+Tests for syncing session sets on create and PATCH as one transactional diff.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import Exercise, WorkoutSession, WorkoutSet
+from users.models import User
+
+
+class TestSessionSetSync(TestCase):
+    """Test that session create/PATCH apply set changes as bulk writes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="syncuser", email="sync@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.bench = Exercise.objects.create(name="Bench Press")
+        self.squat = Exercise.objects.create(name="Squat")
+
+    def _create_session(self, n_sets=30):
+        sets = [
+            {"exerciseId": self.bench.id, "setType": "normal", "weight": 60, "reps": 10,
+             "loggedAt": "2025-01-06T09:00:00.000Z"}
+            for _ in range(n_sets)
+        ]
+        return self.client.post(
+            reverse("workoutsession-list"),
+            {"name": "Push", "startedAt": "2025-01-06T09:00:00.000Z", "sets": sets},
+            format="json"
+        )
+
+    def test_create_inserts_sets_in_bulk(self):
+        """Creating a session with 30 sets costs a fixed number of queries."""
+        with self.assertNumQueries(9):
+            response = self._create_session(30)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["sets"]), 30)
+        self.assertEqual(WorkoutSet.objects.filter(session_id=response.data["id"]).count(), 30)
+
+    def test_patch_applies_diff(self):
+        """PATCH updates changed sets, creates new ones, deletes missing ones."""
+        session_id = self._create_session(3).data["id"]
+        stored = list(WorkoutSet.objects.filter(session_id=session_id).order_by("set_order"))
+
+        payload = [
+            # Unchanged (weight given as float, timestamp in another format)
+            {"id": stored[0].id, "set_order": 0, "exerciseId": self.bench.id, "setType": "normal",
+             "weight": 60.0, "reps": 10, "loggedAt": "2025-01-06T09:00:00+00:00"},
+            # Changed weight
+            {"id": stored[1].id, "set_order": 1, "exerciseId": self.bench.id, "setType": "normal",
+             "weight": 62.5, "reps": 10, "loggedAt": "2025-01-06T09:00:00.000Z"},
+            # New set; stored[2] is omitted and must be deleted
+            {"exerciseId": self.squat.id, "setType": "normal", "weight": 100, "reps": 5},
+        ]
+        response = self.client.patch(
+            reverse("workoutsession-detail", kwargs={"pk": session_id}) + "?response=delta",
+            {"sets": payload},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], [stored[1].id])
+        self.assertEqual(response.data["deleted"], [stored[2].id])
+        self.assertEqual(len(response.data["created"]), 1)
+        self.assertNotIn("sets", response.data)
+
+        stored[1].refresh_from_db()
+        self.assertEqual(float(stored[1].weight), 62.5)
+        self.assertFalse(WorkoutSet.objects.filter(id=stored[2].id).exists())
+        new_set = WorkoutSet.objects.get(id=response.data["created"][0])
+        self.assertEqual(new_set.exercise_id, self.squat.id)
+        self.assertEqual(new_set.set_order, 2)
+
+    def test_patch_with_many_sets_uses_constant_queries(self):
+        """A 30-set autosave where every set changed is still a handful of statements."""
+        session_id = self._create_session(30).data["id"]
+        payload = [
+            {"id": s.id, "set_order": s.set_order, "exerciseId": self.bench.id, "setType": "normal",
+             "weight": 65, "reps": 8, "loggedAt": "2025-01-06T09:10:00Z"}
+            for s in WorkoutSet.objects.filter(session_id=session_id)
+        ]
+        url = reverse("workoutsession-detail", kwargs={"pk": session_id}) + "?response=delta"
+        with self.assertNumQueries(11):
+            response = self.client.patch(url, {"sets": payload}, format="json")
+        self.assertEqual(len(response.data["updated"]), 30)
+        self.assertEqual(
+            WorkoutSet.objects.filter(session_id=session_id, weight=65, reps=8).count(), 30
+        )
+
+    def test_patch_full_response_reflects_sync(self):
+        """Without ?response=delta the full session is returned with the synced sets."""
+        session_id = self._create_session(2).data["id"]
+        response = self.client.patch(
+            reverse("workoutsession-detail", kwargs={"pk": session_id}),
+            {"sets": [], "endedAt": "2025-01-06T10:00:00Z"},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sets"], [])
+        self.assertIsNotNone(WorkoutSession.objects.get(id=session_id).finished_at)
+
+    def test_invalid_set_rolls_back(self):
+        """A malformed set rejects the whole request and leaves nothing behind."""
+        response = self.client.post(
+            reverse("workoutsession-list"),
+            {"name": "Bad", "sets": [{"exerciseId": self.bench.id, "loggedAt": "not-a-date"}]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WorkoutSession.objects.filter(name="Bad").exists())
+
+    def test_malformed_weight_returns_400(self):
+        """A weight that is not a number is a client error, on create and on PATCH."""
+        sets = [{"exerciseId": self.bench.id, "weight": "abc", "reps": 5, "loggedAt": "2025-01-06T09:00:00Z"}]
+        response = self.client.post(
+            reverse("workoutsession-list"), {"name": "Bad weight", "sets": sets}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WorkoutSession.objects.filter(name="Bad weight").exists())
+
+        session_id = self._create_session(n_sets=2).data["id"]
+        response = self.client.patch(
+            reverse("workoutsession-detail", kwargs={"pk": session_id}), {"sets": sets}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(WorkoutSet.objects.filter(session_id=session_id).count(), 2)
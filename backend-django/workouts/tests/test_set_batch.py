@@ -0,0 +1,98 @@
+"""
+Tests for the batch set mutation endpoint.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import Exercise, WorkoutSession, WorkoutSet
+from users.models import User
+
+
+class TestSetBatch(TestCase):
+    """Test applying many set operations in one request."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="batchuser", email="batch@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        exercise = Exercise.objects.create(name="Bench Press")
+        session = WorkoutSession.objects.create(user=self.user, name="Push")
+        self.sets = [
+            WorkoutSet.objects.create(session=session, exercise=exercise, set_order=i, weight=60, reps=10)
+            for i in range(10)
+        ]
+
+        other = User.objects.create_user(username="other", email="other@test.com", password="pass")
+        other_session = WorkoutSession.objects.create(user=other, name="Other")
+        self.other_set = WorkoutSet.objects.create(session=other_session, exercise=exercise, set_order=0)
+
+    def test_batch_applies_operations(self):
+        """complete, patch and uncomplete are applied in order per set."""
+        operations = [
+            {"id": self.sets[0].id, "op": "patch", "fields": {"weight": 62.5, "reps": 8}},
+            {"id": self.sets[0].id, "op": "complete"},
+            {"id": self.sets[1].id, "op": "complete", "loggedAt": "2025-01-06T09:00:00Z"},
+            {"id": self.sets[1].id, "op": "uncomplete"},
+            {"id": self.sets[2].id, "op": "patch", "fields": {"dropdownWeights": [{"weight": 50, "reps": 6}]}},
+        ]
+        response = self.client.post(reverse("workoutset-batch"), {"operations": operations}, format="json")
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[1]["weight"], 62.5)
+        self.assertEqual(results[1]["reps"], 8)
+        self.assertIsNotNone(results[1]["loggedAt"])
+        self.assertIsNone(results[3]["loggedAt"])
+
+        self.sets[0].refresh_from_db()
+        self.assertEqual(float(self.sets[0].weight), 62.5)
+        self.assertIsNotNone(self.sets[0].completed_at)
+        self.sets[1].refresh_from_db()
+        self.assertIsNone(self.sets[1].completed_at)
+        self.sets[2].refresh_from_db()
+        self.assertEqual(self.sets[2].dropdown_weights, [{"weight": 50, "reps": 6}])
+
+    def test_batch_uses_constant_queries(self):
+        """Completing ten sets is one read and one bulk update."""
+        operations = [{"id": s.id, "op": "complete"} for s in self.sets]
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse("workoutset-batch"), {"operations": operations}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WorkoutSet.objects.filter(completed_at__isnull=False).count(), 10)
+
+    def test_other_users_sets_are_not_found(self):
+        """Sets of other users are reported as not found and left untouched."""
+        operations = [
+            {"id": self.other_set.id, "op": "complete"},
+            {"id": self.sets[0].id, "op": "complete"},
+        ]
+        response = self.client.post(reverse("workoutset-batch"), {"operations": operations}, format="json")
+        self.assertEqual(response.data["results"][0], {"id": self.other_set.id, "error": "Not found"})
+        self.other_set.refresh_from_db()
+        self.assertIsNone(self.other_set.completed_at)
+
+    def test_malformed_batch_writes_nothing(self):
+        """An invalid operation rejects the whole batch."""
+        operations = [
+            {"id": self.sets[0].id, "op": "complete"},
+            {"id": self.sets[1].id, "op": "patch", "fields": {"session": 99}},
+        ]
+        response = self.client.post(reverse("workoutset-batch"), {"operations": operations}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.sets[0].refresh_from_db()
+        self.assertIsNone(self.sets[0].completed_at)
+
+        response = self.client.post(
+            reverse("workoutset-batch"),
+            {"operations": [{"id": self.sets[0].id, "op": "patch", "fields": {"weight": "heavy"}}]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        for fields in (["weight"], "weight", 5):
+            response = self.client.post(
+                reverse("workoutset-batch"),
+                {"operations": [{"id": self.sets[0].id, "op": "patch", "fields": fields}]},
+                format="json"
+            )
+            self.assertEqual(response.status_code, 400)
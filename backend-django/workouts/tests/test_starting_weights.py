@@ -0,0 +1,116 @@
+"""
+Tests for seeding generated sets from the user's history.
+"""
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from workouts.models import Exercise, WorkoutPreset, WorkoutPresetExercise, WorkoutSession, WorkoutSet
+from workouts.services import load_starting_loads
+from users.models import User, ExerciseSettings
+
+
+class TestStartingWeights(TestCase):
+    """Test that start_workout seeds weights/reps from the last completed sets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="seeduser", email="seed@test.com", password="pass")
+        self.client.force_authenticate(user=self.user)
+        self.bench = Exercise.objects.create(name="Bench Press")
+        self.row = Exercise.objects.create(name="Row")
+        self.fly = Exercise.objects.create(name="Fly")
+
+        self.preset = WorkoutPreset.objects.create(user=self.user, name="Push")
+        WorkoutPresetExercise.objects.create(
+            preset=self.preset, exercise=self.bench, type="normal", sets=3, include_warmup=True, order=0
+        )
+
+        base = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+        older = WorkoutSession.objects.create(user=self.user, name="Old", created_at=base)
+        WorkoutSet.objects.create(session=older, exercise=self.bench, set_order=0, weight=50, reps=10, completed_at=base)
+
+        self.last = WorkoutSession.objects.create(user=self.user, name="Last", created_at=base + timedelta(days=2))
+        done = base + timedelta(days=2)
+        WorkoutSet.objects.create(session=self.last, exercise=self.bench, set_order=0, weight=None, reps=10, completed_at=done)
+        WorkoutSet.objects.create(session=self.last, exercise=self.bench, set_order=1, weight=80, reps=8, completed_at=done)
+        WorkoutSet.objects.create(session=self.last, exercise=self.bench, set_order=2, weight=75, reps=8, completed_at=done)
+
+    def start(self, preset=None, **data):
+        preset = preset or self.preset
+        return self.client.post(
+            reverse("workoutpreset-start-workout", kwargs={"pk": preset.id}), data, format="json"
+        )
+
+    def working_sets(self, response, exercise):
+        return [
+            (float(s["weight"]), s["reps"]) for s in response.data["sets"]
+            if s["exerciseId"] == exercise.id and s["weight"] is not None
+        ]
+
+    def test_sets_seeded_from_last_session(self):
+        """Working set n starts from last time's set n; extra sets repeat the last one."""
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.working_sets(response, self.bench), [(80, 8), (75, 8), (75, 8)])
+        # Warmup stays unweighted
+        self.assertIsNone(response.data["sets"][0]["weight"])
+
+    def test_settings_fallback_and_defaults(self):
+        """Without history, ExerciseSettings seeds the sets; without either, defaults apply."""
+        ExerciseSettings.objects.create(user=self.user, exercise=self.row, weight=42.5, reps=12)
+        preset = WorkoutPreset.objects.create(user=self.user, name="Pull")
+        WorkoutPresetExercise.objects.create(preset=preset, exercise=self.row, type="normal", sets=2, order=0)
+        WorkoutPresetExercise.objects.create(preset=preset, exercise=self.fly, type="normal", sets=1, order=1)
+
+        response = self.start(preset)
+        self.assertEqual(self.working_sets(response, self.row), [(42.5, 12)] * 2)
+        self.assertEqual(self.working_sets(response, self.fly), [(60, 10)])
+
+    def test_progression_applies_only_when_target_reps_reached(self):
+        response = self.start(progression={"weightIncrement": 2.5, "targetReps": 8})
+        self.assertEqual([w for w, _ in self.working_sets(response, self.bench)], [82.5, 77.5, 77.5])
+
+        response = self.start(progression={"weightIncrement": 2.5, "targetReps": 10})
+        self.assertEqual([w for w, _ in self.working_sets(response, self.bench)], [80, 75, 75])
+
+    def test_invalid_progression_returns_400(self):
+        response = self.start(progression={"weightIncrement": "lots"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WorkoutSession.objects.filter(name="Push").exists())
+
+    def test_history_lookup_is_one_query(self):
+        """Loads for all exercises with history come from a single query."""
+        for exercise in (self.row, self.fly):
+            WorkoutSet.objects.create(
+                session=self.last, exercise=exercise, set_order=9, weight=30, reps=10,
+                completed_at=self.last.created_at
+            )
+        with self.assertNumQueries(1):
+            loads = load_starting_loads(self.user.id, [self.bench.id, self.row.id, self.fly.id])
+        self.assertEqual(set(loads), {self.bench.id, self.row.id, self.fly.id})
+        self.assertEqual([load["weight"] for load in loads[self.bench.id]], [80, 75])
+
+    def test_malformed_stored_dropdowns_are_skipped(self):
+        """Dropdown weights stored as sent by the client never break start_workout."""
+        done = datetime(2025, 1, 5, 9, 0, tzinfo=timezone.utc)
+        session = WorkoutSession.objects.create(user=self.user, name="Drops", created_at=done)
+        WorkoutSet.objects.create(
+            session=session, exercise=self.fly, set_order=0, set_type="dropdown", weight=20, reps=10,
+            completed_at=done, dropdown_weights=[20, 15]
+        )
+        WorkoutSet.objects.create(
+            session=session, exercise=self.row, set_order=0, set_type="dropdown", weight=40, reps=10,
+            completed_at=done, dropdown_weights=[{"weight": 40, "reps": 10}, {"weight": "heavy"}, "x", {"weight": 30}]
+        )
+        preset = WorkoutPreset.objects.create(user=self.user, name="Drops")
+        WorkoutPresetExercise.objects.create(preset=preset, exercise=self.fly, type="dropdown", sets=1, dropdowns=1, order=0)
+        WorkoutPresetExercise.objects.create(preset=preset, exercise=self.row, type="dropdown", sets=1, dropdowns=1, order=1)
+
+        response = self.start(preset, progression={"weightIncrement": 2.5, "targetReps": 8})
+        self.assertEqual(response.status_code, 201)
+        drops = {s["exerciseId"]: s["dropdownWeights"] for s in response.data["sets"]}
+        # No usable entries: the default drop from the progressed weight
+        self.assertEqual(drops[self.fly.id], [{"weight": 22.5, "reps": 10}, {"weight": 20, "reps": 10}])
+        # The valid entries are kept and progressed
+        self.assertEqual(drops[self.row.id], [{"weight": 42.5, "reps": 10}, {"weight": 32.5, "reps": 10}])
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from workouts.models import (
@@ -286,6 +288,36 @@ class TestWorkoutPlans(TestCase):
         self.assertEqual(copied_ex.type, "superset")
         self.assertEqual(copied_ex.superset_exercises.count(), 2)
 
+    def test_use_plan_copies_with_constant_queries(self):
+        """Copying a plan costs the same queries however many presets, exercises and items it has."""
+        def add_superset(preset, order):
+            superset = WorkoutPresetExercise.objects.create(preset=preset, type="superset", sets=2, order=order)
+            for i, exercise in enumerate(Exercise.objects.all()[:2]):
+                SupersetExerciseItem.objects.create(superset=superset, exercise=exercise, order=i)
+
+        small = WorkoutPlan.objects.create(user=self.user1, name="Small")
+        WorkoutPlanPreset.objects.create(plan=small, preset=self.push_preset, order=0)
+        add_superset(self.push_preset, 1)
+
+        large = WorkoutPlan.objects.create(user=self.user1, name="Large")
+        for order, preset in enumerate([self.legs_preset, self.pull_preset, self.push_preset]):
+            WorkoutPlanPreset.objects.create(plan=large, preset=preset, order=order)
+            add_superset(preset, 2)
+            add_superset(preset, 3)
+
+        self.client.force_authenticate(user=self.user1)
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(reverse("workoutplan-use-plan", kwargs={"pk": small.id}))
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.client.post(reverse("workoutplan-use-plan", kwargs={"pk": large.id}))
+
+        self.assertEqual(len(large_queries), len(small_queries))
+        # Copies keep the plan order and each preset's exercise order
+        self.assertEqual([p["name"] for p in response.data["presets"]], ["Legs Day", "Pull Day", "Push Day"])
+        push_copy = response.data["presets"][2]
+        self.assertEqual([ex["type"] for ex in push_copy["exercises"]], ["normal", "superset", "superset", "superset"])
+        self.assertEqual([len(ex["supersetExercises"]) for ex in push_copy["exercises"]], [0, 2, 2, 2])
+
     def test_cannot_use_another_users_plan(self):
         """User cannot use a plan created by another user."""
         plan = WorkoutPlan.objects.create(user=self.user1, name="User1 Plan")
@@ -2,20 +2,39 @@ from rest_framework import viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from datetime import datetime
-from django.db.models import Prefetch, Q
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Prefetch, Q, Count, QuerySet
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema
+from users.versioning import bump_data_version, etag_on_data_version
 from .models import (
     Exercise, WorkoutSession, WorkoutSet, WorkoutPreset,
-    WorkoutPresetExercise, WorkoutPlan, WorkoutPlanPreset, SupersetExerciseItem
+    WorkoutPlan, WorkoutPlanPreset
 )
-from .services import generate_sets_from_preset
+from .services import (
+    generate_sets_from_blueprint, sync_session_sets, apply_set_operations,
+    load_starting_loads, parse_progression, copy_presets,
+)
+from .blueprints import blueprint_exercise_ids, get_preset_blueprint
+from .search import get_exercise_index
+from .aggregates import apply_set_changes, set_snapshot
+from .pagination import paginate_by_created_at, paginate_keyset, parse_page_size
 from .serializers import (
     ExerciseSerializer, WorkoutSetSerializer, WorkoutSessionSerializer,
-    WorkoutPresetSerializer, WorkoutPlanSerializer,
-    VolumeCalculationRequestSerializer, VolumeCalculationResponseSerializer
+    WorkoutSessionSummarySerializer, WorkoutPresetSerializer, WorkoutPlanSerializer,
+    VolumeCalculationRequestSerializer, VolumeCalculationResponseSerializer,
+    last_used_weights, preset_exercise_ids,
 )
 
+def parse_history_bound(value):
+    """Parse an ISO date or datetime query param into an aware datetime (UTC if no offset given)."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
 def model_to_dict(instance):
     """Convert model instance to dict, handling related objects and date formatting."""
     result = {}
@@ -65,12 +84,20 @@ def model_to_dict(instance):
     return result
 
 
+def with_preset_tree(presets):
+    """Re-read presets with their exercises and superset items prefetched, keeping their order."""
+    by_id = WorkoutPreset.objects.prefetch_related(
+        'exercises__exercise', 'exercises__superset_exercises__exercise'
+    ).in_bulk([p.id for p in presets])
+    return [by_id[p.id] for p in presets]
+
+
 class ExerciseViewSet(viewsets.ModelViewSet):
     queryset = Exercise.objects.all().prefetch_related('muscle_groups', 'equipment')
     serializer_class = ExerciseSerializer
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "search"]:
             return [AllowAny()]
         return super().get_permissions()
 
@@ -98,6 +125,85 @@ class ExerciseViewSet(viewsets.ModelViewSet):
             return Response({"error": "Cannot delete exercises created by another user"}, status=403)
         return super().destroy(request, *args, **kwargs)
 
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        Ranked exercise search for the exercise picker.
+
+        `q` matches names by prefix, substring and trigram similarity. Filters
+        `muscleGroup`, `region`, `equipment` and `tag` match names and may be
+        repeated (any of the values). Paginated with `limit` and `offset`.
+        """
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            offset = int(request.query_params.get('offset') or 0)
+            if offset < 0:
+                raise ValueError("offset must not be negative")
+        except ValueError:
+            return Response({"error": "Invalid limit or offset"}, status=400)
+
+        filters = {
+            facet: request.query_params.getlist(facet)
+            for facet in ('muscleGroup', 'region', 'equipment', 'tag')
+            if request.query_params.getlist(facet)
+        }
+        matches = get_exercise_index().search(request.query_params.get('q', ''), filters)
+        next_offset = offset + limit if offset + limit < len(matches) else None
+        return Response({
+            "results": matches[offset:offset + limit],
+            "count": len(matches),
+            "nextOffset": next_offset,
+        })
+
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        """
+        The user's completed sets for this exercise, newest first, grouped by session.
+        Keyset-paginated by set (`limit`, `cursor`); a session cut by a page
+        boundary continues at the top of the next page.
+        """
+        try:
+            exercise_id = int(pk)
+        except ValueError:
+            return Response({"error": "Exercise not found"}, status=404)
+        if not Exercise.objects.filter(id=exercise_id).exists():
+            return Response({"error": "Exercise not found"}, status=404)
+
+        sets = WorkoutSet.objects.filter(
+            user=request.user, exercise_id=exercise_id, completed_at__isnull=False
+        ).select_related('session').only(
+            'id', 'session_id', 'set_type', 'weight', 'reps', 'bodyweight', 'dropdown_weights', 'completed_at',
+            'session__name', 'session__created_at',
+        )
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            page, next_cursor = paginate_keyset(
+                sets, 'completed_at', cursor=request.query_params.get('cursor'), limit=limit, nullable=False
+            )
+        except ValueError:
+            return Response({"error": "Invalid cursor or limit"}, status=400)
+
+        results = []
+        for s in page:
+            if not results or results[-1]['sessionId'] != s.session_id:
+                results.append({
+                    'sessionId': s.session_id,
+                    'name': s.session.name,
+                    'startedAt': s.session.created_at.isoformat() if s.session.created_at else None,
+                    'sets': [],
+                })
+            results[-1]['sets'].append({
+                'id': s.id,
+                'setType': s.set_type,
+                'weight': float(s.weight) if s.weight is not None else None,
+                'reps': s.reps,
+                'bodyweight': float(s.bodyweight) if s.bodyweight is not None else None,
+                'dropdownWeights': s.dropdown_weights,
+                'loggedAt': s.completed_at.isoformat(),
+            })
+
+        return Response({"exerciseId": exercise_id, "results": results, "nextCursor": next_cursor})
+
 
 class WorkoutSetViewSet(viewsets.ModelViewSet):
     """ViewSet for managing individual workout sets (marking complete, updating weight/reps)."""
@@ -118,11 +224,15 @@ class WorkoutSetViewSet(viewsets.ModelViewSet):
             'dropdownWeights': 'dropdown_weights',
         }
 
+        before = set_snapshot(obj)
         for k, v in request.data.items():
             # Map camelCase to snake_case
             field_name = field_mapping.get(k, k)
             setattr(obj, field_name, v)
-        obj.save()
+        # The set and its session's aggregates are written together or not at all
+        with transaction.atomic():
+            obj.save()
+            apply_set_changes(obj.session_id, [before], [set_snapshot(obj)])
         # Use serializer for response to get correct field names
         serializer = WorkoutSetSerializer(obj)
         return Response(serializer.data)
@@ -132,18 +242,48 @@ class WorkoutSetViewSet(viewsets.ModelViewSet):
         """Mark a set as completed with current timestamp."""
         obj = self.get_object()
         from django.utils import timezone
+        before = set_snapshot(obj)
         obj.completed_at = timezone.now()
-        obj.save()
+        with transaction.atomic():
+            obj.save()
+            apply_set_changes(obj.session_id, [before], [set_snapshot(obj)])
         return Response(model_to_dict(obj))
 
     @action(detail=True, methods=["post"])
     def uncomplete(self, request, pk=None):
         """Mark a set as not completed by clearing completed_at."""
         obj = self.get_object()
+        before = set_snapshot(obj)
         obj.completed_at = None
-        obj.save()
+        with transaction.atomic():
+            obj.save()
+            apply_set_changes(obj.session_id, [before], [])
         return Response(model_to_dict(obj))
 
+    def destroy(self, request, *args, **kwargs):
+        obj = self.get_object()
+        before = set_snapshot(obj)
+        with transaction.atomic():
+            obj.delete()
+            apply_set_changes(obj.session_id, [before], [])
+        return Response(status=204)
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """
+        Apply many set operations (complete, uncomplete, patch) in one transaction.
+        Body: {"operations": [{"id": 1, "op": "complete"}, {"id": 2, "op": "patch", "fields": {"weight": 60}}]}
+        """
+        operations = request.data.get("operations")
+        if not isinstance(operations, list):
+            return Response({"error": "operations must be a list"}, status=400)
+        try:
+            with transaction.atomic():
+                results = apply_set_operations(request.user, operations)
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({"error": f"Invalid operation: {e}"}, status=400)
+        return Response({"results": results})
+
 
 class WorkoutSessionViewSet(viewsets.ModelViewSet):
     serializer_class = WorkoutSessionSerializer
@@ -151,16 +291,93 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return WorkoutSession.objects.filter(user=self.request.user).prefetch_related('sets__exercise')
 
+    def filter_history(self, queryset):
+        """Apply the optional `from`, `to` and `preset` query params to a session queryset."""
+        params = self.request.query_params
+        if params.get('from'):
+            queryset = queryset.filter(created_at__gte=parse_history_bound(params['from']))
+        if params.get('to'):
+            to_value = params['to']
+            to_bound = parse_history_bound(to_value)
+            if len(to_value) == 10:
+                # Date-only upper bound includes the whole day
+                queryset = queryset.filter(created_at__lt=to_bound + timedelta(days=1))
+            else:
+                queryset = queryset.filter(created_at__lte=to_bound)
+        if params.get('preset'):
+            queryset = queryset.filter(preset_id=int(params['preset']))
+        return queryset
+
+    def get_summary_queryset(self):
+        """Sessions with their stored aggregates plus a set count, without loading any set rows."""
+        return WorkoutSession.objects.filter(user=self.request.user).annotate(set_count=Count('sets'))
+
+    def serialize_sessions(self, sessions, summary):
+        if not summary:
+            # Use serializer to get camelCase field names and include related sets
+            return self.serializer_class(sessions, many=True).data
+
+        # A full list filters by subquery; a page is a short list of ids
+        if isinstance(sessions, QuerySet):
+            session_ids = sessions.order_by().values('id')
+        else:
+            session_ids = [s.id for s in sessions]
+        sessions = list(sessions)
+        # Distinct exercise ids for all sessions on the page in one query
+        exercise_ids = {}
+        pairs = WorkoutSet.objects.filter(
+            session_id__in=session_ids
+        ).values_list('session_id', 'exercise_id').distinct().order_by('session_id', 'exercise_id')
+        for session_id, exercise_id in pairs:
+            exercise_ids.setdefault(session_id, []).append(exercise_id)
+
+        serializer = WorkoutSessionSummarySerializer(
+            sessions, many=True, context={'exercise_ids': exercise_ids}
+        )
+        return serializer.data
+
+    @etag_on_data_version
     def list(self, request, *args, **kwargs):
-        # Use serializer to get camelCase field names and include related sets
-        serializer = self.serializer_class(self.get_queryset(), many=True)
-        return Response(serializer.data)
+        """
+        List the user's sessions.
+
+        Supports `from`/`to` (ISO date or datetime) and `preset` filters.
+        `view=summary` returns per-session aggregates instead of nested sets.
+        Passing `limit` or `cursor` switches to keyset pagination, newest first,
+        returning {"results": [...], "nextCursor": "..."}; without them the full list is returned.
+        """
+        summary = request.query_params.get('view') == 'summary'
+        queryset = self.get_summary_queryset() if summary else self.get_queryset()
+        try:
+            queryset = self.filter_history(queryset)
+        except ValueError:
+            return Response({"error": "Invalid filter. Use ISO dates for from/to and an id for preset"}, status=400)
+
+        if 'limit' not in request.query_params and 'cursor' not in request.query_params:
+            return Response(self.serialize_sessions(queryset, summary))
+
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            sessions, next_cursor = paginate_by_created_at(
+                queryset, cursor=request.query_params.get('cursor'), limit=limit
+            )
+        except ValueError:
+            return Response({"error": "Invalid cursor or limit"}, status=400)
+
+        return Response({"results": self.serialize_sessions(sessions, summary), "nextCursor": next_cursor})
 
     def retrieve(self, request, *args, **kwargs):
         # Use serializer to get camelCase field names and include related sets
         serializer = self.serializer_class(self.get_object())
         return Response(serializer.data)
 
+    def sets_response(self, request, obj, changes, status=200):
+        """Full session by default; with ?response=delta only the changed set ids (cheap for autosave)."""
+        if request.query_params.get('response') == 'delta':
+            return Response({'id': obj.id, **changes}, status=status)
+        obj.refresh_from_db(fields=WorkoutSession.AGGREGATE_FIELDS)
+        return Response(model_to_dict(obj), status=status)
+
     def create(self, request, *args, **kwargs):
         from django.utils import timezone
         from datetime import datetime
@@ -189,27 +406,15 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
                 data['finished_at'] = ended_at
 
         data["user_id"] = request.user.id
-        obj = WorkoutSession.objects.create(**data)
-
-        # Handle sets creation if provided
-        if sets_data:
-            for idx, set_data in enumerate(sets_data):
-                # Map frontend field names to Django model field names
-                mapped_data = {
-                    'session': obj,
-                    'set_order': set_data.get('set_order', idx),
-                    'exercise_id': set_data.get('exerciseId'),
-                    'set_type': set_data.get('setType', 'normal'),
-                    'weight': set_data.get('weight'),
-                    'reps': set_data.get('reps'),
-                    'bodyweight': set_data.get('bodyweight'),
-                    'completed_at': set_data.get('loggedAt'),
-                }
-                # Remove None values to let defaults apply
-                mapped_data = {k: v for k, v in mapped_data.items() if v is not None}
-                WorkoutSet.objects.create(**mapped_data)
-
-        return Response(model_to_dict(obj), status=201)
+        try:
+            with transaction.atomic():
+                obj = WorkoutSession.objects.create(**data)
+                # Handle sets creation if provided (one bulk_create)
+                changes = sync_session_sets(obj, sets_data or [], new_session=True)
+        except ValueError as e:
+            return Response({"error": f"Invalid set data: {e}"}, status=400)
+
+        return self.sets_response(request, obj, changes, status=201)
 
     def partial_update(self, request, *args, **kwargs):
         from datetime import datetime
@@ -232,60 +437,23 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
             else:
                 data['finished_at'] = ended_at
 
-        # Update simple attributes
-        for k, v in data.items():
-            setattr(obj, k, v)
-        obj.save()
-
-        # Handle sets update - sync with provided sets data
-        if sets_data is not None:
-            # Get existing sets for this session
-            existing_sets = list(WorkoutSet.objects.filter(session=obj))
-            existing_sets_by_id = {s.id: s for s in existing_sets}
-
-            # Track which set IDs have been processed
-            processed_set_ids = set()
-            created_sets = []
-
-            for idx, set_data in enumerate(sets_data):
-                # Check if this set has an ID that matches an existing set
-                set_id = set_data.get('id')
-                if set_id and set_id in existing_sets_by_id:
-                    # Update existing set
-                    set_obj = existing_sets_by_id[set_id]
-                    set_obj.set_order = set_data.get('set_order', idx)
-                    set_obj.exercise_id = set_data.get('exerciseId')
-                    set_obj.set_type = set_data.get('setType', 'normal')
-                    set_obj.weight = set_data.get('weight')
-                    set_obj.reps = set_data.get('reps')
-                    set_obj.bodyweight = set_data.get('bodyweight')
-                    set_obj.completed_at = set_data.get('loggedAt')
-                    set_obj.save()
-                    processed_set_ids.add(set_id)
-                else:
-                    # Create new set
-                    mapped_data = {
-                        'session': obj,
-                        'set_order': set_data.get('set_order', idx),
-                        'exercise_id': set_data.get('exerciseId'),
-                        'set_type': set_data.get('setType', 'normal'),
-                        'weight': set_data.get('weight'),
-                        'reps': set_data.get('reps'),
-                        'bodyweight': set_data.get('bodyweight'),
-                        'completed_at': set_data.get('loggedAt'),
-                    }
-                    # Remove None values to let defaults apply
-                    mapped_data = {k: v for k, v in mapped_data.items() if v is not None}
-                    new_set = WorkoutSet.objects.create(**mapped_data)
-                    created_sets.append(new_set)
-                    processed_set_ids.add(new_set.id)
-
-            # Delete sets that weren't in the update (sets that were "uncompleted" and removed)
-            for existing_set in existing_sets:
-                if existing_set.id not in processed_set_ids:
-                    existing_set.delete()
-
-        return Response(model_to_dict(obj))
+        changes = {'created': [], 'updated': [], 'deleted': []}
+        try:
+            with transaction.atomic():
+                # Update simple attributes
+                for k, v in data.items():
+                    setattr(obj, k, v)
+                obj.save()
+
+                # Handle sets update - sync with provided sets data as one diff
+                if sets_data is not None:
+                    changes = sync_session_sets(obj, sets_data)
+                    # Drop sets prefetched by get_object() so the response reflects the sync
+                    obj._prefetched_objects_cache = {}
+        except ValueError as e:
+            return Response({"error": f"Invalid set data: {e}"}, status=400)
+
+        return self.sets_response(request, obj, changes)
 
     def destroy(self, request, *args, **kwargs):
         obj = self.get_object()
@@ -304,6 +472,7 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @etag_on_data_version
     def active(self, request):
         """Get the currently active workout session (if any)."""
         # Return the most recent workout session that doesn't have finished_at
@@ -327,6 +496,9 @@ class WorkoutPresetViewSet(viewsets.ModelViewSet):
             return WorkoutPreset.objects.filter(user=self.request.user).prefetch_related(
                 'exercises__exercise', 'exercises__superset_exercises__exercise'
             )
+        # Starting a workout reads the preset tree through its cached blueprint
+        if self.action == "start_workout":
+            return WorkoutPreset.objects.all()
         # For detail actions, allow accessing any preset (permissions checked in action methods)
         return WorkoutPreset.objects.all().prefetch_related(
             'exercises__exercise', 'exercises__superset_exercises__exercise'
@@ -338,6 +510,19 @@ class WorkoutPresetViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return super().get_permissions()
 
+    def serialize_presets(self, presets):
+        """Serialize presets with the user's last used weights for all of them loaded in one query."""
+        presets = list(presets)
+        context = self.get_serializer_context()
+        if self.request.user.is_authenticated:
+            exercise_ids = [ex_id for preset in presets for ex_id in preset_exercise_ids(preset)]
+            context['last_used_weights'] = last_used_weights(self.request.user, exercise_ids)
+        return self.get_serializer_class()(presets, many=True, context=context).data
+
+    @etag_on_data_version
+    def list(self, request, *args, **kwargs):
+        return Response(self.serialize_presets(self.filter_queryset(self.get_queryset())))
+
     def retrieve(self, request, *args, **kwargs):
         obj = self.get_object()
         # Only allow retrieving own presets or templates/public presets
@@ -383,8 +568,7 @@ class WorkoutPresetViewSet(viewsets.ModelViewSet):
         templates = WorkoutPreset.objects.filter(
             Q(user=None) | Q(is_public=True)
         ).prefetch_related('exercises__exercise', 'exercises__superset_exercises__exercise')
-        serializer = self.get_serializer(templates, many=True)
-        return Response(serializer.data)
+        return Response(self.serialize_presets(templates))
 
     @action(detail=False, methods=["post"])
     def create_from_template(self, request):
@@ -407,41 +591,11 @@ class WorkoutPresetViewSet(viewsets.ModelViewSet):
         if not can_copy:
             return Response({"error": "Cannot copy private preset from another user"}, status=403)
 
-        # Create a new preset for the user
-        new_preset = WorkoutPreset.objects.create(
-            user=request.user,
-            name=template.name,
-            notes=template.notes,
-        )
+        # Copy the preset with its exercises and superset items
+        with transaction.atomic():
+            new_preset, = copy_presets([template], request.user)
 
-        # Copy all exercises from the template
-        preset_exercises = template.exercises.prefetch_related(
-            "superset_exercises__exercise"
-        ).order_by("order")
-
-        for preset_ex in preset_exercises:
-            new_preset_ex = WorkoutPresetExercise.objects.create(
-                preset=new_preset,
-                exercise=preset_ex.exercise,
-                type=preset_ex.type,
-                sets=preset_ex.sets,
-                dropdowns=preset_ex.dropdowns,
-                include_warmup=preset_ex.include_warmup,
-                order=preset_ex.order,
-            )
-            # Copy superset items if applicable
-            if preset_ex.type == "superset":
-                for sup_item in preset_ex.superset_exercises.all():
-                    SupersetExerciseItem.objects.create(
-                        superset=new_preset_ex,
-                        exercise=sup_item.exercise,
-                        type=sup_item.type,
-                        dropdowns=sup_item.dropdowns,
-                        include_warmup=sup_item.include_warmup,
-                        order=sup_item.order,
-                    )
-
-        serializer = self.get_serializer(new_preset)
+        serializer = self.get_serializer(with_preset_tree([new_preset])[0])
         return Response(serializer.data, status=201)
 
     @action(detail=True, methods=["post"])
@@ -454,6 +608,11 @@ class WorkoutPresetViewSet(viewsets.ModelViewSet):
 
         preset = self.get_object()
 
+        try:
+            progression = parse_progression(request.data.get('progression'))
+        except (TypeError, ValueError, ArithmeticError) as e:
+            return Response({"error": f"Invalid progression: {e}"}, status=400)
+
         # Get client-provided start time if available, otherwise use server time
         started_at = request.data.get('startedAt')
         if started_at:
@@ -475,20 +634,26 @@ class WorkoutPresetViewSet(viewsets.ModelViewSet):
             created_at=created_time
         )
 
-        # Prefetch and convert to list
-        preset_exercises = list(preset.exercises.prefetch_related(
-            "superset_exercises__exercise"
-        ).order_by("order"))
+        # Flat list of the sets the preset generates, compiled once per preset version
+        blueprint = get_preset_blueprint(preset)
+
+        # Seed weights/reps from the user's last sessions, one query for all exercises
+        starting_loads = load_starting_loads(
+            request.user.id, blueprint_exercise_ids(blueprint), progression
+        )
 
         # Generate WorkoutSet instances (unsaved)
-        sets = generate_sets_from_preset(preset_exercises, session)
+        sets = generate_sets_from_blueprint(blueprint, session, starting_loads)
 
         # Bulk create
         WorkoutSet.objects.bulk_create(sets)
+        # bulk_create doesn't send post_save, bump the version for the new sets
+        bump_data_version(request.user.id)
 
         # Use serializers to get camelCase field names for frontend
         session_serializer = WorkoutSessionSerializer(session)
-        sets_serializer = WorkoutSetSerializer(session.sets.all(), many=True)
+        # bulk_create returned the ids, no need to read the sets back
+        sets_serializer = WorkoutSetSerializer(sets, many=True)
 
         return Response({
             "session": session_serializer.data,
@@ -596,50 +761,12 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
         if plan.user_id != request.user.id:
             return Response({"error": "Cannot use a plan created by another user"}, status=403)
 
-        copied_presets = []
-        plan_presets = plan.plan_presets.all().order_by("order")
-
-        for plan_preset in plan_presets:
-            template = plan_preset.preset
-
-            # Create a new preset for the user
-            new_preset = WorkoutPreset.objects.create(
-                user=request.user,
-                name=template.name,
-                notes=template.notes,
-            )
-
-            # Copy all exercises from the template
-            preset_exercises = template.exercises.prefetch_related(
-                "superset_exercises__exercise"
-            ).order_by("order")
-
-            for preset_ex in preset_exercises:
-                new_preset_ex = WorkoutPresetExercise.objects.create(
-                    preset=new_preset,
-                    exercise=preset_ex.exercise,
-                    type=preset_ex.type,
-                    sets=preset_ex.sets,
-                    dropdowns=preset_ex.dropdowns,
-                    include_warmup=preset_ex.include_warmup,
-                    order=preset_ex.order,
-                )
-                # Copy superset items if applicable
-                if preset_ex.type == "superset":
-                    for sup_item in preset_ex.superset_exercises.all():
-                        SupersetExerciseItem.objects.create(
-                            superset=new_preset_ex,
-                            exercise=sup_item.exercise,
-                            type=sup_item.type,
-                            dropdowns=sup_item.dropdowns,
-                            include_warmup=sup_item.include_warmup,
-                            order=sup_item.order,
-                        )
-
-            copied_presets.append(new_preset)
+        plan_presets = plan.plan_presets.select_related('preset').order_by("order")
+        with transaction.atomic():
+            copied_presets = copy_presets([pp.preset for pp in plan_presets], request.user)
 
         # Serialize the copied presets with exercises
-        preset_serializer = WorkoutPresetSerializer(copied_presets, many=True)
+        preset_serializer = WorkoutPresetSerializer(with_preset_tree(copied_presets), many=True)
 
         return Response({
             "message": f"Copied {len(copied_presets)} presets from plan '{plan.name}'",